@@ -0,0 +1,167 @@
+"""
+Decodificação das respostas AQADC.
+
+Uma resposta AQADC tem 1 caractere inicial e 9 campos de 5 dígitos separados
+por 1 caractere (54 bytes). O decodificador converte um frame, um lote de
+frames ou um bloco de bytes recebidos numa matriz NumPy de tensões em um
+único passo vetorizado, usando um vetor de ganhos pré-calculado.
+"""
+import re
+from typing import Sequence, Union
+
+import numpy as np
+
+
+# Ordem dos canais na resposta AQADC (mesma ordem dos campos de ADCReading)
+CHANNELS = (
+    "adc_15v", "adc_5v", "adc_load", "adc_dcdc", "adc_batt",
+    "adc_cf", "adc_pwm", "adc_stepup", "adc_leit_corr",
+)
+
+ADC_FRAME_LEN = 54
+FIELD_WIDTH = 5
+FIELD_STRIDE = 6
+
+# Calibração padrão da jiga
+V_FONTE = 3.49
+CONST_FONTE = V_FONTE / 4096
+RED_ADCS = (3.9 + 27) / 3.9
+RED_LOAD = (3.9 + 27) / 3.9
+RED_CF = (100 + 20) / 20
+RED_BATT = (2.2 + 27) / 2.2
+RED_PWM = (3.3 + 22) / 3.3
+
+# Posição de cada dígito no frame: (canal, dígito)
+_DIGIT_INDEX = np.array([
+    1 + FIELD_STRIDE * ch + d for ch in range(len(CHANNELS)) for d in range(FIELD_WIDTH)
+])
+_PLACE_VALUES = 10 ** np.arange(FIELD_WIDTH - 1, -1, -1)
+_LINE_SEPARATOR = re.compile(rb'[\r\n]+')
+
+
+def gain_vector(const_fonte: float = CONST_FONTE, red_adcs: float = RED_ADCS,
+                red_batt: float = RED_BATT, red_cf: float = RED_CF,
+                red_pwm: float = RED_PWM, red_load: float = RED_LOAD) -> np.ndarray:
+    """Volts por contagem de cada canal, na ordem de CHANNELS."""
+    return const_fonte * np.array([
+        red_adcs,   # 15V
+        red_adcs,   # 5V
+        red_adcs,   # load
+        red_adcs,   # DCDC
+        red_batt,   # bateria
+        red_cf,     # circuito de carga
+        red_pwm,    # PWM
+        red_batt,   # step-up
+        red_load,   # leitura de corrente
+    ])
+
+
+DEFAULT_GAINS = gain_vector()
+
+
+class AdcDecoder:
+    """Converte frames AQADC em tensões calibradas.
+
+    Frames curtos ou com caracteres inválidos num campo viram linhas de NaN.
+    """
+
+    def __init__(self, gains: np.ndarray = DEFAULT_GAINS):
+        self.gains = np.asarray(gains, dtype=np.float64)
+
+    def counts(self, frames: Sequence[Union[bytes, str]]) -> np.ndarray:
+        """Contagens brutas (n, 9); campos inválidos ficam NaN."""
+        n = len(frames)
+        if n == 0:
+            return np.empty((0, len(CHANNELS)))
+
+        raw = b''.join(
+            (f.encode() if isinstance(f, str) else bytes(f)).strip()[:ADC_FRAME_LEN].ljust(ADC_FRAME_LEN, b'\0')
+            for f in frames
+        )
+        buf = np.frombuffer(raw, dtype=np.uint8).reshape(n, ADC_FRAME_LEN)
+
+        # Espaços à esquerda (campos sem zero de preenchimento) valem como zero
+        digits = buf[:, _DIGIT_INDEX].astype(np.int16)
+        digits[digits == ord(' ')] = ord('0')
+        digits = (digits - ord('0')).reshape(n, len(CHANNELS), FIELD_WIDTH)
+
+        valid = ((digits >= 0) & (digits <= 9)).all(axis=2)
+        counts = (digits @ _PLACE_VALUES).astype(np.float64)
+        counts[~valid] = np.nan
+        return counts
+
+    def decode_batch(self, frames: Sequence[Union[bytes, str]]) -> np.ndarray:
+        """Tensões (n, 9) de um lote de frames."""
+        return self.counts(frames) * self.gains
+
+    def decode(self, frame: Union[bytes, str]) -> np.ndarray:
+        """Tensões (9,) de um único frame."""
+        return self.decode_batch([frame])[0]
+
+    def decode_stream(self, data: bytes) -> np.ndarray:
+        """Tensões (n, 9) de todas as linhas AQADC completas num bloco de bytes recebidos."""
+        lines = [line for line in _LINE_SEPARATOR.split(data) if len(line.strip()) >= ADC_FRAME_LEN]
+        return self.decode_batch(lines)
+
+
+# Colunas de cada linha do SampleBuffer: instante, duty e os 9 canais
+SAMPLE_COLUMNS = ("t", "duty") + CHANNELS
+
+
+class SampleBuffer:
+    """Buffer pré-alocado de amostras (t, duty, 9 canais).
+
+    Guarda cada leitura numa linha de uma matriz NumPy, sem alocar objetos por
+    amostra. Cheio, dobra de tamanho até ``max_capacity``; só a partir daí vira
+    circular, sobrescrevendo as amostras mais antigas e contando-as em ``dropped``.
+    """
+
+    def __init__(self, capacity: int = 8192, max_capacity: int = 262144):
+        self.max_capacity = max(capacity, max_capacity)
+        self._data = np.full((capacity, len(SAMPLE_COLUMNS)), np.nan)
+        self._next = 0
+        self._count = 0
+        self.dropped = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._data.shape[0]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, t: float, duty: float, values: np.ndarray):
+        """Adiciona uma amostra; ``values`` são as 9 tensões na ordem de CHANNELS."""
+        if self._count == self.capacity:
+            if self.capacity < self.max_capacity:
+                self._grow()
+            else:
+                self.dropped += 1
+        row = self._data[self._next]
+        row[0] = t
+        row[1] = duty
+        row[2:] = values
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def _grow(self):
+        # Só cresce antes de dar a volta: as linhas ainda estão em ordem cronológica
+        data = np.full((min(self.capacity * 2, self.max_capacity), self._data.shape[1]), np.nan)
+        data[:self._count] = self._data
+        self._data = data
+        self._next = self._count
+
+    def clear(self):
+        self._next = 0
+        self._count = 0
+        self.dropped = 0
+
+    def array(self) -> np.ndarray:
+        """Cópia das amostras em ordem cronológica, formato (n, 11)."""
+        if self._count < self.capacity:
+            return self._data[:self._count].copy()
+        return np.roll(self._data, -self._next, axis=0)
+
+    def column(self, name: str) -> np.ndarray:
+        """Série cronológica de uma coluna (``t``, ``duty`` ou um canal)."""
+        return self.array()[:, SAMPLE_COLUMNS.index(name)]
@@ -0,0 +1,574 @@
+"""
+API assíncrona (asyncio) para a comunicação serial e os testes de potência.
+
+Com ela um único event loop pode conduzir várias jigas e a interface sem uma
+thread bloqueada por estação, e qualquer teste pode ser cancelado com
+``Task.cancel()``. Calibração, critérios, log e resultados são os mesmos do
+``Model`` síncrono, que é reaproveitado internamente.
+
+Os testes longos rodam o ``Model`` numa thread, que ``Task.cancel()`` não
+interrompe: o cancelamento da task é repassado ao ``cancel_token`` do Model,
+que interrompe a thread na próxima espera, e a task só termina depois dela.
+As esperas no loop usam o relógio do próprio loop (tempo real); por isso o
+AsyncModel não aceita um Model com relógio virtual.
+"""
+import asyncio
+import time
+from dataclasses import asdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import serial
+
+from cancel import Cancelled
+from model import Model, ADCReading, TestResult, PWMSweepResult
+from serial_io import FrameSplitter, SerialReader, Frame, classify_frame, FRAME_ACK, FRAME_ADC
+
+
+class AsyncSerialTransport:
+    """Transporte serial integrado ao event loop.
+
+    Em portas com descritor de arquivo (Linux) a leitura é feita pelo próprio
+    loop via ``add_reader``, sem threads. Onde isso não é possível (COM no
+    Windows) uma ``SerialReader`` entrega os frames ao loop de forma segura.
+    """
+
+    def __init__(self, ser: serial.Serial):
+        self.ser = ser
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._frames: Optional[asyncio.Queue] = None
+        self._splitter = FrameSplitter()
+        self._thread_reader: Optional[SerialReader] = None
+        self._fd: Optional[int] = None
+        self._cleared_at = 0.0
+
+    async def start(self):
+        """Passa a receber frames da porta no loop atual."""
+        self._loop = asyncio.get_running_loop()
+        self._frames = asyncio.Queue()
+        try:
+            fd = self.ser.fileno()
+            self._loop.add_reader(fd, self._on_readable)
+            self._fd = fd
+        except (AttributeError, NotImplementedError, ValueError, OSError, serial.SerialException):
+            self._thread_reader = SerialReader(self.ser, on_frame=self._on_thread_frame)
+            self._thread_reader.start()
+
+    async def stop(self):
+        """Para de receber frames da porta."""
+        if self._fd is not None:
+            self._loop.remove_reader(self._fd)
+            self._fd = None
+        if self._thread_reader:
+            await self._loop.run_in_executor(None, self._thread_reader.stop)
+            self._thread_reader = None
+
+    def _on_readable(self):
+        try:
+            data = self.ser.read(self.ser.in_waiting or 1)
+        except (serial.SerialException, OSError):
+            return
+        received_at = time.monotonic()
+        for raw in self._splitter.feed(data):
+            self._frames.put_nowait(Frame(classify_frame(raw), raw, received_at))
+
+    def _on_thread_frame(self, frame: Frame):
+        self._loop.call_soon_threadsafe(self._put_frame, frame)
+
+    def _put_frame(self, frame: Frame):
+        # Frame lido pela thread antes de um clear() é resposta antiga
+        if frame.timestamp >= self._cleared_at:
+            self._frames.put_nowait(frame)
+
+    def write(self, data: bytes):
+        self.ser.write(data)
+
+    def clear(self):
+        """Descarta frames pendentes (equivalente ao reset_input_buffer)."""
+        self._cleared_at = time.monotonic()
+        self._splitter.reset()
+        if self._thread_reader:
+            self._thread_reader.clear()
+        while not self._frames.empty():
+            self._frames.get_nowait()
+
+    async def wait_for(self, predicate: Callable[[Frame], bool],
+                       timeout: float) -> Tuple[Optional[Frame], List[Frame]]:
+        """Aguarda o primeiro frame que satisfaça ``predicate``."""
+        deadline = self._loop.time() + timeout
+        skipped = []
+        while True:
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                return None, skipped
+            try:
+                frame = await asyncio.wait_for(self._frames.get(), remaining)
+            except asyncio.TimeoutError:
+                return None, skipped
+            if predicate(frame):
+                return frame, skipped
+            skipped.append(frame)
+
+
+class AsyncModel:
+    """
+    Versão assíncrona do Model.
+    Comandos, leituras AQADC, esperas e testes de potência e de comunicação
+    rodam no event loop; a varredura PWM ainda usa a implementação síncrona do
+    Model numa thread auxiliar, emprestando a porta durante o teste.
+    """
+
+    def __init__(self, model: Optional[Model] = None):
+        self.model = model or Model()
+        if self.model.clock.is_virtual:
+            raise ValueError("AsyncModel usa o relógio do event loop; o Model não pode ter relógio virtual")
+        self.transport: Optional[AsyncSerialTransport] = None
+
+    # ═══════════════════════════════════════════════════════════════════
+    # CONEXÃO E COMUNICAÇÃO SERIAL
+    # ═══════════════════════════════════════════════════════════════════
+
+    async def connect(self, port: str) -> bool:
+        """Conecta à porta serial."""
+        loop = asyncio.get_running_loop()
+        try:
+            ser = await loop.run_in_executor(None, Model.open_serial, port)
+        except serial.SerialException:
+            self.model.is_connected = False
+            return False
+
+        await asyncio.sleep(1)
+        return await self.attach(ser)
+
+    async def attach(self, ser) -> bool:
+        """Usa uma porta já aberta (ex.: EmulatedSerial) e passa a ler no loop."""
+        self.model.ser = ser
+        self.model.fixture_state.forget()
+        self.model.is_connected = ser.is_open
+        if self.model.is_connected:
+            self.transport = AsyncSerialTransport(ser)
+            await self.transport.start()
+        return self.model.is_connected
+
+    async def disconnect(self):
+        """Desconecta da porta serial."""
+        if self.transport:
+            await self.transport.stop()
+            self.transport = None
+        self.model.disconnect()
+
+    async def send_command(self, command: bytes, timeout: float = 1.0) -> Tuple[bool, str]:
+        """Envia um comando e aguarda ACK (omitido se não mudaria o estado conhecido da jiga)."""
+        if not self.transport:
+            return False, "Porta não conectada"
+
+        state = self.model.fixture_state
+        if self.model.elide_redundant and state.is_redundant(command):
+            state.elided += 1
+            return True, ""
+
+        try:
+            self.transport.write(command)
+        except serial.SerialException as e:
+            state.apply(command, confirmed=False)
+            return False, str(e)
+        ok, resposta = await self._wait_for_ack(timeout)
+        state.apply(command, confirmed=ok)
+        return ok, resposta
+
+    async def send_batch(self, commands: List[bytes], timeout: float = 1.0) -> Tuple[bool, List[Tuple[bytes, bool, str]]]:
+        """Envia uma lista de comandos de uma vez e casa os ACKs em ordem."""
+        if not self.transport:
+            return False, [(cmd, False, "Porta não conectada") for cmd in commands]
+
+        commands = [cmd if cmd.endswith(b'\r') else cmd + b'\r' for cmd in commands]
+        state = self.model.fixture_state
+        needed = state.needed(commands) if self.model.elide_redundant else [True] * len(commands)
+        to_send = [cmd for cmd, send in zip(commands, needed) if send]
+        state.elided += len(commands) - len(to_send)
+        try:
+            if to_send:
+                self.transport.write(b''.join(to_send))
+        except serial.SerialException as e:
+            for cmd in to_send:
+                state.apply(cmd, confirmed=False)
+            return False, [(cmd, False, str(e)) for cmd in commands]
+
+        results = []
+        for cmd, send in zip(commands, needed):
+            if not send:
+                results.append((cmd, True, ""))
+                continue
+            ok, resposta = await self._wait_for_ack(timeout)
+            state.apply(cmd, confirmed=ok)
+            results.append((cmd, ok, resposta))
+            if not ok:
+                print(f"[ERRO] Sem ACK para {cmd.strip().decode(errors='ignore')}: {resposta}")
+
+        return all(ok for _, ok, _ in results), results
+
+    async def _wait_for_ack(self, timeout: float = 1.0) -> Tuple[bool, str]:
+        frame, skipped = await self.transport.wait_for(lambda f: f.kind == FRAME_ACK, timeout)
+        buffer = "\n".join(f.text for f in skipped + ([frame] if frame else []))
+        return frame is not None, buffer.strip()
+
+    async def read_adc(self, timeout: float = 1.0) -> Optional[ADCReading]:
+        """Lê os valores dos ADCs."""
+        if not self.transport:
+            return None
+
+        try:
+            self.transport.clear()
+            self.transport.write(b'AQADC\r')
+        except serial.SerialException:
+            return None
+        frame, _ = await self.transport.wait_for(lambda f: f.kind == FRAME_ADC, timeout)
+        return self.model.parse_adc(frame.raw) if frame else None
+
+    async def wait_settled(self, channels: Tuple[str, ...], max_wait: float,
+                           tolerance: float = 0.05, samples: int = 3,
+                           condition: Optional[Callable[[ADCReading], bool]] = None,
+                           min_wait: float = 0.0) -> Optional[ADCReading]:
+        """Mesma lógica de Model.wait_settled, sem bloquear o loop."""
+        if not self.transport:
+            return None
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start + max(max_wait, min_wait)
+        window: List[ADCReading] = []
+        reading = None
+
+        while loop.time() < deadline:
+            new_reading = await self.read_adc(timeout=max(deadline - loop.time(), 0.05))
+            if not new_reading:
+                await asyncio.sleep(min(0.05, max(deadline - loop.time(), 0)))
+                continue
+
+            reading = new_reading
+            window = (window + [reading])[-samples:]
+            if len(window) < samples or loop.time() - start < min_wait:
+                continue
+
+            settled = all(
+                max(getattr(r, ch) for r in window) - min(getattr(r, ch) for r in window) <= tolerance
+                for ch in channels
+            )
+            if settled and (condition is None or condition(reading)):
+                return reading
+
+        return reading if reading else await self.read_adc()
+
+    async def initialize_system(self) -> bool:
+        """Inicializa o sistema com comandos padrão."""
+        ok, _ = await self.send_batch([b'DESDC\r', b'DESBT\r', b'FR1D0\r', b'DESCB\r', b'DGLOAD\r'])
+        await self.wait_settled(("adc_dcdc", "adc_load"), max_wait=1, min_wait=self.model.relay_settle_time)
+        return ok
+
+    async def turnoff_system(self) -> bool:
+        """Desliga carga e circuito de carga da bateria."""
+        ok, _ = await self.send_batch([b'DESCB\r', b'DGLOAD\r'])
+        await self.wait_settled(("adc_dcdc", "adc_load"), max_wait=1, min_wait=self.model.relay_settle_time)
+        return ok
+
+    async def _wait_for_adc_5v(self, max_time: int = 20) -> bool:
+        """Aguarda ADC_5V atingir 4V, respeitando o temporizador da placa."""
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+
+        while True:
+            elapsed_time = loop.time() - start_time
+            if elapsed_time > max_time:
+                print(f"[ERRO] Tempo excedido ({elapsed_time:.1f}s). ADC_5V não atingiu 4V")
+                return False
+
+            await asyncio.sleep(1)
+            adc_reading = await self.read_adc()
+            adc_5v = adc_reading.adc_5v if adc_reading else 0
+
+            if adc_5v > 4.0:
+                if elapsed_time < 15:
+                    return False
+                await asyncio.sleep(2)
+                return True
+
+    # ═══════════════════════════════════════════════════════════════════
+    # TESTES PRINCIPAIS
+    # ═══════════════════════════════════════════════════════════════════
+
+    async def test_battery_short(self) -> TestResult:
+        """Testa curto na bateria."""
+        try:
+            self.transport.clear()
+            await self.send_command(b'LIGBT')
+            adc_reading = await self.wait_settled(("adc_batt",), max_wait=0.3,
+                                                  condition=lambda r: r.adc_batt > 0)
+            await self.send_command(b'DESBT')
+
+            adc_batt = adc_reading.adc_batt if adc_reading else 0
+            if adc_batt != adc_batt:  # Detecta NaN
+                adc_batt = 0
+
+            self.model._log_event("teste_bateria_curto", "NG" if adc_batt == 0 else "OK", adc_reading)
+
+            if adc_batt == 0:
+                return TestResult(False, "Possível curto na bateria", {"adc_batt": 0})
+            return TestResult(True, "Bateria operando normalmente", {"adc_batt": adc_batt})
+        except Exception as e:
+            return TestResult(False, f"Erro no teste de bateria: {e}", {"adc_batt": 0})
+
+    async def test_dcdc_short(self) -> TestResult:
+        """Testa curto no DCDC."""
+        try:
+            self.transport.clear()
+            await self.send_command(b'LIGDC')
+            adc_reading = await self.wait_settled(("adc_dcdc",), max_wait=0.3,
+                                                  condition=lambda r: r.adc_dcdc > 0)
+            await self.send_command(b'DESDC')
+
+            adc_dcdc = adc_reading.adc_dcdc if adc_reading else 0
+            if adc_dcdc != adc_dcdc:  # Detecta NaN
+                adc_dcdc = 0
+
+            self.model._log_event("teste_dcdc_curto", "NG" if adc_dcdc == 0 else "OK", adc_reading)
+
+            if adc_dcdc == 0:
+                return TestResult(False, "Possível curto no DCDC", {"adc_dcdc": 0})
+            return TestResult(True, "DCDC operando normalmente", {"adc_dcdc": adc_dcdc})
+        except Exception as e:
+            return TestResult(False, f"Erro no teste de DCDC: {e}", {"adc_dcdc": 0})
+
+    async def test_dcdc_and_load(self) -> Tuple[TestResult, TestResult]:
+        """Testa DCDC e carga."""
+        try:
+            self.transport.clear()
+            await self.send_command(b'LIGDC')
+
+            if not await self._wait_for_adc_5v():
+                return TestResult(False, "ADC_5V não atingiu 4V"), TestResult(False, "Teste não executado")
+
+            leitura = await self.read_adc()
+            if leitura is None:
+                return TestResult(False, "Teste 1A: leitura não estabilizou"), TestResult(False, "Teste não executado")
+            teste1a = ((leitura.adc_batt > 27.5) and (leitura.adc_dcdc > 22) and (leitura.adc_load > 21.5) and
+                       (leitura.adc_15v > 14.5) and (leitura.adc_5v > 4.5) and (leitura.adc_stepup > 29.5))
+            self.model._log_event("teste_tensao_dcdc_load_stepup", "OK" if teste1a else "NG", leitura)
+
+            await self.send_command(b'LIGCB\r')
+            leitura2 = await self.wait_settled(
+                ("adc_dcdc", "adc_cf"), max_wait=0.8,
+                condition=lambda r: r.adc_dcdc > 22 and 11 < r.adc_cf < 13.5
+            )
+            if leitura2 is None:
+                await self.send_command(b'DESCB\r')
+                return (TestResult(teste1a, "Teste 1A " + ("OK" if teste1a else "NG"),
+                                   {"adc_batt": leitura.adc_batt, "adc_dcdc": leitura.adc_dcdc}),
+                        TestResult(False, "Teste 1B: leitura não estabilizou"))
+            teste1b = (leitura2.adc_dcdc > 22) and (11 < leitura2.adc_cf < 13.5)
+            self.model._log_event("teste_circ_carga_bateria", "OK" if teste1b else "NG", leitura2)
+
+            await self.send_command(b'DESCB\r')
+
+            return (TestResult(teste1a, "Teste 1A " + ("OK" if teste1a else "NG"),
+                               {"adc_batt": leitura.adc_batt, "adc_dcdc": leitura.adc_dcdc}),
+                    TestResult(teste1b, "Teste 1B " + ("OK" if teste1b else "NG"),
+                               {"adc_cf": leitura2.adc_cf, "adc_dcdc": leitura2.adc_dcdc}))
+        except Exception as e:
+            return TestResult(False, f"Erro no teste: {e}"), TestResult(False, f"Erro no teste: {e}")
+
+    async def test_isolated_battery(self) -> TestResult:
+        """Testa bateria isolada."""
+        try:
+            self.transport.clear()
+            await self.send_batch([b'LIGBT', b'DESDC'])
+            leitura = await self.wait_settled(
+                ("adc_batt", "adc_dcdc", "adc_load"), max_wait=0.8,
+                condition=lambda r: r.adc_batt > 22 and r.adc_dcdc < 5 and r.adc_load > 21.5
+            )
+            if leitura is None:
+                return TestResult(False, "Teste Bateria Isolada: leitura não estabilizou")
+            teste3 = (leitura.adc_batt > 22) and (leitura.adc_dcdc < 5) and (leitura.adc_load > 21.5)
+            self.model._log_event("teste_bateria_isolada", "OK" if teste3 else "NG", leitura)
+
+            return TestResult(teste3, "Teste Bateria Isolada: " + ("OK" if teste3 else "NG"),
+                              {"adc_batt": leitura.adc_batt, "adc_dcdc": leitura.adc_dcdc,
+                               "adc_load": leitura.adc_load})
+        except Exception as e:
+            return TestResult(False, f"Erro no teste de bateria isolada: {e}")
+
+    async def test_temperature_alarms(self) -> Dict[str, TestResult]:
+        """Executa testes de alarme de temperatura."""
+        results = {}
+        channels = ("adc_batt", "adc_dcdc", "adc_load")
+        alarm_on = lambda r: r.adc_batt > 22 and r.adc_dcdc < 5 and r.adc_load < 10
+        alarm_off = lambda r: r.adc_batt > 22 and r.adc_dcdc < 5 and r.adc_load > 21
+
+        # (chave, título, comandos antes da leitura, espera máxima, critério, desliga carga depois)
+        steps = [
+            ("Teste4A", "Teste Alarme Temp1", [b'ACLOAD\r', b'ACTP1\r'], 1, alarm_on, True),
+            ("Teste4B", "Teste Retorno Al. Temp1", [b'ACTPA\r'], 1, alarm_off, False),
+            ("Teste4C", "Teste Al. Temp2", [b'ACLOAD\r', b'ACTP2\r'], 1, alarm_on, True),
+            ("Teste4D", "Teste Retorno Al. Temp2", [b'ACTPA\r'], 2, alarm_off, False),
+        ]
+        events = {
+            "Teste4A": "teste_alarme_temp1",
+            "Teste4B": "teste_retorno_alarme_temp1",
+            "Teste4C": "teste_alarme_temp2",
+            "Teste4D": "teste_retorno_alarme_temp2",
+        }
+
+        try:
+            for key, title, commands, max_wait, criterion, dgload in steps:
+                for cmd in commands[:-1]:
+                    # ACLOAD: carga ligada sem alarme, o mesmo estado do retorno do alarme
+                    await self.send_command(cmd)
+                    await self.wait_settled(channels, max_wait=max_wait, condition=alarm_off)
+                await self.send_command(commands[-1])
+                adc_reading = await self.wait_settled(channels, max_wait=max_wait, condition=criterion)
+
+                if dgload:
+                    await self.send_command(b'DGLOAD\r')
+
+                if adc_reading:
+                    passed = criterion(adc_reading)
+                    results[key] = TestResult(passed, title, asdict(adc_reading))
+                    self.model._log_event(events[key], "OK" if passed else "NG", adc_reading)
+        except Exception as e:
+            results["error"] = TestResult(False, f"Erro nos testes de temperatura: {e}")
+
+        return results
+
+    # ═══════════════════════════════════════════════════════════════════
+    # TESTES DE COMUNICAÇÃO
+    # ═══════════════════════════════════════════════════════════════════
+
+    async def test_inclinometro(self) -> TestResult:
+        """Teste de comunicação do inclinômetro."""
+        return (await self._communication_group())["inclinometro"]
+
+    async def test_adc_communication(self) -> TestResult:
+        """Teste de comunicação do ADC."""
+        return (await self._communication_group())["adc"]
+
+    async def test_rak_communication(self) -> TestResult:
+        """Teste de comunicação do RAK."""
+        return (await self._communication_group())["rak"]
+
+    async def _communication_group(self) -> Dict[str, TestResult]:
+        # Mesmo cache do Model: um único $startTest atende os três testes
+        if self.model._communication_test_cache is None:
+            self.model._communication_test_cache = await self._test_communication_group()
+        return self.model._communication_test_cache
+
+    async def _test_communication_group(self) -> Dict[str, TestResult]:
+        """Envia $startTest com DCDC ligado e analisa a resposta, como Model._test_communication_group."""
+        if not self.transport:
+            return {name: TestResult(False, "Conexão serial não estabelecida")
+                    for name in ("inclinometro", "adc", "rak")}
+
+        try:
+            await self.initialize_system()
+            await self.send_batch([b'LIGBT', b'LIGDC'])
+            await asyncio.sleep(2)
+
+            response = ""
+            for attempt in range(2):
+                self.transport.clear()
+                self.transport.write(b'$startTest')
+                frame, _ = await self.transport.wait_for(lambda f: True, 30)
+                response = frame.text if frame else ""
+                if '$ok' in response and 'startTest' in response:
+                    break
+                print(f"[DEBUG] Tentativa {attempt + 1}: Resposta incompleta: {response}")
+
+            return self.model._parse_start_test(response)
+        except Exception as e:
+            print(f"[ERRO] Durante teste de comunicação: {e}")
+            return {
+                "inclinometro": TestResult(False, f"Erro no teste inclinômetro: {e}"),
+                "adc": TestResult(False, f"Erro no teste ADC: {e}"),
+                "rak": TestResult(False, f"Erro no teste RAK: {e}")
+            }
+
+    async def test_rtc_communication(self) -> TestResult:
+        """Teste de comunicação do RTC."""
+        if not self.transport:
+            return TestResult(False, "Conexão serial não estabelecida")
+
+        rail_5v_up = lambda r: r.adc_5v > 4.5
+        try:
+            await self.initialize_system()
+            await self.send_batch([b'LIGBT', b'LIGDC'])
+            await self.wait_settled(("adc_5v",), max_wait=5, samples=5, condition=rail_5v_up)
+            command = f"$cTime,{int(self.model.clock.time())}".encode()
+            response = ""
+
+            for attempt in range(3):
+                self.transport.clear()
+                self.transport.write(command * 3)
+                frame, _ = await self.transport.wait_for(lambda f: True, self.model.ser.timeout)
+                response = frame.text if frame else ""
+                if '$ok' in response.lower() and 'rtc' in response.lower():
+                    return TestResult(True, "Teste RTC: OK")
+
+                if attempt < 2:
+                    await self.initialize_system()
+                    await self.send_command(b'LIGBT')
+                    await self.wait_settled(("adc_5v",), max_wait=5, samples=5, condition=rail_5v_up)
+
+            return TestResult(False, f"Teste RTC: NG - resposta: {response}")
+        except Exception as e:
+            return TestResult(False, f"Erro no teste RTC: {e}")
+
+    async def test_serial_number_communication(self) -> TestResult:
+        """Teste de comunicação do Serial Number."""
+        if not self.transport:
+            return TestResult(False, "Conexão serial não estabelecida")
+
+        session = self.model.current_session
+        if not session or not session.numero_serie:
+            return TestResult(False, "Número de série não informado")
+
+        try:
+            self.transport.clear()
+            self.transport.write(f"$cSerialNumber,{session.numero_serie}".encode())
+            frame, skipped = await self.transport.wait_for(
+                lambda f: "$ok,serialnumber" in f.text.lower(), 30.0
+            )
+            if frame:
+                return TestResult(True, "Teste Serial Number: OK")
+            buffer = "\n".join(f.text for f in skipped)
+            return TestResult(False, f"Teste Serial Number: NG - resposta: {buffer}")
+        except Exception as e:
+            return TestResult(False, f"Erro no teste Serial Number: {e}")
+
+    # ═══════════════════════════════════════════════════════════════════
+    # TESTES LONGOS (implementação síncrona em thread auxiliar)
+    # ═══════════════════════════════════════════════════════════════════
+
+    async def _run_sync(self, method: Callable, *args, **kwargs):
+        """Executa um teste síncrono do Model numa thread, emprestando a porta."""
+        loop = asyncio.get_running_loop()
+        await self.transport.stop()
+        self.model.reader = SerialReader(self.model.ser, clock=self.model.clock,
+                                         cancel=self.model.cancel_token)
+        self.model.reader.start()
+        future = loop.run_in_executor(None, lambda: method(*args, **kwargs))
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # Task.cancel() não para a thread: o token do Model a interrompe na próxima espera
+            self.model.cancel()
+            try:
+                await future
+            except Cancelled:
+                pass
+            finally:
+                self.model.cancel_token.reset()
+            raise
+        finally:
+            await loop.run_in_executor(None, self.model.reader.stop)
+            self.model.reader = None
+            await self.transport.start()
+
+    async def test_pwm_sweep(self, use_enpth: bool = True, check_adc_load: bool = True) -> PWMSweepResult:
+        return await self._run_sync(self.model.test_pwm_sweep, use_enpth, check_adc_load)
+
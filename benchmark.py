@@ -0,0 +1,339 @@
+"""
+Benchmark do tempo de ciclo por placa contra o emulador.
+
+Roda o ``Controller.run_tests`` completo (sem interface) e cada ``Model.test_*``
+isoladamente contra uma placa emulada, e mede por passo: tempo de jiga (relógio
+do Model), tempo de CPU/parede, bytes trafegados na serial, comandos enviados,
+espera de ACK, leituras AQADC e tempo em sleep. O resultado é gravado em JSON
+para comparar execuções.
+
+Uso:
+    python benchmark.py [--out ARQUIVO.json] [--repeat N] [--compare ANTERIOR.json] [--real-time]
+
+Sem ``--real-time`` o emulador roda com relógio virtual: o tempo de jiga é o
+que a placa real levaria, e o tempo de parede mede só o custo em software.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from clock import VirtualClock, REAL_CLOCK
+from emulator import BoardConfig, BoardEmulator, EmulatedSerial
+from model import Model, ExcelLogger, POWER_OFF, PowerState
+from testplan import JT2302_PLAN
+from timing import Tracer
+from writer import default_writer
+
+RESULTS_DIR = os.path.join("log", "benchmarks")
+
+NUMERO_SERIE = "BENCH0000001"
+
+
+class CountingSerial:
+    """Repassa tudo para a porta e conta os bytes escritos/lidos por passo do tracer."""
+
+    def __init__(self, ser, tracer: Tracer):
+        self.ser = ser
+        self.tracer = tracer
+        self.tx: Dict[str, int] = defaultdict(int)
+        self.rx: Dict[str, int] = defaultdict(int)
+
+    def __getattr__(self, name):
+        return getattr(self.ser, name)
+
+    @property
+    def timeout(self):
+        return self.ser.timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        self.ser.timeout = value
+
+    def write(self, data: bytes) -> int:
+        self.tx[self.tracer.current_step or "-"] += len(data)
+        return self.ser.write(data)
+
+    def read(self, size: int = 1) -> bytes:
+        data = self.ser.read(size)
+        self.rx[self.tracer.current_step or "-"] += len(data)
+        return data
+
+
+class WallTimedTracer(Tracer):
+    """Tracer que também soma o tempo de parede de cada passo."""
+
+    def __init__(self, clock, enabled: bool = True):
+        super().__init__(clock, enabled)
+        self.wall: Dict[str, float] = defaultdict(float)
+
+    def clear(self):
+        super().clear()
+        self.wall = defaultdict(float)
+
+    @contextmanager
+    def step(self, name: str):
+        start = time.perf_counter()
+        try:
+            with super().step(name):
+                yield
+        finally:
+            self.wall[name] += time.perf_counter() - start
+
+
+class HeadlessView:
+    """View mínima para rodar o Controller sem interface."""
+
+    def __init__(self, numero_serie: str = NUMERO_SERIE):
+        self.numero_serie = numero_serie
+        self.messages: List[str] = []
+        self.results: Dict[str, bool] = {}
+        self.passed: Optional[bool] = None
+        self.duration: Optional[float] = None
+
+    def add_update(self, func: callable, *args) -> None:
+        func(*args)
+
+    def get_user_inputs(self) -> tuple:
+        return "benchmark", "emulador", self.numero_serie, False
+
+    def show_message(self, msg: str, error_tag: bool = False) -> None:
+        self.messages.append(msg)
+
+    def update_result_label(self, key: str, success: bool) -> None:
+        self.results[key] = success
+
+    def show_final_results(self, results_text: str, duration: float) -> None:
+        self.duration = duration
+
+    def show_test_result(self, msg: str, result: bool) -> None:
+        self.passed = result
+
+    def clear_result_label(self) -> None:
+        pass
+
+    def hide_final_results(self) -> None:
+        pass
+
+    def show_loading(self, show: bool = True) -> None:
+        pass
+
+    def toggle_connection(self, is_connected: bool) -> None:
+        pass
+
+
+class Bench:
+    """Um Model ligado a uma placa emulada nova, com tracer e contagem de bytes."""
+
+    def __init__(self, work_dir: str, config: Optional[BoardConfig] = None, virtual_time: bool = True):
+        self.clock = VirtualClock() if virtual_time else REAL_CLOCK
+        self.board = BoardEmulator(config, clock=self.clock)
+        self.model = Model(clock=self.clock, excel_logger=ExcelLogger(work_dir))
+        self.tracer = self.model.tracer = WallTimedTracer(self.clock)
+        self.port = CountingSerial(EmulatedSerial(self.board), self.tracer)
+        # Model.connect abre a porta por open_serial: aqui ela é a placa emulada
+        self.model.open_serial = lambda port: self.port
+
+    def close(self):
+        """Espera a gravação da sessão e fecha a base antes de o diretório de trabalho ser apagado."""
+        self.model.writer.flush()
+        self.model.excel_logger.close()
+
+    def report(self) -> Dict[str, Dict]:
+        """Métricas por passo (tempos em segundos)."""
+        steps = {}
+        for t in self.tracer.summary():
+            steps[t.step] = {
+                "fixture_time": round(t.total, 6),
+                "wall_time": round(self.tracer.wall.get(t.step, 0.0), 6),
+                "bytes_tx": self.port.tx.get(t.step, 0),
+                "bytes_rx": self.port.rx.get(t.step, 0),
+                "commands": t.commands,
+                "ack_wait": round(t.ack_wait, 6),
+                "adc_reads": t.adc_reads,
+                "adc_time": round(t.adc_time, 6),
+                "settle_time": round(t.settle_time, 6),
+                "sleep_time": round(t.sleep_time, 6),
+            }
+        return steps
+
+
+def bench_run_tests(work_dir: str, virtual_time: bool = True) -> Dict:
+    """Sessão completa pelo Controller.run_tests, sem interface."""
+    from controller import Controller
+
+    bench = Bench(work_dir, virtual_time=virtual_time)
+    view = HeadlessView()
+    controller = Controller(view, bench.model)
+
+    start = time.perf_counter()
+    fixture_start = bench.clock.monotonic()
+    controller.run_tests("emulador")
+    wall = time.perf_counter() - start
+    bench.close()
+
+    return {
+        "passed": bool(view.passed),
+        "fixture_time": round(bench.clock.monotonic() - fixture_start, 6),
+        "wall_time": round(wall, 6),
+        "bytes_tx": sum(bench.port.tx.values()),
+        "bytes_rx": sum(bench.port.rx.values()),
+        "steps": bench.report(),
+    }
+
+
+# Testes avulsos: (nome, método, estado de alimentação inicial)
+METHODS = [
+    (step.name, step.measure, step.requires) for step in JT2302_PLAN
+] + [
+    ("comunicacao_grupo", lambda m: m.test_inclinometro(), POWER_OFF),
+    ("test_rtc_communication", lambda m: m.test_rtc_communication(), POWER_OFF),
+    ("test_serial_number_communication", lambda m: m.test_serial_number_communication(), PowerState(battery=True)),
+]
+
+
+def bench_methods(work_dir: str, virtual_time: bool = True) -> Dict[str, Dict]:
+    """Cada teste numa placa emulada nova, partindo do estado de alimentação que ele exige."""
+    results = {}
+    for name, measure, requires in METHODS:
+        bench = Bench(work_dir, virtual_time=virtual_time)
+        model = bench.model
+        model.start_test_session(NUMERO_SERIE, "benchmark")
+        model.connect("emulador")
+        model.initialize_system()
+        if requires is not None:
+            model.set_power_state(requires)
+
+        bench.tracer.clear()
+        bench.port.tx.clear()
+        bench.port.rx.clear()
+        with bench.tracer.step(name):
+            measure(model)
+        model.disconnect()
+        bench.close()
+        results[name] = bench.report()[name]
+    return results
+
+
+def run(repeat: int = 1, virtual_time: bool = True) -> Dict:
+    """Roda o benchmark completo ``repeat`` vezes e junta os resultados."""
+    runs = []
+    with tempfile.TemporaryDirectory(prefix="jt2302_bench_") as work_dir:
+        for _ in range(repeat):
+            runs.append({
+                "run_tests": bench_run_tests(work_dir, virtual_time),
+                "methods": bench_methods(work_dir, virtual_time),
+            })
+        # Os logs e a base de resultados são gravados em segundo plano
+        default_writer().flush()
+
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "virtual_time": virtual_time,
+        "repeat": repeat,
+        "runs": runs,
+        "median": _median(runs),
+    }
+
+
+def _median(runs: List[Dict]) -> Dict:
+    """Mediana de cada métrica numérica entre as repetições."""
+    def merge(values: List):
+        first = values[0]
+        if isinstance(first, dict):
+            return {key: merge([v[key] for v in values if key in v]) for key in first}
+        if isinstance(first, bool) or not isinstance(first, (int, float)):
+            return first
+        ordered = sorted(values)
+        return ordered[len(ordered) // 2]
+    return merge(runs)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_report(result: Dict, baseline: Optional[Dict] = None):
+    """Tabela por passo; com ``baseline`` mostra a variação do tempo de jiga."""
+    median = result["median"]
+    base = baseline["median"] if baseline else None
+
+    def rows(title: str, steps: Dict[str, Dict], base_steps: Optional[Dict[str, Dict]]):
+        print(f"\n{title}")
+        header = (f"{'Passo':<34} {'Jiga(s)':>9} {'Parede(s)':>10} {'TX':>7} {'RX':>8} "
+                  f"{'Cmds':>5} {'ACK(s)':>7} {'AQADC':>6} {'Sleep(s)':>9}")
+        if base_steps is not None:
+            header += f" {'Δ Jiga':>9}"
+        print(header)
+        print("-" * len(header))
+        for name, s in steps.items():
+            line = (f"{name:<34} {s['fixture_time']:>9.2f} {s['wall_time']:>10.3f} {s['bytes_tx']:>7d} "
+                    f"{s['bytes_rx']:>8d} {s['commands']:>5d} {s['ack_wait']:>7.2f} {s['adc_reads']:>6d} "
+                    f"{s['sleep_time']:>9.2f}")
+            if base_steps is not None:
+                old = base_steps.get(name)
+                line += f" {s['fixture_time'] - old['fixture_time']:>+9.2f}" if old else f" {'novo':>9}"
+            print(line)
+
+    total = median["run_tests"]
+    print(f"Ciclo completo: {total['fixture_time']:.2f}s de jiga, {total['wall_time']:.3f}s de parede, "
+          f"{total['bytes_tx']} bytes TX / {total['bytes_rx']} bytes RX, "
+          f"{'OK' if total['passed'] else 'NG'}")
+    if base:
+        delta = total["fixture_time"] - base["run_tests"]["fixture_time"]
+        print(f"Variação do ciclo em relação à referência ({baseline.get('commit')}): {delta:+.2f}s")
+
+    rows("Controller.run_tests por passo", total["steps"], base["run_tests"]["steps"] if base else None)
+    rows("Testes avulsos", median["methods"], base["methods"] if base else None)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark do ciclo de teste JT2302 contra o emulador")
+    parser.add_argument("--out", help="arquivo JSON de saída (padrão: log/benchmarks/<data_hora>.json)")
+    parser.add_argument("--repeat", type=int, default=1, help="repetições (reporta a mediana)")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--real-time", action="store_true", help="emulador em tempo real em vez de relógio virtual")
+    args = parser.parse_args(argv)
+
+    # O Model imprime o andamento de cada teste; o benchmark mostra só o relatório
+    stdout = sys.stdout
+    with open(os.devnull, "w") as devnull:
+        sys.stdout = devnull
+        try:
+            result = run(repeat=max(1, args.repeat), virtual_time=not args.real_time)
+        finally:
+            sys.stdout = stdout
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    out = args.out or os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d_%H%M%S") + ".json")
+    if os.path.dirname(out):
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+
+    print_report(result, baseline)
+    print(f"\nResultado salvo em: {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
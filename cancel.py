@@ -0,0 +1,66 @@
+"""
+Cancelamento cooperativo dos testes.
+
+O ``Model`` tem um ``CancelToken``; todas as suas esperas (ACK, leituras,
+estabilização, temporizador do 5V, varreduras) passam por ele. Quando o operador
+cancela, a espera em andamento é interrompida na hora com ``Cancelled``.
+
+``Cancelled`` deriva de BaseException (como asyncio.CancelledError) para
+atravessar os ``except Exception`` dos testes sem virar um resultado NG.
+"""
+import threading
+from typing import Callable, List
+
+from clock import Clock
+
+
+class Cancelled(BaseException):
+    """A execução foi cancelada pelo operador."""
+
+
+class CancelToken:
+    """Sinal de cancelamento compartilhado entre a UI e a thread de testes."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self):
+        """Pede o cancelamento e acorda quem estiver esperando."""
+        self._event.set()
+        with self._lock:
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            callback()
+
+    def reset(self):
+        """Rearma o token para uma nova execução."""
+        self._event.clear()
+
+    def check(self):
+        """Levanta ``Cancelled`` se o cancelamento foi pedido."""
+        if self._event.is_set():
+            raise Cancelled()
+
+    def sleep(self, clock: Clock, seconds: float):
+        """Espera ``seconds`` no relógio dado, interrompendo na hora se cancelado."""
+        self.check()
+        if clock.is_virtual:
+            clock.sleep(seconds)
+        elif seconds > 0 and self._event.wait(seconds):
+            raise Cancelled()
+
+    def add_callback(self, callback: Callable[[], None]):
+        """Registra uma função chamada (na thread que cancelou) a cada ``cancel()``."""
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def remove_callback(self, callback: Callable[[], None]):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
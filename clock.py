@@ -0,0 +1,57 @@
+"""
+Relógios usados pelo Model, pela leitura serial e pelas esperas de estabilização.
+
+``Clock`` é o relógio real. ``VirtualClock`` avança instantaneamente a cada
+espera, permitindo rodar sessões contra o emulador mais rápido que o tempo real.
+"""
+import threading
+import time
+
+
+class Clock:
+    """Relógio real (time.time / time.monotonic / time.sleep)."""
+
+    is_virtual = False
+
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class VirtualClock(Clock):
+    """Relógio simulado: sleep() apenas avança o tempo, sem esperar de verdade."""
+
+    is_virtual = True
+
+    # Passo usado para avançar o tempo quando não há próximo evento conhecido
+    resolution = 0.0005
+
+    def __init__(self, start: float = 0.0, epoch: float = None):
+        self._now = start
+        self._epoch = time.time() if epoch is None else epoch
+        self._lock = threading.Lock()
+
+    def time(self) -> float:
+        return self._epoch + self._now
+
+    def monotonic(self) -> float:
+        return self._now
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            with self._lock:
+                self._now += seconds
+
+    def advance_to(self, instant: float):
+        """Avança o tempo até ``instant`` (monotônico), se estiver no futuro."""
+        with self._lock:
+            self._now = max(self._now, instant)
+
+
+REAL_CLOCK = Clock()
@@ -1,13 +1,24 @@
 import threading
-import time
 from view import View
-from model import Model, TestResult
+from model import Model
+from cancel import Cancelled
+from testplan import JT2302_PLAN, TestPlanRunner, pwm_summary_lines, ABORT_ON_SHORT
 
 
 class Controller:
-    def __init__(self):
-        self.view = View(self)
-        self.model = Model()
+    def __init__(self, view=None, model: Model = None):
+        # Sem argumentos cria a UI própria; o Station injeta uma view por jiga
+        self.view = view or View(self)
+        self.model = model or Model()
+        self.plan = JT2302_PLAN
+        self.profile = "completo"
+        # Placa em curto não segue para os demais testes (ver testplan.ABORT_POLICIES)
+        self.abort_policy = ABORT_ON_SHORT
+        self._running = False
+        # Tempos por passo de cada sessão (log/timing/<numero_serie>/) com
+        # "tempos_por_passo": true no config.json; um tracer já ligado (ex.: benchmark) fica ligado
+        if self.model.load_config().get("tempos_por_passo", False):
+            self.model.tracer.enabled = True
         
     def start(self):
         self.view.run()
@@ -30,16 +41,37 @@ class Controller:
         self.view.set_ports_available(portas)
 
     def cancel_btn_handler(self):
-        self.view.add_update(self.view.show_message, "Cancelamento não implementado ainda.")
+        if not self._running:
+            self.view.add_update(self.view.show_message, "Nenhum teste em andamento.")
+            return
+        self.view.add_update(self.view.show_message, "⛔ Cancelando teste...", True)
+        self.model.cancel()
+
+    def _on_session_saved(self, success: bool):
+        """Chamado pelo writer em segundo plano quando a sessão termina de ser gravada."""
+        if success:
+            self.view.add_update(self.view.show_message, "📊 Resultados salvos (log/resultados.db; planilha Excel atualizada em segundo plano)")
+        else:
+            self.view.add_update(self.view.show_message, "⚠️ Erro ao salvar os resultados", True)
 
     def compile_btn_handler(self):
-        self.view.add_update(self.view.show_message, "Compilação de logs ainda não implementada.")
+        threading.Thread(target=self._export_excel, daemon=True).start()
+
+    def _export_excel(self):
+        """Gera agora a planilha Excel com todo o histórico (inclui sessões ainda na fila do writer)."""
+        self.view.add_update(self.view.show_message, "Exportando planilha Excel...")
+        self.model.writer.flush()
+        if self.model.excel_logger.export_excel():
+            self.view.add_update(self.view.show_message, f"📊 Planilha exportada: {self.model.excel_logger.excel_file}")
+        else:
+            self.view.add_update(self.view.show_message, "⚠️ Erro ao exportar a planilha Excel", True)
 
     def run_tests(self, porta_serial: str):
         # Record start time
         self.view.clear_result_label()
-        start_time = time.time()
+        start_time = self.model.clock.monotonic()
         overall_success = True
+        cancelled = False
         final_results = []
         detailed_results = []  # Store all test details for display
 
@@ -55,9 +87,12 @@ class Controller:
             
             # Iniciar sessão de testes
             self.model.start_test_session(numero_serie, usuario)
+            self._running = True
             
             # Conecta à porta serial
-            if not self.model.connect(porta_serial):
+            with self.model.tracer.step("conexao"):
+                connected = self.model.connect(porta_serial)
+            if not connected:
                 self.view.add_update(self.view.show_message, "❌ Falha ao abrir a porta.", True)
                 overall_success = False
                 return
@@ -65,213 +100,90 @@ class Controller:
             self.view.add_update(self.view.show_message, "✅ Porta aberta com sucesso.")
             
             # Inicialização do sistema
-            if not self.model.initialize_system():
+            with self.model.tracer.step("inicializacao"):
+                initialized = self.model.initialize_system()
+                self.model.sleep(1)
+            if not initialized:
                 self.view.add_update(self.view.show_message, "❌ Falha na inicialização do sistema.", True)
                 overall_success = False
                 return
-            
-            time.sleep(1)
-
-            # Teste de curto na bateria
-            battery_result = self.model.test_battery_short()
-            self.model.update_test_result("teste_bateria_curto", battery_result.passed)
-            
-            if 'adc_batt' in battery_result.details:
-                adc_msg = f"Leitura ADC Bateria: {battery_result.details['adc_batt']:.3f}V"
-                self.view.add_update(self.view.show_message, adc_msg)
-                detailed_results.append(adc_msg)
-            
-            if battery_result.passed:
-                self.view.add_update(self.view.update_result_label, "bateria", True)
-                msg = "✅ Bateria operando normalmente."
-                self.view.add_update(self.view.show_message, msg)
-                detailed_results.append("Teste Curto Bateria: OK")
-            else:
-                self.view.add_update(self.view.update_result_label, "bateria", False)
-                msg = "🔴 Atenção: possível curto na bateria!"
-                self.view.add_update(self.view.show_message, msg, True)
-                detailed_results.append("Teste Curto Bateria: NG")
-                overall_success = False
-
-            # Teste de curto no DCDC
-            dcdc_result = self.model.test_dcdc_short()
-            self.model.update_test_result("teste_dcdc_curto", dcdc_result.passed)
-            
-            if 'adc_dcdc' in dcdc_result.details:
-                adc_msg = f"Leitura ADC DCDC: {dcdc_result.details['adc_dcdc']:.3f}V"
-                self.view.add_update(self.view.show_message, adc_msg)
-                detailed_results.append(adc_msg)
-            
-            if dcdc_result.passed:
-                self.view.add_update(self.view.update_result_label, "dcdc", True)
-                msg = "✅ DCDC operando normalmente."
-                self.view.add_update(self.view.show_message, msg)
-                detailed_results.append("Teste Curto DCDC: OK")
-            else:
-                self.view.add_update(self.view.update_result_label, "dcdc", False)
-                msg = "🔴 Atenção: possível curto no DCDC!"
-                self.view.add_update(self.view.show_message, msg, True)
-                detailed_results.append("Teste Curto DCDC: NG")
-                overall_success = False
-
-            # Teste DCDC e carga - separados na UI
-            teste1a_result, teste1b_result = self.model.test_dcdc_and_load()
-            self.model.update_test_result("teste1a", teste1a_result.passed)
-            self.model.update_test_result("teste1b", teste1b_result.passed)
-            
-            # Update UI status for each test separately
-            self.view.add_update(self.view.update_result_label, "teste1a", teste1a_result.passed)
-            self.view.add_update(self.view.update_result_label, "teste1b", teste1b_result.passed)
-
-            dcdc_load_success = teste1a_result.passed and teste1b_result.passed
-
-            if dcdc_load_success:
-                msg = "\n🟢 Testes DCDC e carga concluídos com sucesso!"
-                self.view.add_update(self.view.show_message, msg)
-            else:
-                msg = "\n🔴 Houve falha nos testes DCDC e carga."
-                self.view.add_update(self.view.show_message, msg)
-                overall_success = False
-
-            # Teste bateria isolada
-            battery_isolated_result = self.model.test_isolated_battery()
-            self.model.update_test_result("teste_bateria_isolada", battery_isolated_result.passed)
-            self.view.add_update(self.view.update_result_label, "bateria_isolada", battery_isolated_result.passed)
-            
-            # Add detailed results
-            detailed_results.append(f"Teste Bateria Isolada: {'OK' if battery_isolated_result.passed else 'NG'}")
-            if 'adc_batt' in battery_isolated_result.details:
-                detailed_results.append(f"  Batt: {battery_isolated_result.details['adc_batt']:.2f}V | DCDC: {battery_isolated_result.details.get('adc_dcdc', 0):.2f}V | Load: {battery_isolated_result.details.get('adc_load', 0):.2f}V")
-
-            # Testes de alarme de temperatura
-            temp_results = self.model.test_temperature_alarms()
-            temp_success = all(result.passed for result in temp_results.values() if isinstance(result, TestResult))
-            
-            # Registrar resultados dos testes de temperatura e atualizar UI
-            temp_mapping = {
-                "Teste4A": "temp_alarm1",
-                "Teste4B": "temp_return1", 
-                "Teste4C": "temp_alarm2",
-                "Teste4D": "temp_return2"
-            }
-            
-            for test_name, result in temp_results.items():
-                if isinstance(result, TestResult):
-                    self.model.update_test_result(test_name, result.passed)
-                    
-                    # Update UI status for each temperature test
-                    if test_name in temp_mapping:
-                        ui_key = temp_mapping[test_name]
-                        self.view.add_update(self.view.update_result_label, ui_key, result.passed)
-            
-            if temp_success:
-                msg = "✅ Testes de temperatura concluídos com sucesso."
-                self.view.add_update(self.view.show_message, msg)
-            else:
-                msg = "🔴 Falhas nos testes de temperatura."
-                self.view.add_update(self.view.show_message, msg)
-                overall_success = False
-    
-            # Teste PWM
-            pwm_result = self.model.test_pwm_variation(use_enpth=False, check_adc_load=False)
-            self.model.update_test_result("teste_pwm", pwm_result.is_valid())
-            self.view.add_update(self.view.update_result_label, "pwm", pwm_result.is_valid())
-
-            # Teste PWM PTH
-            pwm_pth_result = self.model.test_pwm_pth_variation(use_enpth=True, check_adc_load=True)
-            self.model.update_test_result("teste_pwm_pth", pwm_pth_result.is_valid())
-            self.model.update_pwm_results(pwm_pth_result)  # Salvar resultados PWM detalhados
-            self.view.add_update(self.view.update_result_label, "pwm_pth", pwm_pth_result.is_valid())
-
-            
-            if pwm_pth_result.is_valid():
-                self.view.add_update(self.view.show_message, f"{'Evento':<30} {'Valor':>10}")
-                self.view.add_update(self.view.show_message, "-" * 42)
-                
-                # Collect final results for display
-                final_results.append(f"{'Evento':<30} {'Valor':>10}")
-                final_results.append("-" * 42)
-                
-                if pwm_pth_result.duty_adc_at_load_alarm is not None:
-                    duty_msg = f"{'Duty Cycle no Alarme de Carga':<30} {pwm_pth_result.duty_adc_at_load_alarm:.1f}%"
-                    adc_msg = f"{'Tensão da Bateria no Alarme':<30} {pwm_pth_result.adc_batt_at_load_alarm:.2f} V"
-                    self.view.add_update(self.view.show_message, duty_msg)
-                    self.view.add_update(self.view.show_message, adc_msg)
-                    final_results.append(duty_msg)
-                    final_results.append(adc_msg)
-                
-                if pwm_pth_result.duty_adc5v_below5v is not None:
-                    duty5v_msg = f"{'Duty Cycle na Queda de 5V':<30} {pwm_pth_result.duty_adc5v_below5v:.1f}%"
-                    adc5v_msg = f"{'Tensão da Bateria em 5V':<30} {pwm_pth_result.adc_batt_at5v:.2f} V"
-                    self.view.add_update(self.view.show_message, duty5v_msg)
-                    self.view.add_update(self.view.show_message, adc5v_msg)
-                    final_results.append(duty5v_msg)
-                    final_results.append(adc5v_msg)
-                
-                if pwm_pth_result.duty_adc15v_below15v is not None:
-                    duty15v_msg = f"{'Duty Cycle na Queda de 15V':<30} {pwm_pth_result.duty_adc15v_below15v:.1f}%"
-                    adc15v_msg = f"{'Tensão da Bateria em 15V':<30} {pwm_pth_result.adc_batt_at15v:.2f} V"
-                    self.view.add_update(self.view.show_message, duty15v_msg)
-                    self.view.add_update(self.view.show_message, adc15v_msg)
-                    final_results.append(duty15v_msg)
-                    final_results.append(adc15v_msg)
-            else:
-                self.view.add_update(self.view.show_message, "🔴 Nenhuma queda detectada no range de duty.")
-                overall_success = False
-                final_results.append("🔴 Nenhuma queda detectada no range de duty.")
 
+            # Executa o plano de testes declarado em testplan.py
+            runner = TestPlanRunner(
+                self.model,
+                on_check=lambda check, passed: self.view.add_update(self.view.update_result_label, check.ui_key, passed),
+                on_message=lambda msg, error: self.view.add_update(self.view.show_message, msg, error),
+                abort_policy=self.abort_policy,
+            )
+            plan_result = runner.run(self.plan, self.profile)
+            overall_success = plan_result.success
+            detailed_results.extend(plan_result.details)
+
+            pwm_result = plan_result.raw.get("varredura_pwm")
+            if pwm_result is not None and pwm_result.load_alarm_valid():
+                final_results.extend(pwm_summary_lines(pwm_result))
+
+        except Cancelled:
+            self.view.add_update(self.view.show_message, "⛔ Teste cancelado pelo operador.", True)
+            overall_success = False
+            cancelled = True
         except Exception as e:
             self.view.add_update(self.view.show_message, f"Erro inesperado: {e}", True)
             overall_success = False
         finally:
-            # Calculate test duration
-            end_time = time.time()
-            duration = end_time - start_time
-            
-            # Finalizar sessão de testes e salvar na planilha Excel
-            excel_saved = self.model.finalize_test_session()
-            
-            # Hide loading indicator
-            self.view.add_update(self.view.show_loading, False)
-            # Prepare and show final results - only PWM technical data
-            pwm_details = []
-            
-            # Add only PWM measurement results (technical data only)
-            if final_results:
-                for result in final_results:
-                    # Skip headers and separators, only include actual measurements
-                    if not ('Evento' in result or 'Valor' in result or '─' in result or result.strip() == ''):
-                        # Only include lines with actual measurement data
-                        if any(x in result for x in ['Duty Cycle', 'Tensão da Bateria']):
-                            pwm_details.append(result)
-            
-            if pwm_details:
-                final_text = "\n".join(pwm_details)
-                self.view.add_update(self.view.show_final_results, final_text if overall_success else "NG", duration)
-            else:
-                # If no PWM data, show empty results
-                self.view.add_update(self.view.show_final_results, "NG", duration)
-            
-            # Informar sobre salvamento na planilha
-            if excel_saved:
-                self.view.add_update(self.view.show_message, "📊 Resultados salvos na planilha Excel (log/resultados_testes.xlsx)")
-            else:
-
-
-                self.view.add_update(self.view.show_message, "⚠️ Erro ao salvar na planilha Excel")
-            
-            # Desliga a placa
-            self.model.turnoff_system()
-            
-            # Desconecta do model
-            self.model.disconnect()
-            self.view.add_update(self.view.show_message, "Porta serial fechada.")
-            self.view.add_update(self.view.toggle_connection, False)
+            self._running = False
+            
+            # Rearma o token sempre: um cancelamento que chegue depois do fim do
+            # plano não pode interromper a desmontagem abaixo
+            self.model.cancel_token.reset()
+            try:
+                # Cancelado: desliga a jiga antes de qualquer outra coisa
+                if cancelled:
+                    self.model.power_down()
+                
+                # Calculate test duration
+                end_time = self.model.clock.monotonic()
+                duration = end_time - start_time
+                
+                # Finalizar sessão de testes; a gravação segue em segundo plano
+                session_queued = self.model.finalize_test_session(cancelled=cancelled, on_saved=self._on_session_saved)
+                
+                # Hide loading indicator
+                self.view.add_update(self.view.show_loading, False)
+                # Prepare and show final results - only PWM technical data
+                pwm_details = []
+                
+                # Add only PWM measurement results (technical data only)
+                if final_results:
+                    for result in final_results:
+                        # Skip headers and separators, only include actual measurements
+                        if not ('Evento' in result or 'Valor' in result or '─' in result or result.strip() == ''):
+                            # Only include lines with actual measurement data
+                            if any(x in result for x in ['Duty Cycle', 'Tensão da Bateria']):
+                                pwm_details.append(result)
+                
+                if pwm_details:
+                    final_text = "\n".join(pwm_details)
+                    self.view.add_update(self.view.show_final_results, final_text if overall_success else "NG", duration)
+                else:
+                    # If no PWM data, show empty results
+                    self.view.add_update(self.view.show_final_results, "NG", duration)
+                
+                # Desliga a placa
+                self.model.turnoff_system()
+            finally:
+                # Desconecta do model mesmo se a desmontagem falhar
+                self.model.disconnect()
+                self.view.add_update(self.view.show_message, "Porta serial fechada.")
+                self.view.add_update(self.view.toggle_connection, False)
 
             # Mostrar popup no fim, só uma vez
-            popup_message = "Todos os testes foram concluídos com sucesso!" if overall_success else "Houve falha em um ou mais testes."
-            if excel_saved:
-                popup_message += "\n\nResultados salvos na planilha Excel."
+            if cancelled:
+                popup_message = "Teste cancelado. A placa pode ser removida."
+            else:
+                popup_message = "Todos os testes foram concluídos com sucesso!" if overall_success else "Houve falha em um ou mais testes."
+            if session_queued:
+                popup_message += "\n\nResultados enviados para gravação."
             
             self.view.add_update(self.view.show_test_result, popup_message, overall_success)
 
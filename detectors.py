@@ -0,0 +1,202 @@
+"""
+Detectores de mudança para séries de leituras (ex.: |ADC_load - ADC_Batt|).
+
+Todos seguem a mesma interface: ``update(x)`` recebe uma amostra e retorna True
+quando a mudança é detectada. Depois da detecção, ``detected_at`` é o índice
+da amostra que disparou, ``onset`` o índice estimado de início da mudança e
+``delay`` o atraso de detecção em amostras. ``reset()`` prepara uma nova série.
+"""
+import math
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+
+class ChangeDetector(ABC):
+    """Base dos detectores: contagem de amostras e registro da detecção."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.index = -1
+        self.detected_at: Optional[int] = None
+        self.onset: Optional[int] = None
+
+    @property
+    def delay(self) -> Optional[int]:
+        """Amostras entre o início estimado da mudança e a detecção."""
+        if self.detected_at is None or self.onset is None:
+            return None
+        return self.detected_at - self.onset
+
+    def update(self, x: float) -> bool:
+        self.index += 1
+        if self.detected_at is not None:
+            return True
+        if self._step(x):
+            self.detected_at = self.index
+            if self.onset is None:
+                self.onset = self.index
+            return True
+        return False
+
+    @abstractmethod
+    def _step(self, x: float) -> bool:
+        """Processa uma amostra; True quando a mudança é detectada."""
+
+
+class ThresholdDetector(ChangeDetector):
+    """Dispara na primeira amostra acima do limiar."""
+
+    def __init__(self, threshold: float = 0.7):
+        self.threshold = threshold
+        super().__init__()
+
+    def _step(self, x: float) -> bool:
+        return x > self.threshold
+
+
+class EmaDetector(ChangeDetector):
+    """Média móvel exponencial acima do limiar (critério antigo do teste PTH)."""
+
+    def __init__(self, threshold: float = 0.7, alpha: float = 0.25):
+        self.threshold = threshold
+        self.alpha = alpha
+        super().__init__()
+
+    def reset(self):
+        super().reset()
+        self.ema: Optional[float] = None
+
+    def _step(self, x: float) -> bool:
+        self.ema = x if self.ema is None else self.alpha * x + (1 - self.alpha) * self.ema
+        if x <= self.threshold:
+            self.onset = None
+        elif self.onset is None:
+            self.onset = self.index
+        return self.ema > self.threshold
+
+
+class CusumDetector(ChangeDetector):
+    """
+    CUSUM unilateral: acumula (x - target - drift) e dispara quando a soma passa
+    de ``threshold``. O início da mudança é a última amostra em que a soma era zero.
+    """
+
+    def __init__(self, target: float = 0.0, drift: float = 0.35, threshold: float = 1.0):
+        self.target = target
+        self.drift = drift
+        self.threshold = threshold
+        super().__init__()
+
+    def reset(self):
+        super().reset()
+        self.sum = 0.0
+
+    def _step(self, x: float) -> bool:
+        self.sum = max(0.0, self.sum + x - self.target - self.drift)
+        if self.sum == 0.0:
+            self.onset = None
+        elif self.onset is None:
+            self.onset = self.index
+        return self.sum > self.threshold
+
+
+class MedianDetector(ChangeDetector):
+    """Mediana das últimas ``window`` amostras acima do limiar (robusta a picos isolados)."""
+
+    def __init__(self, threshold: float = 0.7, window: int = 3):
+        self.threshold = threshold
+        self.window = window
+        super().__init__()
+
+    def reset(self):
+        super().reset()
+        self._values = deque(maxlen=self.window)
+
+    def _step(self, x: float) -> bool:
+        self._values.append(x)
+        if x <= self.threshold:
+            self.onset = None
+        elif self.onset is None:
+            self.onset = self.index
+        ordered = sorted(self._values)
+        return ordered[len(ordered) // 2] > self.threshold
+
+
+class KalmanDetector(ChangeDetector):
+    """
+    Filtro de Kalman de nível local com detecção de degrau pela inovação.
+
+    Duas inovações seguidas maiores que ``gate`` desvios-padrão, no mesmo
+    sentido, são tratadas como degrau e a estimativa salta para a medida (um
+    pico isolado é ignorado). Dispara quando a estimativa passa do limiar.
+    """
+
+    def __init__(self, threshold: float = 0.7, process_var: float = 1e-4,
+                 measurement_var: float = 1e-3, gate: float = 4.0):
+        self.threshold = threshold
+        self.process_var = process_var
+        self.measurement_var = measurement_var
+        self.gate = gate
+        super().__init__()
+
+    def reset(self):
+        super().reset()
+        self.estimate: Optional[float] = None
+        self.variance = 0.0
+        self._outlier_sign = 0
+
+    def _step(self, x: float) -> bool:
+        if self.estimate is None:
+            self.estimate, self.variance = x, self.measurement_var
+        else:
+            predicted_var = self.variance + self.process_var
+            innovation = x - self.estimate
+            innovation_var = predicted_var + self.measurement_var
+            if abs(innovation) > self.gate * math.sqrt(innovation_var):
+                sign = 1 if innovation > 0 else -1
+                if sign == self._outlier_sign:
+                    self.estimate, self.variance = x, self.measurement_var
+                    self._outlier_sign = 0
+                else:
+                    self._outlier_sign = sign
+            else:
+                self._outlier_sign = 0
+                gain = predicted_var / innovation_var
+                self.estimate += gain * innovation
+                self.variance = (1 - gain) * predicted_var
+
+        if x <= self.threshold:
+            self.onset = None
+        elif self.onset is None:
+            self.onset = self.index
+        return self.estimate > self.threshold
+
+
+@dataclass
+class Detection:
+    """Resultado de um detector aplicado a uma série completa."""
+    detected_at: int
+    onset: int
+    delay: int
+
+
+def run_detector(detector: ChangeDetector, values: Iterable[float]) -> Optional[Detection]:
+    """Aplica um detector a uma série (ex.: coluna de uma curva gravada) e retorna a detecção."""
+    detector.reset()
+    for x in values:
+        if detector.update(float(x)):
+            return Detection(detector.detected_at, detector.onset, detector.delay)
+    return None
+
+
+DETECTORS = {
+    "threshold": ThresholdDetector,
+    "ema": EmaDetector,
+    "cusum": CusumDetector,
+    "median": MedianDetector,
+    "kalman": KalmanDetector,
+}
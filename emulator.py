@@ -0,0 +1,433 @@
+"""
+Emulador em software da placa JT2302 e do firmware da jiga.
+
+Fala o mesmo protocolo usado pelo Model (comandos de relé, FR1D<duty>, AQADC,
+$startTest, $cTime, $cSerialNumber) para permitir medir e perfilar mudanças
+de temporização sem ocupar uma jiga da linha.
+
+Uso como porta virtual (Linux):
+    python emulator.py
+e informe na interface a porta impressa (ex.: /dev/pts/5).
+
+Uso no próprio processo, com relógio virtual (mais rápido que o tempo real):
+    model = emulated_model()
+"""
+import math
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from adc import CHANNELS, DEFAULT_GAINS
+from clock import Clock, VirtualClock, REAL_CLOCK
+
+
+# Mesma calibração do Model: volts por contagem de cada canal
+CHANNEL_GAINS = dict(zip(CHANNELS, DEFAULT_GAINS.tolist()))
+
+ACK = b'RXACKOK\r\n'
+
+_COMMAND = re.compile(
+    rb'FR1D\d+(?:\.\d+)?'
+    rb'|\$cTime,\d+'
+    rb'|\$cSerialNumber,[0-9A-Za-z]*'
+    rb'|\$startTest'
+    rb'|AQADC|LIGBT|DESBT|LIGDC|DESDC|LIGCB|DESCB|ACLOAD|DGLOAD'
+    rb'|ACTP1|ACTP2|ACTPA|ENPTH|DGPTH'
+)
+
+
+@dataclass
+class BoardConfig:
+    """Modelo elétrico da placa emulada. Tensões em volts, tempos em segundos."""
+    # Fonte PWM que emula a bateria: V = pwm_gain * duty + pwm_offset
+    pwm_gain: float = 0.4293
+    pwm_offset: float = -6.1
+    battery_voltage: float = 25.3
+    dcdc_voltage: float = 25.3
+    batt_charged_voltage: float = 29.1
+    batt_charging_voltage: float = 27.1
+    stepup_voltage: float = 29.6
+    cf_voltage: float = 13.18
+    # Limiares (tensão de bateria) em que cada evento acontece
+    load_alarm_voltage: float = 20.9        # ~62.9% de duty
+    load_reconnect_voltage: float = 22.0
+    rail_5v_min_voltage: float = 23.2       # ~69.0% de duty
+    rail_15v_min_voltage: float = 22.66     # ~67.0% de duty
+    # Com brown-out, a queda do 15V derruba a placa: 5V e 15V só voltam após religar o DCDC
+    rail_brownout: bool = False
+    # Latência da placa: tempo abaixo do limiar até o alarme de carga / a queda dos trilhos
+    load_alarm_delay: float = 0.0
+    rail_drop_delay: float = 0.0
+    # Dinâmica
+    baudrate: int = 115200
+    command_latency: float = 0.001
+    adc_latency: float = 0.004
+    dcdc_boot_delay: float = 16.0
+    settle_tau: float = 0.02
+    dcdc_discharge_tau: float = 0.35
+    noise_counts: float = 1.0
+    seed: int = 0
+    # Defeitos
+    battery_short: bool = False
+    dcdc_short: bool = False
+    rtc_ok: bool = True
+    comm_status: Optional[Dict[str, bool]] = None
+
+    def pwm_voltage(self, duty: float) -> float:
+        return max(0.0, self.pwm_gain * duty + self.pwm_offset)
+
+    def response_delay(self, request: bytes, response: bytes) -> float:
+        """Tempo entre o comando chegar e a resposta terminar de ser transmitida."""
+        processing = self.adc_latency if b'AQADC' in request else self.command_latency
+        return processing + len(request + response) * 10 / self.baudrate
+
+
+class BoardEmulator:
+    """Estado e respostas da placa emulada."""
+
+    def __init__(self, config: Optional[BoardConfig] = None, clock: Clock = REAL_CLOCK):
+        self.config = config or BoardConfig()
+        self.clock = clock
+        self._rng = random.Random(self.config.seed)
+
+        # Estado dos relés e do PWM
+        self.battery = False
+        self.dcdc = False
+        self.charge = False
+        self.load = False
+        self.pth = False
+        self.duty = 0.0
+        self.temp_alarm = False
+        self.load_alarm = False
+        self.serial_number = ""
+        self.rtc_time: Optional[int] = None
+
+        self._dcdc_on_at: Optional[float] = None
+        self._browned_out = False
+        self._below_since: Dict[str, float] = {}
+        self._values = {name: 0.0 for name in CHANNEL_GAINS}
+        self._updated_at = self.clock.monotonic()
+        self.commands: List[bytes] = []
+
+    # ─────────────────────────────────────────────────
+    #  Protocolo
+    # ─────────────────────────────────────────────────
+
+    def feed(self, data: bytes) -> bytes:
+        """Processa um bloco recebido e retorna a resposta da placa."""
+        response = b''
+        pos = 0
+        while pos < len(data):
+            match = _COMMAND.match(data, pos)
+            if not match:
+                pos += 1
+                continue
+            response += self.handle(match.group(0))
+            pos = match.end()
+        return response
+
+    def handle(self, command: bytes) -> bytes:
+        """Executa um comando e retorna a resposta."""
+        self.commands.append(command)
+        self._update()
+
+        if command == b'AQADC':
+            return self._adc_frame()
+        if command.startswith(b'$'):
+            return self._handle_dut(command)
+        if command.startswith(b'FR1D'):
+            self.duty = float(command[4:])
+        elif command == b'LIGBT':
+            self.battery = True
+        elif command == b'DESBT':
+            self.battery = False
+        elif command == b'LIGDC':
+            if not self.dcdc:
+                self._dcdc_on_at = self.clock.monotonic()
+            self.dcdc = True
+        elif command == b'DESDC':
+            self.dcdc = False
+            self._dcdc_on_at = None
+        elif command == b'LIGCB':
+            self.charge = True
+        elif command == b'DESCB':
+            self.charge = False
+        elif command == b'ACLOAD':
+            self.load = True
+        elif command == b'DGLOAD':
+            self.load = False
+        elif command in (b'ACTP1', b'ACTP2'):
+            self.temp_alarm = True
+        elif command == b'ACTPA':
+            self.temp_alarm = False
+        elif command == b'ENPTH':
+            self.pth = True
+        elif command == b'DGPTH':
+            self.pth = False
+        return ACK
+
+    def _handle_dut(self, command: bytes) -> bytes:
+        # Comandos $ são respondidos pelo firmware da placa, que precisa do 5V
+        if self._targets()["adc_5v"] < 4.5:
+            return b''
+        if command == b'$startTest':
+            status = self.config.comm_status or {"rak": True, "inc": True, "adc": True}
+            parts = ",".join(f"{name},{'ok' if ok else 'fail'}" for name, ok in status.items())
+            return f"$ok,startTest,{parts}\r\n".encode()
+        if command.startswith(b'$cTime,'):
+            if not self.config.rtc_ok:
+                return b'$error,rtc\r\n'
+            self.rtc_time = int(command.split(b',')[1])
+            return b'$ok,rtc\r\n'
+        if command.startswith(b'$cSerialNumber,'):
+            self.serial_number = command.split(b',', 1)[1].decode()
+            return b'$ok,serialNumber\r\n'
+        return b''
+
+    # ─────────────────────────────────────────────────
+    #  Modelo elétrico
+    # ─────────────────────────────────────────────────
+
+    def dcdc_booted(self) -> bool:
+        return (self.dcdc and self._dcdc_on_at is not None
+                and self.clock.monotonic() - self._dcdc_on_at >= self.config.dcdc_boot_delay)
+
+    def _held(self, name: str, active: bool, delay: float) -> bool:
+        """True se `active` vale continuamente há pelo menos `delay` segundos."""
+        if not active:
+            self._below_since.pop(name, None)
+            return False
+        since = self._below_since.setdefault(name, self.clock.monotonic())
+        return self.clock.monotonic() - since >= delay
+
+    def _targets(self) -> Dict[str, float]:
+        """Tensões de regime para o estado atual."""
+        cfg = self.config
+
+        if self.dcdc_booted():
+            batt = cfg.batt_charging_voltage if self.charge else cfg.batt_charged_voltage
+        elif self.battery:
+            batt = cfg.battery_voltage
+        elif self.duty > 0:
+            batt = cfg.pwm_voltage(self.duty)
+        else:
+            batt = 0.0
+        if cfg.battery_short and self.battery:
+            batt = 0.0
+
+        # Alarme de carga (subtensão) com histerese, pela tensão atual da bateria
+        # (não pela de regime): o alarme só dispara quando a bateria cruza o limiar
+        # e fica abaixo dele por load_alarm_delay
+        batt_now = self._values["adc_batt"]
+        if self._held("load", batt_now < cfg.load_alarm_voltage, cfg.load_alarm_delay):
+            self.load_alarm = True
+        elif batt_now >= cfg.load_reconnect_voltage:
+            self.load_alarm = False
+
+        if self.load_alarm or self.temp_alarm:
+            load = 3.0 if batt > 0 else 0.0
+        else:
+            load = max(0.0, batt - 0.08)
+
+        rail_5v_low = self._held("5v", batt < cfg.rail_5v_min_voltage, cfg.rail_drop_delay)
+        rail_15v_low = self._held("15v", batt < cfg.rail_15v_min_voltage, cfg.rail_drop_delay)
+
+        booted = self.dcdc_booted()
+        if booted:
+            self._browned_out = False
+        elif cfg.rail_brownout and 0 < batt and rail_15v_low and batt_now < cfg.rail_15v_min_voltage:
+            self._browned_out = True
+        rails_up = not self._browned_out
+
+        dcdc = cfg.dcdc_voltage if self.dcdc and not cfg.dcdc_short else 0.0
+        if self.charge and booted:
+            dcdc -= 0.5
+
+        return {
+            "adc_15v": 15.0 if rails_up and not rail_15v_low else batt * 0.6,
+            "adc_5v": 5.0 if rails_up and not rail_5v_low else min(batt * 0.15, 3.0),
+            "adc_load": load,
+            "adc_dcdc": dcdc,
+            "adc_batt": batt,
+            "adc_cf": cfg.cf_voltage if self.charge and booted else 0.2,
+            "adc_pwm": self.duty * 0.15,
+            "adc_stepup": cfg.stepup_voltage if booted else 0.0,
+            "adc_leit_corr": 0.1,
+        }
+
+    def _update(self):
+        """Aproxima cada canal do valor de regime (resposta de 1ª ordem)."""
+        now = self.clock.monotonic()
+        dt = max(0.0, now - self._updated_at)
+        self._updated_at = now
+        for name, target in self._targets().items():
+            tau = self.config.settle_tau
+            if name == "adc_dcdc" and target < self._values[name]:
+                tau = self.config.dcdc_discharge_tau
+            alpha = 1.0 - math.exp(-dt / tau) if tau > 0 else 1.0
+            self._values[name] += (target - self._values[name]) * alpha
+
+    def voltages(self) -> Dict[str, float]:
+        """Tensões atuais de todos os canais."""
+        self._update()
+        return dict(self._values)
+
+    def _adc_frame(self) -> bytes:
+        fields = []
+        for name, volts in self._values.items():
+            counts = volts / CHANNEL_GAINS[name] + self._rng.gauss(0.0, self.config.noise_counts)
+            fields.append(f"{min(max(int(round(counts)), 0), 4095):05d}")
+        return ("#" + ",".join(fields) + "\r\n").encode()
+
+
+class EmulatedSerial:
+    """Porta serial em memória ligada a um BoardEmulator (mesma interface usada do pyserial)."""
+
+    def __init__(self, board: Optional[BoardEmulator] = None, timeout: float = 2.0):
+        self.board = board or BoardEmulator()
+        self.timeout = timeout
+        self.port = "emulator"
+        self.is_open = True
+        self._rx = bytearray()
+        # Respostas em trânsito: (instante em que ficam disponíveis, bytes)
+        self._pending: List[tuple] = []
+        self._cond = threading.Condition()
+        self._cancelled = False
+
+    def _now(self) -> float:
+        return self.board.clock.monotonic()
+
+    def _deliver(self):
+        now = self._now()
+        while self._pending and self._pending[0][0] <= now:
+            self._rx += self._pending.pop(0)[1]
+
+    @property
+    def in_waiting(self) -> int:
+        with self._cond:
+            self._deliver()
+            return len(self._rx)
+
+    def next_ready_at(self) -> Optional[float]:
+        """Instante em que a próxima resposta em trânsito fica disponível."""
+        with self._cond:
+            return self._pending[0][0] if self._pending else None
+
+    def write(self, data: bytes) -> int:
+        if not self.is_open:
+            raise OSError("porta fechada")
+        response = self.board.feed(bytes(data))
+        if response:
+            with self._cond:
+                last = self._pending[-1][0] if self._pending else self._now()
+                ready_at = max(last, self._now()) + self.board.config.response_delay(data, response)
+                self._pending.append((ready_at, response))
+                self._cond.notify_all()
+        return len(data)
+
+    def read(self, size: int = 1) -> bytes:
+        if not self.is_open:
+            raise OSError("porta fechada")
+        deadline = self._now() + self.timeout
+        with self._cond:
+            self._deliver()
+            while not self._rx and not self._cancelled:
+                now = self._now()
+                if now >= deadline:
+                    break
+                wake = self._pending[0][0] if self._pending else deadline
+                self._cond.wait(min(wake, deadline) - now)
+                self._deliver()
+            self._cancelled = False
+            data = bytes(self._rx[:size])
+            del self._rx[:size]
+            return data
+
+    def reset_input_buffer(self):
+        with self._cond:
+            self._deliver()
+            self._rx.clear()
+
+    def cancel_read(self):
+        with self._cond:
+            self._cancelled = True
+            self._cond.notify_all()
+
+    def close(self):
+        self.cancel_read()
+        self.is_open = False
+
+
+class PtyEmulator:
+    """Expõe um BoardEmulator num pseudo-terminal que o Model.connect consegue abrir (POSIX)."""
+
+    def __init__(self, board: Optional[BoardEmulator] = None):
+        import pty
+        import tty
+
+        self.board = board or BoardEmulator()
+        self._master, self._slave = pty.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="PtyEmulator", daemon=True)
+
+    def start(self) -> "PtyEmulator":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        os.close(self._master)
+        os.close(self._slave)
+
+    def _run(self):
+        import select
+
+        while not self._stop.is_set():
+            try:
+                ready, _, _ = select.select([self._master], [], [], 0.1)
+                if not ready:
+                    continue
+                data = os.read(self._master, 4096)
+            except OSError:
+                break
+            response = self.board.feed(data)
+            if response:
+                self.board.clock.sleep(self.board.config.response_delay(data, response))
+                os.write(self._master, response)
+
+
+def emulated_model(config: Optional[BoardConfig] = None, virtual_time: bool = True,
+                   log_dir: Optional[str] = None):
+    """Cria um Model já conectado a uma placa emulada em memória.
+
+    Com ``virtual_time`` todas as esperas avançam um VirtualClock em vez de
+    dormir, e uma sessão completa roda em frações de segundo.
+
+    Resultados, curvas e eventos vão para ``log_dir``; sem ele, para um
+    diretório temporário, nunca para o ``log/`` de produção.
+    """
+    from model import Model, ExcelLogger
+
+    if log_dir is None:
+        log_dir = tempfile.mkdtemp(prefix="jt2302_emulador_")
+    clock = VirtualClock() if virtual_time else REAL_CLOCK
+    model = Model(clock=clock, excel_logger=ExcelLogger(log_dir))
+    model.attach(EmulatedSerial(BoardEmulator(config, clock=clock)))
+    return model
+
+
+if __name__ == "__main__":
+    emulator = PtyEmulator().start()
+    print(f"Emulador JT2302 em {emulator.port} (Ctrl+C para sair)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        emulator.stop()
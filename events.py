@@ -0,0 +1,211 @@
+"""
+Log estruturado de eventos dos testes (JSON Lines).
+
+Substitui o ``resultado_teste.txt``: cada medição registrada vira uma linha JSON
+com o id da sessão, o número de série, a chave do teste, o resultado, todos os
+canais do ADC e os instantes (relógio monotônico do Model e data/hora local).
+Uma placa é filtrada com ``grep`` pelo número de série ou lida com ``read_events``.
+
+As linhas vão para o ``BackgroundWriter`` (agrupadas e gravadas em segundo
+plano). O segmento ativo é ``log/eventos/eventos_<data_hora>.jsonl``; ao passar
+de ``max_bytes`` ou ao virar o dia, ele é fechado e comprimido em ``.jsonl.gz``
+e um novo segmento é aberto. ``record`` devolve o segmento e a posição (em bytes,
+descomprimida) da linha, para localizar o evento depois sem varrer o log.
+"""
+import gzip
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from writer import BackgroundWriter, default_writer
+
+EVENT_DIR = os.path.join("log", "eventos")
+
+PREFIX = "eventos_"
+SUFFIX = ".jsonl"
+COMPRESSED_SUFFIX = ".jsonl.gz"
+
+
+class EventLog:
+    """Log JSONL com rotação por tamanho ou por dia e compressão dos segmentos fechados."""
+
+    def __init__(self, directory: str = EVENT_DIR, writer: Optional[BackgroundWriter] = None,
+                 max_bytes: int = 10 * 1024 * 1024, rotate_daily: bool = True, compress: bool = True):
+        self.directory = directory
+        self.writer = writer or default_writer()
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        self.compress = compress
+        self._lock = threading.Lock()
+        self._segment: Optional[str] = None
+        self._size = 0
+        self._day = None
+        os.makedirs(directory, exist_ok=True)
+        self._resume()
+
+    def _resume(self):
+        """Continua o segmento ativo de uma execução anterior; comprime os que ficaram para trás."""
+        active = sorted(f for f in os.listdir(self.directory) if f.startswith(PREFIX) and f.endswith(SUFFIX))
+        for name in active[:-1]:
+            self.writer.submit(lambda name=name: self._close_segment(name))
+        if active:
+            path = os.path.join(self.directory, active[-1])
+            self._segment = active[-1]
+            self._size = os.path.getsize(path)
+            self._day = datetime.fromtimestamp(os.path.getmtime(path)).date()
+
+    # ─────────────────────────────────────────────────
+    #  Gravação
+    # ─────────────────────────────────────────────────
+
+    def record(self, event: str, monotonic: float, session_id: Optional[str] = None,
+               numero_serie: Optional[str] = None, status: Optional[str] = None,
+               values: Optional[Dict] = None, **fields) -> Tuple[str, int]:
+        """
+        Enfileira um evento e retorna (segmento, posição) da linha.
+
+        ``monotonic`` é o instante no relógio do Model; ``values`` são os canais
+        medidos; ``fields`` vão para o registro como estão.
+        """
+        now = datetime.now()
+        record = {
+            "t": round(monotonic, 6),
+            "horario": now.isoformat(timespec="milliseconds"),
+            "sessao": session_id,
+            "numero_serie": numero_serie,
+            "evento": event,
+        }
+        if status is not None:
+            record["status"] = status
+        if values:
+            record["valores"] = {k: _round(v) for k, v in values.items()}
+        record.update(fields)
+        # ASCII puro: o tamanho em bytes é o número de caracteres
+        line = json.dumps(record, default=str) + "\n"
+
+        with self._lock:
+            if self._should_rotate(now, len(line)):
+                self._rotate(now)
+            segment, offset = self._segment, self._size
+            self._size += len(line)
+            self.writer.append(os.path.join(self.directory, segment), line)
+        return segment, offset
+
+    def _should_rotate(self, now: datetime, size: int) -> bool:
+        if self._segment is None:
+            return True
+        if self.rotate_daily and now.date() != self._day:
+            return True
+        return self._size > 0 and self._size + size > self.max_bytes
+
+    def _rotate(self, now: datetime):
+        previous = self._segment
+        name = PREFIX + now.strftime("%Y%m%d_%H%M%S_%f") + SUFFIX
+        self._segment, self._size, self._day = name, 0, now.date()
+        if previous is not None:
+            # Na thread do writer: as linhas já enfileiradas do segmento anterior são gravadas antes
+            self.writer.submit(lambda: self._close_segment(previous))
+
+    def _close_segment(self, name: str):
+        # Roda na thread do writer, que é a dona do arquivo aberto
+        path = os.path.join(self.directory, name)
+        self.writer.release(path)
+        if not self.compress or not os.path.exists(path):
+            return
+        try:
+            with open(path, "rb") as src, gzip.open(path[:-len(SUFFIX)] + COMPRESSED_SUFFIX, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(path)
+        except OSError as e:
+            print(f"Erro ao comprimir o log de eventos {path}: {e}")
+
+    # ─────────────────────────────────────────────────
+    #  Leitura
+    # ─────────────────────────────────────────────────
+
+    def segments(self) -> List[str]:
+        """Segmentos do log, do mais antigo ao mais recente."""
+        return sorted(f for f in os.listdir(self.directory)
+                      if f.startswith(PREFIX) and (f.endswith(SUFFIX) or f.endswith(COMPRESSED_SUFFIX)))
+
+    def read_at(self, segment: str, offset: int) -> Optional[Dict]:
+        """Evento na posição retornada por ``record`` (o segmento pode já ter sido comprimido)."""
+        path = os.path.join(self.directory, segment)
+        if not os.path.exists(path):
+            path = path[:-len(SUFFIX)] + COMPRESSED_SUFFIX
+        with _open_segment(path) as f:
+            f.seek(offset)
+            line = f.readline()
+        return json.loads(line) if line.strip() else None
+
+
+def read_events(directory: str = EVENT_DIR, numero_serie: Optional[str] = None,
+                session_id: Optional[str] = None) -> Iterator[Dict]:
+    """Percorre todos os segmentos, opcionalmente filtrando por número de série ou sessão."""
+    names = sorted(f for f in os.listdir(directory) if f.startswith(PREFIX))
+    for name in names:
+        with _open_segment(os.path.join(directory, name)) as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue  # linha truncada por queda de energia
+                if numero_serie is not None and event.get("numero_serie") != numero_serie:
+                    continue
+                if session_id is not None and event.get("sessao") != session_id:
+                    continue
+                yield event
+
+
+def read_session(directory: str, segment: str, offset: int, session_id: Optional[str]) -> Iterator[Dict]:
+    """
+    Eventos de uma sessão a partir da posição do seu primeiro evento.
+
+    Lê só do segmento indicado em diante (a sessão pode ter atravessado uma
+    rotação) e para no evento ``sessao_fim``.
+    """
+    if not os.path.isdir(directory):
+        return
+    stem = segment[:-len(SUFFIX)] if segment.endswith(SUFFIX) else segment
+    names = sorted(f for f in os.listdir(directory) if f.startswith(PREFIX))
+    names = [name for name in names if name.split(".")[0] >= stem]
+    for i, name in enumerate(names):
+        with _open_segment(os.path.join(directory, name)) as f:
+            if i == 0 and name.split(".")[0] == stem:
+                f.seek(offset)
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if event.get("sessao") != session_id:
+                    continue
+                yield event
+                if event.get("evento") == "sessao_fim":
+                    return
+
+
+def _open_segment(path: str):
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+
+def _round(value):
+    if isinstance(value, float):
+        return round(value, 4) if value == value else None  # NaN não é JSON válido
+    return value
+
+
+_shared: Dict[str, EventLog] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_event_log(directory: str = EVENT_DIR, writer: Optional[BackgroundWriter] = None) -> EventLog:
+    """Um EventLog por diretório no processo (as jigas da estação gravam no mesmo log)."""
+    key = os.path.abspath(directory)
+    with _shared_lock:
+        if key not in _shared:
+            _shared[key] = EventLog(directory, writer)
+        return _shared[key]
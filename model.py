@@ -1,16 +1,28 @@
 import serial
 import serial.tools.list_ports
-import time
 import os
 import json
+import uuid
+import atexit
 import numpy as np
-import pandas as pd
+from collections import deque
 from datetime import datetime
-from dataclasses import dataclass
-from typing import Dict, Tuple, List, Optional
+from dataclasses import dataclass, asdict, field
+from typing import Callable, Dict, Tuple, List, Optional
+from serial_io import SerialReader, CaptureSerial, FRAME_ACK, FRAME_ADC
+from adc import AdcDecoder, SampleBuffer, gain_vector
+from sweep import find_thresholds, warm_start_hints
+from detectors import ChangeDetector, MedianDetector
+from traces import TraceStore
+from results import ResultsStore, PeriodicExport, SessionRecord
+from clock import Clock, REAL_CLOCK
+from cancel import CancelToken
+from timing import Tracer, write_json, COMMAND, ACK, ADC, SETTLE, SLEEP
+from writer import BackgroundWriter, default_writer
+from events import EventLog, shared_event_log
 
 
-@dataclass
+@dataclass(slots=True)
 class ADCReading:
     """Representa uma leitura dos ADCs."""
     adc_15v: float = 0.0
@@ -62,6 +74,149 @@ class PWMTestResultPTH(PWMTestResult):
         ])
 
 
+class PWMSweepResult(PWMTestResultPTH):
+    """
+    Resultado da varredura PWM (quedas de 5V/15V e alarme de carga).
+
+    As quedas de 5V e 15V são medidas com PTH desligado e sem carga, como no
+    antigo teste PWM. Antes da varredura, as colunas Duty_Cycle_Queda_5V/15V
+    da planilha vinham do teste PWM PTH (PTH e carga acionados): sessões
+    antigas e novas não são diretamente comparáveis nessas duas colunas.
+    """
+
+    def rails_valid(self) -> bool:
+        """Critério do antigo teste PWM: tensão da bateria nas quedas de 5V e 15V."""
+        if self.adc_batt_at5v is None or self.adc_batt_at15v is None:
+            return False
+        return 22.5 < self.adc_batt_at15v < 22.9 and 22.9 < self.adc_batt_at5v < 23.5
+
+    def load_alarm_valid(self) -> bool:
+        """Critério do antigo teste PWM PTH: tensão da bateria no alarme de carga."""
+        return self.adc_batt_at_load_alarm is not None and self.is_valid()
+
+
+@dataclass(frozen=True)
+class PowerState:
+    """Estado das fontes da jiga (bateria, DCDC, circuito de carga e carga)."""
+    battery: bool = False
+    dcdc: bool = False
+    charge: bool = False
+    load: bool = False
+
+    COMMANDS = {
+        "battery": (b'LIGBT\r', b'DESBT\r'),
+        "dcdc": (b'LIGDC\r', b'DESDC\r'),
+        "charge": (b'LIGCB\r', b'DESCB\r'),
+        "load": (b'ACLOAD\r', b'DGLOAD\r'),
+    }
+
+    def commands(self) -> List[bytes]:
+        """Comandos que levam a jiga a este estado, partindo de qualquer outro."""
+        return [self.COMMANDS[name][0 if getattr(self, name) else 1] for name in self.COMMANDS]
+
+    def distance(self, other: "PowerState") -> int:
+        """Número de fontes que mudam entre os dois estados."""
+        return sum(getattr(self, name) != getattr(other, name) for name in self.COMMANDS)
+
+
+POWER_OFF = PowerState()
+
+
+class FixtureState:
+    """
+    Último estado conhecido dos relés e do PWM da jiga.
+
+    Cada comando confirmado por ACK atualiza o estado. Um campo começa
+    desconhecido (None) e volta a ficar desconhecido quando um comando que o
+    altera fica sem ACK. Comando que não mudaria um campo conhecido é
+    redundante e pode ser omitido.
+    """
+
+    FIELDS = ("battery", "dcdc", "charge", "load", "pth", "duty")
+
+    # Comando (sem terminador) -> (campo, valor)
+    SWITCHES = {
+        **{on.strip(): (name, True) for name, (on, _) in PowerState.COMMANDS.items()},
+        **{off.strip(): (name, False) for name, (_, off) in PowerState.COMMANDS.items()},
+        b'ENPTH': ("pth", True),
+        b'DGPTH': ("pth", False),
+    }
+
+    def __init__(self):
+        self.values: Dict[str, object] = dict.fromkeys(self.FIELDS)
+        self.elided = 0  # Comandos omitidos desde a criação
+
+    @classmethod
+    def effect(cls, command: bytes) -> Optional[Tuple[str, object]]:
+        """Campo e valor que o comando define, ou None se o comando não é rastreado."""
+        command = command.strip()
+        if command in cls.SWITCHES:
+            return cls.SWITCHES[command]
+        if command.startswith(b'FR1D'):
+            try:
+                return "duty", round(float(command[4:]), 1)
+            except ValueError:
+                return None
+        return None
+
+    def is_redundant(self, command: bytes) -> bool:
+        effect = self.effect(command)
+        return effect is not None and self.values[effect[0]] == effect[1]
+
+    def needed(self, commands: List[bytes]) -> List[bool]:
+        """Para cada comando da lista, se ele muda o estado (considerando os anteriores da lista)."""
+        values = dict(self.values)
+        flags = []
+        for command in commands:
+            effect = self.effect(command)
+            if effect is None:
+                flags.append(True)
+                continue
+            name, value = effect
+            flags.append(values[name] != value)
+            values[name] = value
+        return flags
+
+    def apply(self, command: bytes, confirmed: bool = True):
+        """Registra um comando enviado; sem confirmação o campo fica desconhecido."""
+        effect = self.effect(command)
+        if effect is not None:
+            name, value = effect
+            self.values[name] = value if confirmed else None
+
+    def forget(self):
+        """Esquece todo o estado (porta reaberta, placa trocada)."""
+        self.values = dict.fromkeys(self.FIELDS)
+
+    @property
+    def power(self) -> Optional[PowerState]:
+        """Estado das fontes, se todas forem conhecidas."""
+        if any(self.values[name] is None for name in PowerState.COMMANDS):
+            return None
+        return PowerState(**{name: self.values[name] for name in PowerState.COMMANDS})
+
+    def commands_to(self, target: PowerState, pth: Optional[bool] = None,
+                    duty: Optional[float] = None) -> List[bytes]:
+        """
+        Menor sequência de comandos que leva a jiga ao estado pedido
+        (pth/duty None: não importa). O PWM é ajustado antes dos relés, e os
+        relés ligados antes dos desligados, para a placa não ficar sem
+        alimentação na transição.
+        """
+        commands = []
+        if duty is not None and self.values["duty"] != round(duty, 1):
+            commands.append(f'FR1D{duty:.1f}\r'.encode())
+        if pth is not None and self.values["pth"] != pth:
+            commands.append(b'ENPTH\r' if pth else b'DGPTH\r')
+
+        turn_on, turn_off = [], []
+        for name, (on, off) in PowerState.COMMANDS.items():
+            wanted = getattr(target, name)
+            if self.values[name] != wanted:
+                (turn_on if wanted else turn_off).append(on if wanted else off)
+        return commands + turn_on + turn_off
+
+
 @dataclass
 class TestSession:
     """Resultado completo de uma sessão de testes."""
@@ -94,94 +249,150 @@ class TestSession:
     tensao_bateria_15v: Optional[float] = None
     duty_cycle_queda_15v: Optional[float] = None
     resultado_geral: str = "NG"
+    # Identifica a sessão no log de eventos; (segmento, posição) do seu primeiro evento
+    id_sessao: str = field(default_factory=lambda: uuid.uuid4().hex)
+    ref_eventos: Optional[Tuple[str, int]] = None
 
 
 class ExcelLogger:
-    """Classe para gerenciar logs em planilha Excel."""
+    """
+    Registro dos resultados das sessões.
+    
+    As sessões são gravadas uma a uma na base append-only ``resultados.db``
+    (ver results.py); a planilha ``resultados_testes.xlsx`` é exportada dela em
+    segundo plano a cada ``export_interval`` segundos ou por ``export_excel()``.
+    """
+    
+    COLUMNS = [
+        "Data_Hora", "Numero_Serie", "Operador",
+        "Teste_Bateria_Curto", "Teste_DCDC_Curto",
+        "Teste_Tensao_DCDC_Load_StepUp", "Teste_Circ_Carga_Bateria",
+        "Teste_Bateria_Isolada", "Teste_Alarme_Temp1",
+        "Teste_Retorno_Alarme_Temp1", "Teste_Alarme_Temp2",
+        "Teste_Retorno_Alarme_Temp2", "Teste_PWM", "Teste_PWM_PTH",
+        "Teste_Inclinometro", "Teste_ADC", "Teste_RAK", "Teste_RTC",
+        "Teste_Serial_Number", "Teste_EEPROM", "Teste_Ponte_H",
+        "Tensao_Bateria_Alarme_V", "Duty_Cycle_Alarme_Carga_Percent",
+        "Tensao_Bateria_5V_V", "Duty_Cycle_Queda_5V_Percent",
+        "Tensao_Bateria_15V_V", "Duty_Cycle_Queda_15V_Percent",
+        "Resultado_Geral"
+    ]
     
-    def __init__(self, log_dir: str = "log"):
+    def __init__(self, log_dir: str = "log", export_interval: float = 300.0):
         self.log_dir = log_dir
         self.excel_file = os.path.join(log_dir, "resultados_testes.xlsx")
+        self.db_file = os.path.join(log_dir, "resultados.db")
         self._ensure_log_dir()
-        self._ensure_excel_structure()
+        
+        is_new = not os.path.exists(self.db_file)
+        self.store = ResultsStore(self.db_file, self.COLUMNS)
+        if is_new:
+            self._import_existing_excel()
+        self.exporter = PeriodicExport(self.store, self.excel_file, export_interval)
+        if len(self.store) and not self.store.is_exported(self.excel_file):
+            # Sessões gravadas depois da última exportação de uma execução anterior
+            self.exporter.mark_dirty()
+        # Ao sair, exporta o que faltar para a planilha e fecha a base
+        self._closed = False
+        atexit.register(self.close)
     
     def _ensure_log_dir(self):
         """Garante que o diretório de logs existe."""
         if not os.path.exists(self.log_dir):
             os.makedirs(self.log_dir)
     
-    def _ensure_excel_structure(self):
-        """Garante que a planilha Excel existe com a estrutura correta."""
+    def _import_existing_excel(self):
+        """Na primeira execução, traz o histórico da planilha antiga para a base."""
         if not os.path.exists(self.excel_file):
-            # Criar planilha com cabeçalhos
-            columns = [
-                "Data_Hora", "Numero_Serie", "Operador",
-                "Teste_Bateria_Curto", "Teste_DCDC_Curto",
-                "Teste_Tensao_DCDC_Load_StepUp", "Teste_Circ_Carga_Bateria",
-                "Teste_Bateria_Isolada", "Teste_Alarme_Temp1",
-                "Teste_Retorno_Alarme_Temp1", "Teste_Alarme_Temp2",
-                "Teste_Retorno_Alarme_Temp2", "Teste_PWM", "Teste_PWM_PTH",
-                "Teste_Inclinometro", "Teste_ADC", "Teste_RAK", "Teste_RTC",
-                "Teste_Serial_Number", "Teste_EEPROM", "Teste_Ponte_H",
-                "Tensao_Bateria_Alarme_V", "Duty_Cycle_Alarme_Carga_Percent",
-                "Tensao_Bateria_5V_V", "Duty_Cycle_Queda_5V_Percent",
-                "Tensao_Bateria_15V_V", "Duty_Cycle_Queda_15V_Percent",
-                "Resultado_Geral"
-            ]
-            df = pd.DataFrame(columns=columns)
-            df.to_excel(self.excel_file, index=False, engine='openpyxl')
-    
-    def save_test_session(self, session: TestSession):
-        """Salva uma sessão de teste na planilha Excel."""
+            return
         try:
-            # Ler planilha existente
-            df = pd.read_excel(self.excel_file, engine='openpyxl')
-            
-            # Criar nova linha com os dados
-            new_row = {
-                "Data_Hora": session.horario.strftime("%Y-%m-%d %H:%M:%S"),
-                "Numero_Serie": session.numero_serie,
-                "Operador": session.operador,
-                "Teste_Bateria_Curto": session.teste_bateria_curto,
-                "Teste_DCDC_Curto": session.teste_dcdc_curto,
-                "Teste_Tensao_DCDC_Load_StepUp": session.teste_tensao_dcdc_load_stepup,
-                "Teste_Circ_Carga_Bateria": session.teste_circ_carga_bateria,
-                "Teste_Bateria_Isolada": session.teste_bateria_isolada,
-                "Teste_Alarme_Temp1": session.teste_alarme_temp1,
-                "Teste_Retorno_Alarme_Temp1": session.teste_retorno_alarme_temp1,
-                "Teste_Alarme_Temp2": session.teste_alarme_temp2,
-                "Teste_Retorno_Alarme_Temp2": session.teste_retorno_alarme_temp2,
-                "Teste_PWM": session.teste_pwm,
-                "Teste_PWM_PTH": session.teste_pwm_pth,
-                "Teste_Inclinometro": session.teste_inclinometro,
-                "Teste_ADC": session.teste_adc,
-                "Teste_RAK": session.teste_rak,
-                "Teste_RTC": session.teste_rtc,
-                "Teste_Serial_Number": session.teste_serial_number,
-                "Teste_EEPROM": session.teste_eeprom,
-                "Teste_Ponte_H": session.teste_ponte_h,
-                "Tensao_Bateria_Alarme_V": session.tensao_bateria_alarme,
-                "Duty_Cycle_Alarme_Carga_Percent": session.duty_cycle_alarme_carga,
-                "Tensao_Bateria_5V_V": session.tensao_bateria_5v,
-                "Duty_Cycle_Queda_5V_Percent": session.duty_cycle_queda_5v,
-                "Tensao_Bateria_15V_V": session.tensao_bateria_15v,
-                "Duty_Cycle_Queda_15V_Percent": session.duty_cycle_queda_15v,
-                "Resultado_Geral": session.resultado_geral
-            }
-            
-            # Adicionar nova linha ao DataFrame
-            if df.empty:
-                df = pd.DataFrame([new_row])
-            else:
-                df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-            
-            # Salvar de volta na planilha
-            df.to_excel(self.excel_file, index=False, engine='openpyxl')
-            
-            return True
+            count = self.store.import_excel(self.excel_file)
+            print(f"{count} sessões importadas de {self.excel_file}")
         except Exception as e:
-            print(f"Erro ao salvar na planilha Excel: {e}")
+            print(f"Erro ao importar planilha Excel existente: {e}")
+    
+    @staticmethod
+    def session_row(session: TestSession) -> Dict:
+        """Linha da tabela de resultados para uma sessão."""
+        return {
+            "Data_Hora": session.horario.strftime("%Y-%m-%d %H:%M:%S"),
+            "Numero_Serie": session.numero_serie,
+            "Operador": session.operador,
+            "Teste_Bateria_Curto": session.teste_bateria_curto,
+            "Teste_DCDC_Curto": session.teste_dcdc_curto,
+            "Teste_Tensao_DCDC_Load_StepUp": session.teste_tensao_dcdc_load_stepup,
+            "Teste_Circ_Carga_Bateria": session.teste_circ_carga_bateria,
+            "Teste_Bateria_Isolada": session.teste_bateria_isolada,
+            "Teste_Alarme_Temp1": session.teste_alarme_temp1,
+            "Teste_Retorno_Alarme_Temp1": session.teste_retorno_alarme_temp1,
+            "Teste_Alarme_Temp2": session.teste_alarme_temp2,
+            "Teste_Retorno_Alarme_Temp2": session.teste_retorno_alarme_temp2,
+            "Teste_PWM": session.teste_pwm,
+            "Teste_PWM_PTH": session.teste_pwm_pth,
+            "Teste_Inclinometro": session.teste_inclinometro,
+            "Teste_ADC": session.teste_adc,
+            "Teste_RAK": session.teste_rak,
+            "Teste_RTC": session.teste_rtc,
+            "Teste_Serial_Number": session.teste_serial_number,
+            "Teste_EEPROM": session.teste_eeprom,
+            "Teste_Ponte_H": session.teste_ponte_h,
+            "Tensao_Bateria_Alarme_V": session.tensao_bateria_alarme,
+            "Duty_Cycle_Alarme_Carga_Percent": session.duty_cycle_alarme_carga,
+            "Tensao_Bateria_5V_V": session.tensao_bateria_5v,
+            "Duty_Cycle_Queda_5V_Percent": session.duty_cycle_queda_5v,
+            "Tensao_Bateria_15V_V": session.tensao_bateria_15v,
+            "Duty_Cycle_Queda_15V_Percent": session.duty_cycle_queda_15v,
+            "Resultado_Geral": session.resultado_geral,
+            "Id_Sessao": session.id_sessao,
+            "Segmento_Eventos": session.ref_eventos[0] if session.ref_eventos else None,
+            "Posicao_Eventos": session.ref_eventos[1] if session.ref_eventos else None,
+        }
+    
+    def save_test_session(self, session: TestSession, refs: Optional[Dict] = None) -> bool:
+        """
+        Grava uma sessão na base de resultados (uma inserção, sem reler o histórico).
+        
+        ``refs`` completa a linha com os arquivos de dados brutos (Arquivo_Curva, Arquivo_Tempos).
+        """
+        row = self.session_row(session)
+        row.update(refs or {})
+        try:
+            self.store.append(row)
+        except Exception as e:
+            print(f"Erro ao salvar resultados: {e}")
             return False
+        
+        self.exporter.mark_dirty()
+        return True
+    
+    def export_excel(self) -> bool:
+        """Regenera a planilha Excel com todo o histórico agora."""
+        return self.exporter.export()
+    
+    def close(self):
+        """Exporta as sessões pendentes para a planilha e fecha a base."""
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        self.exporter.stop(flush=True)
+        self.store.close()
+    
+    def recent_values(self, columns: List[str], limit: int = 50) -> Dict[str, List[float]]:
+        """Últimos `limit` valores não vazios de cada coluna numérica."""
+        try:
+            return self.store.recent_values(columns, limit)
+        except Exception as e:
+            print(f"Erro ao ler histórico de resultados: {e}")
+            return {}
+    
+    def history(self, numero_serie: str) -> List[SessionRecord]:
+        """Todas as sessões de uma placa, com veredito e onde estão seus dados brutos."""
+        try:
+            return self.store.history(numero_serie)
+        except Exception as e:
+            print(f"Erro ao consultar histórico de {numero_serie}: {e}")
+            return []
 
 
 class Model:
@@ -190,11 +401,16 @@ class Model:
     Gerencia toda a lógica de negócio, comunicação serial e execução de testes.
     """
     
-    def __init__(self):
+    def __init__(self, clock: Clock = REAL_CLOCK, excel_logger: Optional[ExcelLogger] = None,
+                 writer: Optional[BackgroundWriter] = None, event_log: Optional[EventLog] = None):
         # Configurações e constantes
         self.config_file = 'config.json'
-        self.log_file = "resultado_teste.txt"  # Manter para compatibilidade
-        self.excel_logger = ExcelLogger()
+        self.excel_logger = excel_logger or ExcelLogger()
+        # Log de eventos e gravação das sessões em segundo plano
+        self.writer = writer or default_writer()
+        self.event_log = event_log or shared_event_log(
+            os.path.join(self.excel_logger.log_dir, "eventos"), self.writer)
+        self.trace_store = TraceStore(os.path.join(self.excel_logger.log_dir, "traces"))
         self.current_session: Optional[TestSession] = None
         
         # Constantes de calibração
@@ -206,11 +422,41 @@ class Model:
         self.red_cf = (100 + 20) / 20
         self.red_batt = (2.2 + 27) / 2.2
         self.red_pwm = (3.3 + 22) / 3.3
+        self.adc_decoder = AdcDecoder(gain_vector(
+            self.const_fonte, self.red_adcs, self.red_batt, self.red_cf, self.red_pwm, self.red_load))
         
         # Estado da conexão serial
+        # Relógio usado em todas as esperas (virtual nas execuções emuladas)
+        self.clock = clock
+        # Cancelamento pedido pela UI interrompe qualquer espera do Model
+        self.cancel_token = CancelToken()
+        # Spans de tempo por passo (desligado por padrão; ver timing.py)
+        self.tracer = Tracer(clock)
+        
         self.ser: Optional[serial.Serial] = None
+        self.reader: Optional[SerialReader] = None
         self.is_connected = False
         
+        # Amostras do último teste PWM PTH; _sample_sink recebe cada leitura enquanto ativo
+        self.pth_samples: Optional[SampleBuffer] = None
+        self._sample_sink: Optional[SampleBuffer] = None
+        self._duty = float('nan')
+        
+        # Estado conhecido de relés e PWM; com elide_redundant, comandos que não o mudam não são enviados
+        self.fixture_state = FixtureState()
+        self.elide_redundant = True
+        # Tempo de comutação dos relés: esperas sem condição não terminam antes dele
+        self.relay_settle_time = 0.1
+        
+        # Faixas de partida das varreduras a partir do histórico de limiares
+        self.warm_start = True
+        # Tempo mínimo em cada duty da varredura sem evento: cobre a latência do
+        # alarme de carga e da queda dos trilhos (o laço original esperava 0.5 s por passo)
+        self.probe_dwell = 0.5
+        
+        # Detector do alarme de carga, alimentado com |ADC_load - ADC_Batt| a cada leitura
+        self.load_alarm_detector: ChangeDetector = MedianDetector(threshold=0.7, window=3)
+        
         # Cache para testes de comunicação (executados em grupo)
         self._communication_test_cache = None
     
@@ -234,41 +480,75 @@ class Model:
         return {}
     
     def save_config(self, port: str):
-        """Salva configuração no arquivo."""
+        """Salva a porta no arquivo de configuração, mantendo as demais opções."""
+        config = self.load_config()
+        config["porta"] = port
         with open(self.config_file, 'w') as f:
-            json.dump({"porta": port}, f, indent=4)
+            json.dump(config, f, indent=4)
     
     # ═══════════════════════════════════════════════════════════════════
     # COMUNICAÇÃO SERIAL
     # ═══════════════════════════════════════════════════════════════════
     
-    def connect(self, port: str) -> bool:
-        """Conecta à porta serial."""
+    @staticmethod
+    def open_serial(port: str) -> serial.Serial:
+        """Abre a porta serial com os parâmetros da jiga."""
+        return serial.Serial(
+            port=port,
+            baudrate=115200,
+            bytesize=serial.EIGHTBITS,
+            parity=serial.PARITY_NONE,
+            stopbits=serial.STOPBITS_ONE,
+            timeout=2,
+            write_timeout=2,
+            rtscts=False,
+            dsrdtr=False,
+            xonxoff=False,
+        )
+    
+    def connect(self, port: str, capture_path: Optional[str] = None) -> bool:
+        """Conecta à porta serial (opcionalmente gravando o tráfego em capture_path)."""
         try:
-            self.ser = serial.Serial(
-                port=port,
-                baudrate=115200,
-                bytesize=serial.EIGHTBITS,
-                parity=serial.PARITY_NONE,
-                stopbits=serial.STOPBITS_ONE,
-                timeout=2,
-                write_timeout=2,
-                rtscts=False,
-                dsrdtr=False,
-                xonxoff=False,
-            )
-            time.sleep(1)
-            self.is_connected = self.ser.is_open
-            return self.is_connected
+            ser = self.open_serial(port)
+            self.sleep(1)
+            return self.attach(ser, capture_path)
         except serial.SerialException:
             self.is_connected = False
             return False
     
+    def attach(self, ser, capture_path: Optional[str] = None) -> bool:
+        """
+        Usa uma porta já aberta (ex.: EmulatedSerial, ReplaySerial) e inicia a leitura.
+        Com capture_path, todo byte escrito e lido é gravado num transcript JSONL.
+        """
+        if capture_path:
+            ser = CaptureSerial(ser, capture_path, clock=self.clock)
+        self.ser = ser
+        self.fixture_state.forget()
+        self.is_connected = ser.is_open
+        if self.is_connected:
+            self.reader = SerialReader(self.ser, clock=self.clock, cancel=self.cancel_token)
+            self.reader.start()
+        return self.is_connected
+    
+    def sleep(self, seconds: float):
+        """Espera no relógio do Model; levanta Cancelled se o teste for cancelado."""
+        with self.tracer.span("sleep", SLEEP, seconds=seconds):
+            self.cancel_token.sleep(self.clock, seconds)
+    
+    def cancel(self):
+        """Cancela o teste em andamento (chamado de outra thread, ex.: botão da UI)."""
+        self.cancel_token.cancel()
+    
     def disconnect(self):
         """Desconecta da porta serial."""
+        if self.reader:
+            self.reader.stop()
+            self.reader = None
         if self.ser and self.ser.is_open:
             self.ser.close()
         self.is_connected = False
+        self.fixture_state.forget()
     
     # ═══════════════════════════════════════════════════════════════════
     # GERENCIAMENTO DE SESSÃO DE TESTES
@@ -281,8 +561,12 @@ class Model:
             operador=operador,
             horario=datetime.now()
         )
-        # Limpar cache de testes de comunicação
+        # Limpar cache de testes de comunicação e amostras da sessão anterior
         self._communication_test_cache = None
+        self.cancel_token.reset()
+        self.tracer.clear()
+        self.pth_samples = None
+        self.current_session.ref_eventos = self._log_event("sessao_inicio", operador=operador)
     
     def update_test_result(self, test_name: str, result: bool):
         """Atualiza o resultado de um teste específico."""
@@ -327,8 +611,14 @@ class Model:
         if pwm_result.duty_adc15v_below15v is not None:
             self.current_session.duty_cycle_queda_15v = pwm_result.duty_adc15v_below15v
     
-    def finalize_test_session(self) -> bool:
-        """Finaliza a sessão de testes e salva na planilha Excel."""
+    def finalize_test_session(self, cancelled: bool = False,
+                              on_saved: Optional[Callable[[bool], None]] = None) -> bool:
+        """
+        Finaliza a sessão de testes (cancelled: registra como CANCELADO) e
+        enfileira a gravação dos resultados, da curva PWM e dos tempos no writer
+        em segundo plano, sem esperar o disco. Retorna True se havia sessão;
+        on_saved recebe, na thread do writer, se a gravação na base deu certo.
+        """
         if not self.current_session:
             return False
         
@@ -348,121 +638,316 @@ class Model:
         ]
         
         self.current_session.resultado_geral = "OK" if all(test == "OK" for test in all_tests if test != "PENDING") else "NG"
+        if cancelled:
+            self.current_session.resultado_geral = "CANCELADO"
         
-        # Salvar na planilha Excel
-        success = self.excel_logger.save_test_session(self.current_session)
+        session = self.current_session
+        samples = self.pth_samples
+        self._log_event("sessao_fim", session.resultado_geral, resultados={
+            name: value for name, value in asdict(session).items() if name.startswith("teste_")
+        })
+        timing = self._timing_trace(session)
         
-        if success:
-            print(f"Resultados salvos na planilha Excel: {self.excel_logger.excel_file}")
-        else:
-            print("Erro ao salvar resultados na planilha Excel")
+        def persist():
+            # Curva completa da varredura PWM e tempos por passo
+            refs = {
+                "Arquivo_Curva": self._save_sweep_trace(session, samples),
+                "Arquivo_Tempos": self._save_timing(*timing) if timing else None,
+            }
+            
+            # Base de resultados (a planilha Excel é exportada dela), com as referências aos dados brutos
+            success = self.excel_logger.save_test_session(session, refs)
+            if success:
+                print(f"Resultados salvos em: {self.excel_logger.db_file}")
+            else:
+                print("Erro ao salvar resultados")
+            if on_saved:
+                on_saved(success)
+        
+        # A gravação em disco não prende a jiga: vai para o writer em segundo plano
+        self.writer.submit(persist)
         
         # Reset da sessão
         self.current_session = None
         
-        return success
+        return True
+    
+    def _save_sweep_trace(self, session: TestSession, samples: Optional[SampleBuffer]) -> Optional[str]:
+        """Grava as amostras da varredura PWM de uma sessão, se houver, e retorna o caminho."""
+        if not samples or not len(samples):
+            return None
+        
+        try:
+            path = self.trace_store.save(
+                session.numero_serie, samples, self.adc_decoder.gains,
+                operador=session.operador,
+                horario=session.horario.isoformat(),
+                descartadas=samples.dropped,
+            )
+            print(f"Curva da varredura PWM salva em: {path}")
+            if samples.dropped:
+                print(f"[AVISO] {samples.dropped} amostras mais antigas da varredura foram descartadas")
+            return path
+        except OSError as e:
+            print(f"Erro ao salvar curva da varredura PWM: {e}")
+            return None
+    
+    def _timing_trace(self, session: TestSession) -> Optional[Tuple[str, Dict]]:
+        """Caminho e conteúdo do trace de tempos da sessão (montado agora: o tracer é reaproveitado)."""
+        if not self.tracer.enabled or not self.tracer.spans:
+            return None
+        
+        directory = os.path.join(self.excel_logger.log_dir, "timing",
+                                 os.path.basename(self.trace_store.board_dir(session.numero_serie)))
+        trace = self.tracer.chrome_trace(
+            numero_serie=session.numero_serie, operador=session.operador,
+            horario=session.horario.isoformat(), resultado=session.resultado_geral,
+        )
+        return os.path.join(directory, session.horario.strftime("%Y%m%d_%H%M%S") + ".json"), trace
+    
+    @staticmethod
+    def _save_timing(path: str, trace: Dict) -> Optional[str]:
+        """Grava o trace de tempos (Chrome trace + resumo por passo) e retorna o caminho."""
+        try:
+            write_json(path, trace)
+            print(f"Tempos por passo salvos em: {path}")
+            return path
+        except OSError as e:
+            print(f"Erro ao salvar tempos por passo: {e}")
+            return None
     
     def send_command(self, command: bytes) -> Tuple[bool, str]:
-        """Envia um comando e aguarda ACK."""
+        """Envia um comando e aguarda ACK (omitido se não mudaria o estado conhecido da jiga)."""
         if not self.ser or not self.ser.is_open:
             return False, "Porta não conectada"
         
+        if self.elide_redundant and self.fixture_state.is_redundant(command):
+            self.fixture_state.elided += 1
+            return True, ""
+        
         try:
-            self.ser.write(command)
-            return self._wait_for_ack()
+            with self.tracer.span(command.strip().decode(errors='ignore'), COMMAND):
+                self.ser.write(command)
+                ok, resposta = self._wait_for_ack()
         except serial.SerialException as e:
+            self.fixture_state.apply(command, confirmed=False)
             return False, str(e)
+        
+        self.fixture_state.apply(command, confirmed=ok)
+        return ok, resposta
+    
+    def send_batch(self, commands: List[bytes], timeout: float = 1.0) -> Tuple[bool, List[Tuple[bytes, bool, str]]]:
+        """
+        Envia uma lista de comandos de uma vez e casa os ACKs em ordem.
+        Retorna (todos_ok, [(comando, ok, resposta), ...]); `timeout` vale por comando.
+        Comandos redundantes não são enviados e aparecem como ok com resposta vazia.
+        """
+        if not self.ser or not self.ser.is_open:
+            return False, [(cmd, False, "Porta não conectada") for cmd in commands]
+        
+        # Cada comando precisa do terminador para a placa separá-los
+        commands = [cmd if cmd.endswith(b'\r') else cmd + b'\r' for cmd in commands]
+        needed = self.fixture_state.needed(commands) if self.elide_redundant else [True] * len(commands)
+        to_send = [cmd for cmd, send in zip(commands, needed) if send]
+        self.fixture_state.elided += len(commands) - len(to_send)
+        
+        with self.tracer.span("lote", COMMAND, n=len(to_send)):
+            try:
+                if to_send:
+                    self.ser.write(b''.join(to_send))
+            except serial.SerialException as e:
+                for cmd in to_send:
+                    self.fixture_state.apply(cmd, confirmed=False)
+                return False, [(cmd, False, str(e)) for cmd in commands]
+            
+            results = []
+            for cmd, send in zip(commands, needed):
+                if not send:
+                    results.append((cmd, True, ""))
+                    continue
+                ok, resposta = self._wait_for_ack(timeout)
+                self.fixture_state.apply(cmd, confirmed=ok)
+                results.append((cmd, ok, resposta))
+                if not ok:
+                    print(f"[ERRO] Sem ACK para {cmd.strip().decode(errors='ignore')}: {resposta}")
+        
+        return all(ok for _, ok, _ in results), results
     
     def _wait_for_ack(self, timeout: float = 1.0) -> Tuple[bool, str]:
         """Aguarda ACK do dispositivo."""
-        start_time = time.time()
-        buffer = ""
+        if not self.reader:
+            return False, ""
         
-        while time.time() - start_time < timeout:
-            if self.ser.in_waiting:
-                buffer += self.ser.read(self.ser.in_waiting).decode(errors='ignore')
-                if "ACKOK" in buffer:
-                    return True, buffer.strip()
-            else:
-                time.sleep(0.005)
+        with self.tracer.span("ACK", ACK):
+            frame, skipped = self.reader.wait_for_kind(FRAME_ACK, timeout)
+        buffer = "\n".join(f.text for f in skipped + ([frame] if frame else []))
+        return frame is not None, buffer.strip()
+    
+    def _reset_input(self):
+        """Descarta os frames pendentes recebidos da placa."""
+        if self.reader:
+            self.reader.clear()
+    
+    def _read_line(self, timeout: float = 2.0) -> str:
+        """Retorna o próximo frame recebido, ou string vazia no timeout."""
+        if not self.reader:
+            return ""
+        
+        frame, _ = self.reader.wait_for(lambda f: True, timeout)
+        return frame.text if frame else ""
+    
+    def _read_adc_frame(self, timeout: float = 1.0) -> bytes:
+        """Aguarda a próxima resposta AQADC, ou bytes vazios no timeout."""
+        if not self.reader:
+            return b""
         
-        return False, buffer.strip()
+        frame, _ = self.reader.wait_for_kind(FRAME_ADC, timeout)
+        return frame.raw if frame else b""
     
-    def read_adc(self) -> Optional[ADCReading]:
+    def read_adc(self, timeout: float = 1.0) -> Optional[ADCReading]:
         """Lê os valores dos ADCs."""
+        values = self.read_adc_values(timeout)
+        return ADCReading(*values.tolist()) if values is not None else None
+    
+    def read_adc_values(self, timeout: float = 1.0) -> Optional[np.ndarray]:
+        """Lê os ADCs como vetor de 9 tensões (ordem de adc.CHANNELS), sem criar ADCReading."""
         if not self.ser or not self.ser.is_open:
             return None
         
         try:
-            self.ser.reset_input_buffer()
-            self.ser.write(b'AQADC\r')
-            time.sleep(0.3)
-            response = self.ser.readline().decode(errors='ignore').strip()
-            
-            if len(response) < 54:
-                return None
-            
-            return ADCReading(
-                adc_15v=float(response[1:6]) * self.const_fonte * self.red_adcs,
-                adc_5v=float(response[7:12]) * self.const_fonte * self.red_adcs,
-                adc_load=float(response[13:18]) * self.const_fonte * self.red_adcs,
-                adc_dcdc=float(response[19:24]) * self.const_fonte * self.red_adcs,
-                adc_batt=float(response[25:30]) * self.const_fonte * self.red_batt,
-                adc_cf=float(response[31:36]) * self.const_fonte * self.red_cf,
-                adc_pwm=float(response[37:42]) * self.const_fonte * self.red_pwm,
-                adc_stepup=float(response[43:48]) * self.const_fonte * self.red_batt,
-                adc_leit_corr=float(response[49:54]) * self.const_fonte * self.red_load
-            )
-        except (ValueError, IndexError, serial.SerialException):
+            with self.tracer.span("AQADC", ADC):
+                self._reset_input()
+                self.ser.write(b'AQADC\r')
+                values = self.adc_decoder.decode(self._read_adc_frame(timeout))
+        except serial.SerialException:
+            return None
+        
+        if np.isnan(values).any():
             return None
+        if self._sample_sink is not None:
+            self._sample_sink.append(self.clock.monotonic(), self._duty, values)
+        return values
+    
+    def parse_adc(self, response) -> Optional[ADCReading]:
+        """Converte uma resposta AQADC (str ou bytes) em tensões calibradas."""
+        values = self.adc_decoder.decode(response)
+        if np.isnan(values).any():
+            return None
+        return ADCReading(*values.tolist())
+    
+    def wait_settled(self, channels: Tuple[str, ...], max_wait: float,
+                     tolerance: float = 0.05, samples: int = 3,
+                     condition: Optional[Callable[[ADCReading], bool]] = None,
+                     stop: Optional[Callable[[ADCReading], bool]] = None,
+                     min_wait: float = 0.0) -> Optional[ADCReading]:
+        """
+        Aguarda os canais estabilizarem, com max_wait como limite superior.
+        Lê AQADC continuamente e retorna assim que as últimas `samples` leituras
+        de cada canal variarem no máximo `tolerance` volts e, se informada,
+        `condition` for verdadeira. `stop` recebe cada leitura e, se retornar
+        True, encerra a espera na hora. No limite de tempo retorna a última leitura.
+        
+        Sem `condition`, uma janela plana logo após o comando pode ser anterior
+        à transição: `min_wait` impede que a espera termine antes desse tempo.
+        """
+        with self.tracer.span("wait_settled", SETTLE, channels=channels, max_wait=max_wait):
+            return self._wait_settled(channels, max_wait, tolerance, samples, condition, stop, min_wait)
+    
+    def _wait_settled(self, channels: Tuple[str, ...], max_wait: float, tolerance: float, samples: int,
+                      condition: Optional[Callable[[ADCReading], bool]],
+                      stop: Optional[Callable[[ADCReading], bool]],
+                      min_wait: float = 0.0) -> Optional[ADCReading]:
+        if not self.is_connected:
+            return None
+        
+        start = self.clock.monotonic()
+        deadline = start + max(max_wait, min_wait)
+        window = deque(maxlen=samples)
+        reading = None
+        
+        while self.clock.monotonic() < deadline:
+            self.cancel_token.check()
+            new_reading = self.read_adc(timeout=max(deadline - self.clock.monotonic(), 0.05))
+            if not new_reading:
+                # Porta fechada ou frame inválido: não gira em falso até o prazo
+                self.sleep(min(0.05, max(deadline - self.clock.monotonic(), 0)))
+                continue
+            
+            reading = new_reading
+            if stop is not None and stop(reading):
+                return reading
+            window.append(reading)
+            if len(window) < samples or self.clock.monotonic() - start < min_wait:
+                continue
+            
+            settled = all(
+                max(getattr(r, ch) for r in window) - min(getattr(r, ch) for r in window) <= tolerance
+                for ch in channels
+            )
+            if settled and (condition is None or condition(reading)):
+                return reading
+        
+        return reading if reading else self.read_adc()
     
     # ═══════════════════════════════════════════════════════════════════
     # INICIALIZAÇÃO E UTILITÁRIOS
     # ═══════════════════════════════════════════════════════════════════
     
     def initialize_system(self) -> bool:
-        """Inicializa o sistema com comandos padrão - IDÊNTICO AO ORIGINAL."""
+        """Inicializa o sistema com comandos padrão - mesma sequência do original, em lote."""
         commands = [b'DESDC\r', b'DESBT\r', b'FR1D0\r', b'DESCB\r', b'DGLOAD\r']
+        return self._send_and_settle(commands)
+
+    def set_power_state(self, state: PowerState, pth: Optional[bool] = None,
+                        duty: Optional[float] = None) -> bool:
+        """Coloca as fontes da jiga no estado pedido enviando só os comandos que faltam."""
+        if not self.elide_redundant:
+            ok, _ = self.send_batch(state.commands())
+            return ok
         
-        for cmd in commands:
-            self.ser.write(cmd)
-            self._wait_for_ack()
-        time.sleep(1)
-        
-        return True
+        commands = self.fixture_state.commands_to(state, pth=pth, duty=duty)
+        if not commands:
+            return True
+        ok, _ = self.send_batch(commands)
+        return ok
 
     def turnoff_system(self) -> bool:
-        """Inicializa o sistema com comandos padrão - IDÊNTICO AO ORIGINAL."""
-        commands = [b'DESCB\r', b'DGLOAD\r']
-        
-        for cmd in commands:
-            self.ser.write(cmd)
-            self._wait_for_ack()
-        time.sleep(1)
+        """Desliga carga e circuito de carga da bateria, em lote."""
+        return self._send_and_settle([b'DESCB\r', b'DGLOAD\r'])
+    
+    def power_down(self) -> bool:
+        """Desligamento seguro: carga e circuito de carga primeiro, depois bateria e DCDC."""
+        ok = self.turnoff_system()
+        return self.set_power_state(POWER_OFF) and ok
+    
+    def _send_and_settle(self, commands: List[bytes]) -> bool:
+        """Envia um lote e aguarda DCDC e carga estabilizarem, se algum comando mudou a jiga."""
+        if self.elide_redundant and not any(self.fixture_state.needed(commands)):
+            self.fixture_state.elided += len(commands)
+            return True
         
-        return True
+        ok, _ = self.send_batch(commands)
+        self.wait_settled(("adc_dcdc", "adc_load"), max_wait=1, min_wait=self.relay_settle_time)
+        return ok
     
     def _wait_for_adc_5v(self, max_time: int = 20) -> bool:
-        """Aguarda ADC_5V atingir 4V - IDÊNTICO AO ORIGINAL."""
+        """
+        Aguarda ADC_5V atingir 4V, lendo a cada 1 s (tempo monotônico do Model).
+        Retorna False se o 5V subir antes de 15 s (o temporizador da placa não
+        rodou) ou não subir em max_time; senão espera mais 2 s, como o original.
+        """
         print("Aguardando ADC_5V", end='', flush=True)
-        start_time = time.time()
+        start_time = self.clock.monotonic()
         
         while True:
-            elapsed_time = time.time() - start_time
+            elapsed_time = self.clock.monotonic() - start_time
             if elapsed_time > max_time:
                 print(f"\n\033[31m[ERRO] Tempo excedido ({elapsed_time:.1f}s). ADC_5V não atingiu 4V\033[0m")
                 return False
             
-            time.sleep(1)
-            self.ser.reset_input_buffer()
-            self.ser.write(b'AQADC\r')
-            time.sleep(0.3)
-            info = self.ser.readline().decode(errors='ignore').strip()
-            
-            try:
-                adc_5v = float(info[7:12]) * self.const_fonte * self.red_adcs
-            except:
-                adc_5v = 0
+            self.sleep(1)
+            reading = self.read_adc()
+            adc_5v = reading.adc_5v if reading else 0
             
             print(".", end='', flush=True)
             
@@ -470,56 +955,55 @@ class Model:
                 print(f"  ✔️ {adc_5v:.2f}V em {elapsed_time:.1f} segundos")
                 if elapsed_time < 15:
                     return False
-                time.sleep(2)
+                self.sleep(2)
                 return True
         
         print(f"\n\033[31m[ERRO] ADC_5V = {adc_5v:.2f}V após {max_time}s\033[0m")
         return False
     
-    def _log_test_result(self, title: str, status: str, adc_reading: ADCReading):
-        """Registra resultado do teste no arquivo de log."""
-        with open(self.log_file, 'a') as f:
-            f.write('*' * 81 + '\n')
-            f.write(f'{title}: {status}\n')
-            f.write(f'DCDC {adc_reading.adc_dcdc:.2f}V *** Batt {adc_reading.adc_batt:.2f}V ***\n')
-            f.write(f'Load {adc_reading.adc_load:.2f}V *** CF {adc_reading.adc_cf:.2f}V ***\n')
+    def _log_event(self, event: str, status: Optional[str] = None,
+                   reading: Optional[ADCReading] = None, **fields) -> Tuple[str, int]:
+        """Registra um evento da sessão atual no log de eventos (com todos os canais da leitura)."""
+        session = self.current_session
+        return self.event_log.record(
+            event, self.clock.monotonic(),
+            session_id=session.id_sessao if session else None,
+            numero_serie=session.numero_serie if session else None,
+            status=status,
+            values=asdict(reading) if reading else None,
+            **fields,
+        )
     
     # ═══════════════════════════════════════════════════════════════════
     # TESTES PRINCIPAIS
     # ═══════════════════════════════════════════════════════════════════
     
     def test_battery_short(self) -> TestResult:
-        """Testa curto na bateria - IDÊNTICO AO ORIGINAL."""
+        """
+        Testa curto na bateria: mesmo critério do original (ADC_Batt zero = curto),
+        mas a leitura é feita assim que a tensão estabiliza (wait_settled, até 0.3 s)
+        em vez de após uma espera fixa.
+        """
         try:
-            self.ser.reset_input_buffer()
+            self._reset_input()
             
             # Liga a bateria
-            self.ser.write(b'LIGBT')
-            # Aguarda o ACK e salva a resposta em variável
-            self._wait_for_ack()
-            time.sleep(0.3)
+            self.send_command(b'LIGBT')
             
-            # Faz leitura dos ADCs
-            self.ser.write(b'AQADC')
-            time.sleep(0.1)
-            resposta_adc = self.ser.readline().decode(errors='ignore').strip()
-            print(f"Resposta AQADC: [{resposta_adc}]")
+            # Aguarda a tensão estabilizar (até 0.3s) e faz leitura dos ADCs
+            adc_reading = self.wait_settled(("adc_batt",), max_wait=0.3,
+                                            condition=lambda r: r.adc_batt > 0)
+            print(f"Leitura AQADC: {adc_reading}")
             
             # Desliga a bateria
-            self.ser.write(b'DESBT')
-            self._wait_for_ack()
+            self.send_command(b'DESBT')
             
             # Processamento do valor ADC
-            if len(resposta_adc) < 7:
+            adc_batt = adc_reading.adc_batt if adc_reading else 0
+            if adc_batt != adc_batt:  # Detecta NaN
                 adc_batt = 0
-            else:
-                try:
-                    valor_str = resposta_adc[25:30]  # Ajustar conforme sua resposta real
-                    adc_batt = float(valor_str) * self.const_fonte * self.red_batt
-                    if adc_batt != adc_batt:  # Detecta NaN
-                        adc_batt = 0
-                except (ValueError, IndexError):
-                    adc_batt = 0
+            
+            self._log_event("teste_bateria_curto", "NG" if adc_batt == 0 else "OK", adc_reading)
             
             if adc_batt == 0:
                 return TestResult(False, "Possível curto na bateria", {"adc_batt": 0})
@@ -532,37 +1016,30 @@ class Model:
             return TestResult(False, f"Erro no teste de bateria: {e}", {"adc_batt": 0})
     
     def test_dcdc_short(self) -> TestResult:
-        """Testa curto no DCDC - IDÊNTICO AO ORIGINAL."""
+        """
+        Testa curto no DCDC: mesmo critério do original (ADC_DCDC zero = curto),
+        com leitura assim que a tensão estabiliza (wait_settled, até 0.3 s).
+        """
         try:
-            self.ser.reset_input_buffer()
+            self._reset_input()
             
             # Liga o DCDC
-            self.ser.write(b'LIGDC')
-            self._wait_for_ack()
-            
-            time.sleep(0.3)
+            self.send_command(b'LIGDC')
             
-            # Faz leitura dos ADCs
-            self.ser.write(b'AQADC')
-            time.sleep(0.1)
-            resposta_adc = self.ser.readline().decode(errors='ignore').strip()
-            print(f"Resposta AQADC: [{resposta_adc}]")
+            # Aguarda a tensão estabilizar (até 0.3s) e faz leitura dos ADCs
+            adc_reading = self.wait_settled(("adc_dcdc",), max_wait=0.3,
+                                            condition=lambda r: r.adc_dcdc > 0)
+            print(f"Leitura AQADC: {adc_reading}")
             
             # Desliga o DCDC
-            self.ser.write(b'DESDC')
-            self._wait_for_ack()
+            self.send_command(b'DESDC')
             
             # Processamento do valor ADC
-            if len(resposta_adc) < 7:
+            adc_dcdc = adc_reading.adc_dcdc if adc_reading else 0
+            if adc_dcdc != adc_dcdc:  # Detecta NaN
                 adc_dcdc = 0
-            else:
-                try:
-                    valor_str = resposta_adc[19:24]  # Ajustar conforme sua resposta real
-                    adc_dcdc = float(valor_str) * self.const_fonte * self.red_dcdc
-                    if adc_dcdc != adc_dcdc:  # Detecta NaN
-                        adc_dcdc = 0
-                except (ValueError, IndexError):
-                    adc_dcdc = 0
+            
+            self._log_event("teste_dcdc_curto", "NG" if adc_dcdc == 0 else "OK", adc_reading)
             
             if adc_dcdc == 0:
                 return TestResult(False, "Possível curto no DCDC", {"adc_dcdc": 0})
@@ -575,13 +1052,16 @@ class Model:
             return TestResult(False, f"Erro no teste de DCDC: {e}", {"adc_dcdc": 0})
     
     def test_dcdc_and_load(self) -> Tuple[TestResult, TestResult]:
-        """Testa DCDC e carga - IDÊNTICO AO ORIGINAL."""
+        """
+        Testa DCDC e carga (Teste 1A) e o circuito de carga da bateria (Teste 1B).
+        Critérios do original; o 1B lê assim que DCDC e CF estabilizam
+        (wait_settled, até 0.8 s) e comandos que não mudariam a jiga são omitidos.
+        """
         try:
-            self.ser.reset_input_buffer()
+            self._reset_input()
             
             # Liga o DCDC
-            self.ser.write(b'LIGDC')
-            self._wait_for_ack()
+            self.send_command(b'LIGDC')
             
             # Aguarda temporizador da placa
             ok = self._wait_for_adc_5v()
@@ -589,21 +1069,19 @@ class Model:
                 return TestResult(False, "ADC_5V não atingiu 4V"), TestResult(False, "Teste não executado")
             
             # Faz leitura dos ADCs
-            self.ser.reset_input_buffer()
-            self.ser.write(b'AQADC\r')
-            time.sleep(0.3)
-            info = self.ser.readline().decode(errors='ignore').strip()
-            
-            # Conversão dos valores
-            adc_15v = float(info[1:6]) * self.const_fonte * self.red_adcs
-            adc_5v = float(info[7:12]) * self.const_fonte * self.red_adcs
-            adc_load = float(info[13:18]) * self.const_fonte * self.red_adcs
-            adc_dcdc = float(info[19:24]) * self.const_fonte * self.red_adcs
-            adc_batt = float(info[25:30]) * self.const_fonte * self.red_batt
-            adc_cf = float(info[31:36]) * self.const_fonte * self.red_cf
-            adc_pwm = float(info[37:42]) * self.const_fonte * self.red_pwm
-            adc_stepup = float(info[43:48]) * self.const_fonte * self.red_batt
-            adc_leit_corr = float(info[49:54]) * self.const_fonte * self.red_load
+            reading = self.read_adc()
+            if reading is None:
+                raise ValueError("Resposta AQADC inválida")
+            
+            adc_15v = reading.adc_15v
+            adc_5v = reading.adc_5v
+            adc_load = reading.adc_load
+            adc_dcdc = reading.adc_dcdc
+            adc_batt = reading.adc_batt
+            adc_cf = reading.adc_cf
+            adc_pwm = reading.adc_pwm
+            adc_stepup = reading.adc_stepup
+            adc_leit_corr = reading.adc_leit_corr
             
             # Teste funcionamento DCDC e carga
             if ((adc_batt > 27.5) and (adc_dcdc > 22) and (adc_load > 21.5) and 
@@ -616,40 +1094,31 @@ class Model:
                 info_status = 'NG'
                 print(f"\033[31mTeste 1A: {info_status}\033[0m")  # Texto vermelho no terminal
             
-            # Registro no TXT
-            with open(self.log_file, 'a') as f:
-                f.write('*********************************************************************************\n')
-                f.write(f'Teste Tensao DCDC, Load, StepUp: {info_status}\n')
-                f.write(f'DCDC {adc_dcdc:.2f}V *** Batt {adc_batt:.2f}V ***\n')
-                f.write(f'Load {adc_load:.2f}V *** CF {adc_cf:.2f}V ***\n')
+            # Registro no log de eventos
+            self._log_event("teste_tensao_dcdc_load_stepup", info_status, reading)
             
             # Liga carga da bateria
-            self.ser.write(b'LIGCB\r')  # Tensão virá do Stepup
-            ok, resposta_ack = self._wait_for_ack()
+            ok, resposta_ack = self.send_command(b'LIGCB\r')  # Tensão virá do Stepup
             if ok:
                 print(f"Resposta LIGCB: {resposta_ack}")
             else:
                 print(f"Timeout. Parcial: {resposta_ack}")
             
-            time.sleep(0.5)
+            # Aguarda a carga estabilizar (até 0.8s) e faz leitura dos ADCs
+            adc_reading = self.wait_settled(
+                ("adc_dcdc", "adc_cf"), max_wait=0.8,
+                condition=lambda r: r.adc_dcdc > 22 and 11 < r.adc_cf < 13.5
+            )
+            if adc_reading is None:
+                self.send_command(b'DESCB\r')
+                return (TestResult(teste1a, "Teste 1A " + ("OK" if teste1a else "NG"),
+                                   {"adc_batt": adc_batt, "adc_dcdc": adc_dcdc}),
+                        TestResult(False, "Teste 1B: leitura não estabilizou"))
             
-            # Faz leitura dos ADCs
-            self.ser.write(b'AQADC\r')
-            time.sleep(0.3)
-            info = self.ser.readline().decode(errors='ignore').strip()
-            
-            time.sleep(0.3)
-            
-            # Conversão dos valores
-            adc_15v2 = float(info[1:6]) * self.const_fonte * self.red_adcs
-            adc_5v2 = float(info[7:12]) * self.const_fonte * self.red_adcs
-            adc_load2 = float(info[13:18]) * self.const_fonte * self.red_adcs
-            adc_dcdc2 = float(info[19:24]) * self.const_fonte * self.red_adcs
-            adc_batt2 = float(info[25:30]) * self.const_fonte * self.red_batt
-            adc_cf2 = float(info[31:36]) * self.const_fonte * self.red_cf
-            adc_pwm2 = float(info[37:42]) * self.const_fonte * self.red_pwm
-            adc_stepup2 = float(info[43:48]) * self.const_fonte * self.red_batt
-            adc_leit_corr2 = float(info[49:54]) * self.const_fonte * self.red_load
+            adc_load2 = adc_reading.adc_load
+            adc_dcdc2 = adc_reading.adc_dcdc
+            adc_batt2 = adc_reading.adc_batt
+            adc_cf2 = adc_reading.adc_cf
             
             # Teste do circuito de carga da bateria
             if (adc_dcdc2 > 22) and (11 < adc_cf2 < 13.5):
@@ -661,16 +1130,11 @@ class Model:
                 info_status = 'NG'
                 print(f"\033[31mTeste 1B: {info_status}\033[0m")
             
-            # Registro no TXT
-            with open(self.log_file, 'a') as f:
-                f.write('*********************************************************************************\n')
-                f.write(f'Teste Circ Carga Bateria: {info_status}\n')
-                f.write(f'DCDC {adc_dcdc2:.2f}V *** Batt {adc_batt2:.2f}V ***\n')
-                f.write(f'Load {adc_load2:.2f}V *** CF {adc_cf2:.2f}V ***\n')
+            # Registro no log de eventos
+            self._log_event("teste_circ_carga_bateria", info_status, adc_reading)
             
             # Desliga carga
-            self.ser.write(b'DESCB\r')
-            ok, resposta_ack = self._wait_for_ack()
+            ok, resposta_ack = self.send_command(b'DESCB\r')
             if ok:
                 print(f"Resposta DESCB: {resposta_ack}")
             else:
@@ -686,40 +1150,39 @@ class Model:
             return TestResult(False, f"Erro no teste: {e}"), TestResult(False, f"Erro no teste: {e}")
     
     def test_isolated_battery(self) -> TestResult:
-        """Testa bateria isolada - IDÊNTICO AO ORIGINAL."""
+        """
+        Testa bateria isolada: critério do original, com leitura assim que o DCDC
+        descarrega e bateria e carga estabilizam (wait_settled, até 0.8 s).
+        """
         try:
-            self.ser.reset_input_buffer()
+            self._reset_input()
             
             # Liga a bateria
-            self.ser.write(b'LIGBT')
-            ok, resposta_ack = self._wait_for_ack()
+            ok, resposta_ack = self.send_command(b'LIGBT')
             if ok:
                 print(f"Resposta LIGBT: {resposta_ack}")
             else:
                 print(f"Timeout. Parcial: {resposta_ack}")
             
             # Desliga o DCDC
-            self.ser.write(b'DESDC')
-            ok, resposta_ack = self._wait_for_ack()
+            ok, resposta_ack = self.send_command(b'DESDC')
             if ok:
                 print(f"Resposta DESDC: {resposta_ack}")
             else:
                 print(f"Timeout. Parcial: {resposta_ack}")
             
-            time.sleep(0.5)
-            
-            # Leitura dos ADCs
-            self.ser.write(b'AQADC')
-            time.sleep(0.3)
-            info = self.ser.readline().decode(errors='ignore').strip()
+            # Aguarda o DCDC descarregar (até 0.8s) e faz leitura dos ADCs
+            adc_reading = self.wait_settled(
+                ("adc_batt", "adc_dcdc", "adc_load"), max_wait=0.8,
+                condition=lambda r: r.adc_batt > 22 and r.adc_dcdc < 5 and r.adc_load > 21.5
+            )
+            if adc_reading is None:
+                return TestResult(False, "Teste Bateria Isolada: leitura não estabilizou")
             
-            # Parsing dos valores
-            adc_15v = float(info[1:6]) * self.const_fonte * self.red_adcs
-            adc_5v = float(info[7:12]) * self.const_fonte * self.red_adcs
-            adc_cf = float(info[31:36]) * self.const_fonte * self.red_cf
-            adc_load = float(info[13:18]) * self.const_fonte * self.red_adcs
-            adc_batt = float(info[25:30]) * self.const_fonte * self.red_batt
-            adc_dcdc = float(info[19:24]) * self.const_fonte * self.red_adcs
+            adc_cf = adc_reading.adc_cf
+            adc_load = adc_reading.adc_load
+            adc_batt = adc_reading.adc_batt
+            adc_dcdc = adc_reading.adc_dcdc
             
             print(f"Leitura ADC -> CF: {adc_cf:.2f}V | Load: {adc_load:.2f}V | Batt: {adc_batt:.2f}V | DCDC: {adc_dcdc:.2f}V")
             
@@ -733,12 +1196,8 @@ class Model:
                 info_status = 'NG'
                 print("\033[31m❌ Teste Bateria Isolada: NG\033[0m")
             
-            # Log no arquivo
-            with open(self.log_file, 'a') as f:
-                f.write('*********************************************************************************\n')
-                f.write(f'Teste Bateria isolado: {info_status}\n')
-                f.write(f'DCDC {adc_dcdc:.2f}V *** Batt {adc_batt:.2f}V ***\n')
-                f.write(f'Load {adc_load:.2f}V *** CF {adc_cf:.2f}V ***\n')
+            # Registro no log de eventos
+            self._log_event("teste_bateria_isolada", info_status, adc_reading)
             
             return TestResult(teste3, "Teste Bateria Isolada: " + ("OK" if teste3 else "NG"),
                             {"adc_batt": adc_batt, "adc_dcdc": adc_dcdc, "adc_load": adc_load})
@@ -750,264 +1209,209 @@ class Model:
     def test_temperature_alarms(self) -> Dict[str, TestResult]:
         """Executa testes de alarme de temperatura."""
         results = {}
+        channels = ("adc_batt", "adc_dcdc", "adc_load")
+        alarm_on = lambda r: r.adc_batt > 22 and r.adc_dcdc < 5 and r.adc_load < 10
+        alarm_off = lambda r: r.adc_batt > 22 and r.adc_dcdc < 5 and r.adc_load > 21
+        # Carga ligada sem alarme é o mesmo estado esperado no retorno do alarme
+        load_on = alarm_off
         
         try:
             # Teste 4A
-            for cmd in [b'ACLOAD\r', b'ACTP1\r']:
-                self.send_command(cmd)
-                time.sleep(1)
+            self.send_command(b'ACLOAD\r')
+            self.wait_settled(channels, max_wait=1, condition=load_on)
+            self.send_command(b'ACTP1\r')
+            adc_reading = self.wait_settled(channels, max_wait=1, condition=alarm_on)
             
-            adc_reading = self.read_adc()
             self.send_command(b'DGLOAD\r')
             
             if adc_reading:
                 passed = (adc_reading.adc_batt > 22 and adc_reading.adc_dcdc < 5 and 
                          adc_reading.adc_load < 10)
-                results["Teste4A"] = TestResult(passed, "Teste Alarme Temp1", adc_reading.__dict__)
-                self._log_test_result("Teste Alarme Temp1", "OK" if passed else "NG", adc_reading)
+                results["Teste4A"] = TestResult(passed, "Teste Alarme Temp1", asdict(adc_reading))
+                self._log_event("teste_alarme_temp1", "OK" if passed else "NG", adc_reading)
             
             # Teste 4B
             self.send_command(b'ACTPA\r')
-            time.sleep(1)
-            
-            adc_reading = self.read_adc()
+            adc_reading = self.wait_settled(channels, max_wait=1, condition=alarm_off)
             if adc_reading:
                 passed = (adc_reading.adc_batt > 22 and adc_reading.adc_dcdc < 5 and 
                          adc_reading.adc_load > 21)
-                results["Teste4B"] = TestResult(passed, "Teste Retorno Al. Temp1", adc_reading.__dict__)
-                self._log_test_result("Teste Retorno Al. Temp1", "OK" if passed else "NG", adc_reading)
+                results["Teste4B"] = TestResult(passed, "Teste Retorno Al. Temp1", asdict(adc_reading))
+                self._log_event("teste_retorno_alarme_temp1", "OK" if passed else "NG", adc_reading)
             
             # Teste 4C
             self.send_command(b'ACLOAD\r')
-            time.sleep(1)
+            self.wait_settled(channels, max_wait=1, condition=load_on)
             self.send_command(b'ACTP2\r')
-            time.sleep(1)
+            adc_reading = self.wait_settled(channels, max_wait=1, condition=alarm_on)
             
-            adc_reading = self.read_adc()
             self.send_command(b'DGLOAD\r')
             
             if adc_reading:
                 passed = (adc_reading.adc_batt > 22 and adc_reading.adc_dcdc < 5 and 
                          adc_reading.adc_load < 10)
-                results["Teste4C"] = TestResult(passed, "Teste Al. Temp2", adc_reading.__dict__)
-                self._log_test_result("Teste Al. Temp2", "OK" if passed else "NG", adc_reading)
+                results["Teste4C"] = TestResult(passed, "Teste Al. Temp2", asdict(adc_reading))
+                self._log_event("teste_alarme_temp2", "OK" if passed else "NG", adc_reading)
             
             # Teste 4D
             self.send_command(b'ACTPA\r')
-            time.sleep(2)
-            
-            adc_reading = self.read_adc()
+            adc_reading = self.wait_settled(channels, max_wait=2, condition=alarm_off)
             if adc_reading:
                 passed = (adc_reading.adc_batt > 22 and adc_reading.adc_dcdc < 5 and 
                          adc_reading.adc_load > 21)
-                results["Teste4D"] = TestResult(passed, "Teste Retorno Al. Temp2", adc_reading.__dict__)
-                self._log_test_result("Teste Retorno Al. Temp2", "OK" if passed else "NG", adc_reading)
+                results["Teste4D"] = TestResult(passed, "Teste Retorno Al. Temp2", asdict(adc_reading))
+                self._log_event("teste_retorno_alarme_temp2", "OK" if passed else "NG", adc_reading)
                 
         except Exception as e:
             results["error"] = TestResult(False, f"Erro nos testes de temperatura: {e}")
         
         return results
     
-    def test_pwm_variation(self, use_enpth: bool = False, check_adc_load: bool = False) -> PWMTestResult:
-        """Testa variação PWM."""
-        result = PWMTestResult()
-        result.adc_batt_at_load_alarm = 20
-        flag_adc_load = not check_adc_load
-        flag_adc5v = False
-        flag_adc15v = False
-        flag_desbt = False
-        
-        try:
-            self.send_command(b'DGPTH\r')
-            
-            if use_enpth:
-                self.send_command(b'ENPTH\r')
-            
-            for duty in np.arange(70.0, 59.9, -0.2):
-                command = f'FR1D{duty:.1f}\r'.encode()
-                self.send_command(command)
-                time.sleep(1)
-                
-                if not flag_desbt:
-                    self.send_command(b'DESBT\r')
-                    flag_desbt = True
-                
-                adc_reading = self.read_adc()
-                if not adc_reading:
-                    continue
-                
-                # Verificações de acordo com os flags
-                if check_adc_load and not flag_adc_load and adc_reading.adc_load < 4.8:
-                    result.duty_adc_at_load_alarm = duty
-                    result.adc_batt_at_load_alarm = adc_reading.adc_batt
-                    flag_adc_load = True
-                
-                if flag_adc_load:
-                    if not flag_adc5v and adc_reading.adc_5v < 4.8:
-                        result.duty_adc5v_below5v = duty
-                        result.adc_batt_at5v = adc_reading.adc_batt
-                        flag_adc5v = True
-                    
-                    if not flag_adc15v and adc_reading.adc_15v < 14.8:
-                        result.duty_adc15v_below15v = duty
-                        result.adc_batt_at15v = adc_reading.adc_batt
-                        flag_adc15v = True
-                        
-                        # Restaura condições
-                        self.send_command(b'FR1D80\r')
-                        self.send_command(b'LIGDC\r')
-                        
-                        if not self._wait_for_adc_5v():
-                            return result
-                        
-                        time.sleep(2)
-                        self.send_command(b'DESDC\r')
-                
-                if flag_adc_load and flag_adc5v and flag_adc15v:
-                    break
-                    
-        except Exception:
-            pass
+    def test_pwm_sweep(self, use_enpth: bool = True, check_adc_load: bool = True) -> PWMSweepResult:
+        """
+        Varredura PWM: substitui os antigos testes PWM e PWM PTH.
         
-        return result
-    
-    def test_pwm_pth_variation(self, use_enpth: bool = True, check_adc_load: bool = True) -> PWMTestResult:
-        """Testa variação PWM com PTH - IDÊNTICO AO ORIGINAL."""
-        result = PWMTestResultPTH()
-        flag_adc_load = not check_adc_load
-        flag_adc5v = False
-        flag_adc15v = False
-        flag_desbt = False
+        Cada limiar é buscado (de 72% a 60%) na condição do teste que ele substitui,
+        em dois estágios independentes: as quedas de 5V e 15V com PTH desligado e
+        sem carga, como no teste PWM, e o alarme de carga com PTH e carga acionados,
+        como no teste PWM PTH. Assim os critérios de rails_valid() e
+        load_alarm_valid() continuam os mesmos; os duties de 5V/15V gravados passam
+        a ser os do estágio sem PTH (ver PWMSweepResult).
+        """
+        result = PWMSweepResult()
+        hints = self._sweep_hints() if self.warm_start else {}
         
-        if use_enpth:
-            self.ser.write(b'ENPTH\r')
-            self._wait_for_ack()
-            self.ser.write(b'ACLOAD\r')
-            self._wait_for_ack()
+        self.pth_samples = SampleBuffer()
+        self._sample_sink = self.pth_samples
         
         try:
-            # Loop 1: verifica ADC_load < 5V se necessário
+            # Estágio 1: quedas de 5V e 15V, PTH desligado e sem carga
+            self.send_batch([b'DGPTH\r', b'DGLOAD\r', b'FR1D80\r', b'DESBT\r'])
+            self._duty = 80.0
+            thresholds = find_thresholds(
+                self._probe_rail_drops, ["5v", "15v"], start=72.0, stop=60.0,
+                reset=self._restore_rails,
+                hints={name: band for name, band in hints.items() if name in ("5v", "15v")},
+            )
+            self._restore_rails()
+            
+            # Estágio 2: alarme de carga, PTH e carga acionados
             if check_adc_load:
-                if not flag_desbt:
-                    self.ser.write(b'FR1D80\r')
-                    self._wait_for_ack()
-                    time.sleep(0.5)
-                    self.ser.reset_input_buffer()
-                    self.ser.write(b'DESBT\r')
-                    self._wait_for_ack()
-                    flag_desbt = True
-                
-                # Inicialização antes do loop principal
-                ema_load = None
-                ema_batt = None
-                alpha = 0.25  # Fator de suavização: 0.1 a 0.3 é comum para EMA em tempo real
-                
-                iteration_count = 0
-                for duty in np.arange(63.0, 59.9, -0.001):
-                    comando = f'FR1D{duty:.1f}\r'.encode()
-                    self.ser.write(comando)
-                    self._wait_for_ack()
-                    
-                    self.ser.reset_input_buffer()
-                    self.ser.write(b'AQADC\r')
-                    info = self.ser.readline().decode(errors='ignore').strip()
-                    
-                    # Dentro do loop principal...
-                    try:
-                        adc_load = float(info[13:18]) * self.const_fonte * self.red_adcs
-                        adc_batt = float(info[25:30]) * self.const_fonte * self.red_batt
-                    except ValueError:
-                        continue
-                    
-                    # Inicializa EMA na primeira leitura
-                    if ema_load is None:
-                        ema_load = adc_load
-                        ema_batt = adc_batt
-                    else:
-                        ema_load = alpha * adc_load + (1 - alpha) * ema_load
-                        ema_batt = alpha * adc_batt + (1 - alpha) * ema_batt
-                    
-                    # Cálculo da diferença
-                    diferenca = abs(ema_load - ema_batt)
-                    
-                    # Print apenas a cada 100 iterações para não poluir
-                    iteration_count += 1
-                    if iteration_count % 100 == 0:
-                        print(f"📈 EMA ADC_load: {ema_load:.2f} V | EMA ADC_Batt: {ema_batt:.2f} V | Diferença: {diferenca:.2f} V")
-                    
-                    if diferenca > 0.7:
-                        self.ser.write(b'LIGBT\r')  # acionar bateria
-                        self._wait_for_ack()
-                        
-                        self.ser.write(b'FR1D80\r')
-                        self._wait_for_ack()
-                        result.duty_adc_at_load_alarm = duty
-                        result.adc_batt_at_load_alarm = adc_batt
-                        
-                        self.ser.write(b'DESBT\r')  # acionar bateria
-                        self._wait_for_ack()
-                        
-                        with open(self.log_file, 'a') as f:
-                            f.write('***** ADC_load caiu abaixo de 5V *****\n')
-                            f.write(f'Duty: {duty:.1f}\n')
-                            f.write(f'ADC_Batt: {adc_batt:.2f}V\n')
-                        
-                        print("✔️ Alarme de carga desligada (ADC_load).")
-                        break  # Finaliza primeiro estágio
-            
-            # Loop 2: detecta queda de 5V e 15V
-            for duty in np.arange(72.0, 59.9, -0.2):
-                comando = f'FR1D{duty:.1f}\r'.encode()
-                self.ser.write(comando)
-                self._wait_for_ack()
-                time.sleep(0.5)
-                
-                self.ser.reset_input_buffer()
-                self.ser.write(b'AQADC\r')
-                info = self.ser.readline().decode(errors='ignore').strip()
-                
-                try:
-                    adc_15v = float(info[1:6]) * self.const_fonte * self.red_adcs
-                    adc_5v = float(info[7:12]) * self.const_fonte * self.red_adcs
-                    adc_batt = float(info[25:30]) * self.const_fonte * self.red_batt
-                except ValueError:
+                self.send_batch([b'ENPTH\r' if use_enpth else b'DGPTH\r', b'ACLOAD\r'])
+                self._rearm_load_alarm()
+                thresholds.update(find_thresholds(
+                    self._probe_load_alarm, ["load"], start=72.0, stop=60.0,
+                    reset=self._rearm_load_alarm,
+                    hints={name: band for name, band in hints.items() if name == "load"},
+                ))
+            
+            print("Varredura PWM: " + " | ".join(
+                f"{name}: {t.duty} ({t.probes} sondas{', histórico' if t.warm_start else ''})"
+                for name, t in thresholds.items()))
+            
+            fields = {
+                "load": ("duty_adc_at_load_alarm", "adc_batt_at_load_alarm", "limiar_alarme_carga"),
+                "5v": ("duty_adc5v_below5v", "adc_batt_at5v", "limiar_queda_5v"),
+                "15v": ("duty_adc15v_below15v", "adc_batt_at15v", "limiar_queda_15v"),
+            }
+            for name, threshold in thresholds.items():
+                if threshold.duty is None:
                     continue
+                duty_field, batt_field, event = fields[name]
+                setattr(result, duty_field, threshold.duty)
+                setattr(result, batt_field, threshold.reading.adc_batt)
                 
-                print(f"Duty {duty:.1f} → ADC_15V: {adc_15v:.2f}V | ADC_5V: {adc_5v:.2f}V | ADC_Batt: {adc_batt:.2f}V")
-                
-                if not flag_adc5v and adc_5v < 4.8:
-                    result.duty_adc5v_below5v = duty
-                    result.adc_batt_at5v = adc_batt
-                    flag_adc5v = True
-                    
-                    with open(self.log_file, 'a') as f:
-                        f.write('***** ADC_5V caiu abaixo de 5V *****\n')
-                        f.write(f'Duty: {duty:.1f}\n')
-                        f.write(f'ADC_Batt: {adc_batt:.2f}V\n')
-                
-                if not flag_adc15v and adc_15v < 14.8:
-                    result.duty_adc15v_below15v = duty
-                    result.adc_batt_at15v = adc_batt
-                    flag_adc15v = True
-                    
-                    with open(self.log_file, 'a') as f:
-                        f.write('***** ADC_15V caiu abaixo de 15V *****\n')
-                        f.write(f'Duty: {duty:.1f}\n')
-                        f.write(f'ADC_Batt: {adc_batt:.2f}V\n')
-                
-                if flag_adc5v and flag_adc15v:
-                    break
-            
-            self.ser.write(b'DGLOAD\r')
-            self._wait_for_ack()
+                self._log_event(event, reading=threshold.reading, duty=threshold.duty,
+                                sondas=threshold.probes)
             
+            self.send_batch([b'LIGBT\r', b'FR1D80\r', b'DESBT\r', b'DGLOAD\r'])
             return result
         
         except Exception as e:
-            print(f"[ERRO] Durante teste PWM: {e}")
-            self.ser.write(b'DGLOAD\r')
-            self._wait_for_ack()
+            print(f"[ERRO] Durante varredura PWM: {e}")
+            self.send_command(b'DGLOAD\r')
             return result
+        
+        finally:
+            self._sample_sink = None
+            self._duty = float('nan')
+    
+    def _sweep_hints(self) -> Dict[str, Tuple[float, float]]:
+        """Faixa esperada de cada limiar da varredura, pelas últimas sessões gravadas."""
+        columns = {
+            "load": "Duty_Cycle_Alarme_Carga_Percent",
+            "5v": "Duty_Cycle_Queda_5V_Percent",
+            "15v": "Duty_Cycle_Queda_15V_Percent",
+        }
+        history = self.excel_logger.recent_values(list(columns.values()))
+        hints = warm_start_hints({name: history.get(column, []) for name, column in columns.items()})
+        for name, (low, high) in hints.items():
+            print(f"Faixa do histórico para {name}: {low:.1f}% a {high:.1f}%")
+        return hints
+    
+    def _set_duty(self, duty: float, channels: Tuple[str, ...], max_wait: float,
+                  stop: Optional[Callable[[ADCReading], bool]] = None,
+                  min_wait: float = 0.0) -> Optional[ADCReading]:
+        """Aplica um duty (FR1D) e retorna a leitura estabilizada."""
+        self.send_command(f'FR1D{duty:.1f}\r'.encode())
+        self._duty = duty
+        return self.wait_settled(channels, max_wait=max_wait, stop=stop, min_wait=min_wait)
+    
+    def _set_duty_watch_load(self, duty: float, channels: Tuple[str, ...]) -> Tuple[bool, Optional[ADCReading]]:
+        """
+        Aplica um duty alimentando o detector de alarme de carga a cada leitura.
+        Retorna (alarme_detectado, leitura); encerra assim que o detector dispara.
+        """
+        detector = self.load_alarm_detector
+        detector.reset()
+        reading = self._set_duty(duty, channels, max_wait=0.5, min_wait=self.probe_dwell,
+                                 stop=lambda r: detector.update(abs(r.adc_load - r.adc_batt)))
+        if detector.detected_at is not None:
+            print(f"Alarme de carga detectado em {duty:.1f}% (atraso: {detector.delay} amostras)")
+            return True, reading
+        return False, reading
+    
+    def _rearm_load_alarm(self):
+        """Sobe a bateria acima da tensão de reconexão para rearmar o alarme de carga."""
+        self.send_batch([b'FR1D80\r', b'DESBT\r'])
+        self._duty = 80.0
+        self.wait_settled(("adc_load", "adc_batt"), max_wait=0.5,
+                          condition=lambda r: abs(r.adc_load - r.adc_batt) < 0.7)
+    
+    def _restore_rails(self):
+        """
+        Traz 5V e 15V de volta após uma queda: sobe o duty e, se a placa não se
+        recuperar sozinha (brown-out), religa o DCDC e espera o temporizador da
+        placa, como fazia o antigo teste PWM após a queda do 15V.
+        """
+        self.send_command(b'FR1D80\r')
+        self._duty = 80.0
+        rails_up = lambda r: r.adc_5v > 4.8 and r.adc_15v > 14.8
+        reading = self.wait_settled(("adc_5v", "adc_15v"), max_wait=0.5, condition=rails_up)
+        if reading is not None and rails_up(reading):
+            return
+        
+        print("5V/15V não voltaram com o duty: religando o DCDC")
+        self.send_command(b'LIGDC\r')
+        if self._wait_for_adc_5v():
+            self.sleep(2)
+        self.send_command(b'DESDC\r')
+    
+    def _probe_load_alarm(self, duty: float) -> Tuple[Dict[str, bool], Optional[ADCReading]]:
+        alarm, reading = self._set_duty_watch_load(duty, ("adc_load", "adc_batt"))
+        if reading is None:
+            return {}, None
+        diferenca = abs(reading.adc_load - reading.adc_batt)
+        print(f"Duty {duty:.1f} → ADC_load: {reading.adc_load:.2f}V | ADC_Batt: {reading.adc_batt:.2f}V | Diferença: {diferenca:.2f}V")
+        return {"load": alarm}, reading
+    
+    def _probe_rail_drops(self, duty: float) -> Tuple[Dict[str, bool], Optional[ADCReading]]:
+        reading = self._set_duty(duty, ("adc_batt", "adc_5v", "adc_15v"), max_wait=0.5,
+                                 min_wait=self.probe_dwell)
+        if reading is None:
+            return {}, None
+        print(f"Duty {duty:.1f} → ADC_15V: {reading.adc_15v:.2f}V | ADC_5V: {reading.adc_5v:.2f}V | ADC_Batt: {reading.adc_batt:.2f}V")
+        return {"5v": reading.adc_5v < 4.8, "15v": reading.adc_15v < 14.8}, reading
 
     # ═══════════════════════════════════════════════════════════════════
     # TESTES DE COMUNICAÇÃO
@@ -1050,69 +1454,27 @@ class Model:
             # Sequência correta para teste de comunicação
             self.initialize_system()
             
-            self.ser.write(b'LIGBT')
-            self._wait_for_ack()
-            self.ser.write(b'LIGDC')
-            self._wait_for_ack()
-            time.sleep(2)
+            self.send_batch([b'LIGBT', b'LIGDC'])
+            self.sleep(2)
             
             # Enviar comando $startTest 3x com timeout longo
             response = ""
             for attempt in range(2):
                 self.ser.write(b'$startTest')
-                self.ser.reset_input_buffer()
+                self._reset_input()
                 
                 try:
-                    response = self.ser.read_until().decode()
+                    response = self._read_line(self.ser.timeout)
                     if '$ok' in response and 'startTest' in response:
                         break
                     print(f"[DEBUG] Tentativa {attempt + 1}: Resposta incompleta: {response}")
                 except Exception as e:
                     print(f"[DEBUG] Tentativa {attempt + 1}: Erro na leitura: {e}")
-                    time.sleep(1)
+                    self.sleep(1)
             
             print(f"[DEBUG] Resposta final recebida: {response}")
             
-            # Analisar resposta esperada: $ok,startTest,rak,ok,inc,ok,adc,ok
-            # Inicializar resultados como falha
-            results = {
-                "rak": TestResult(False, "Teste RAK: NG - sem resposta"),
-                "inclinometro": TestResult(False, "Teste Inclinômetro: NG - sem resposta"), 
-                "adc": TestResult(False, "Teste ADC: NG - sem resposta")
-            }
-            
-            if '$ok' in response and 'startTest' in response:
-                # Dividir por vírgulas e analisar
-                parts = response.replace('$ok,', '').strip().split(',')
-                
-                # Procurar pelos componentes e seus status
-                for i, part in enumerate(parts):
-                    part = part.strip().lower()
-                    
-                    if 'rak' in part and i + 1 < len(parts):
-                        status = parts[i + 1].strip().lower()
-                        results["rak"] = TestResult(
-                            status == 'ok',
-                            f"Teste RAK: {'OK' if status == 'ok' else 'NG'}"
-                        )
-                    
-                    elif 'inc' in part and i + 1 < len(parts):
-                        status = parts[i + 1].strip().lower()
-                        results["inclinometro"] = TestResult(
-                            status == 'ok',
-                            f"Teste Inclinômetro: {'OK' if status == 'ok' else 'NG'}"
-                        )
-                    
-                    elif 'adc' in part and i + 1 < len(parts):
-                        status = parts[i + 1].strip().lower()
-                        results["adc"] = TestResult(
-                            status == 'ok',
-                            f"Teste ADC: {'OK' if status == 'ok' else 'NG'}"
-                        )
-            else:
-                print(f"[ERRO] Resposta inválida ou timeout: {response}")
-            
-            return results
+            return self._parse_start_test(response)
             
         except Exception as e:
             print(f"[ERRO] Durante teste de comunicação: {e}")
@@ -1122,6 +1484,50 @@ class Model:
                 "rak": TestResult(False, f"Erro no teste RAK: {e}")
             }
     
+    @staticmethod
+    def _parse_start_test(response: str) -> Dict[str, TestResult]:
+        """Resultados de RAK, inclinômetro e ADC a partir da resposta do $startTest."""
+        # Analisar resposta esperada: $ok,startTest,rak,ok,inc,ok,adc,ok
+        # Inicializar resultados como falha
+        results = {
+            "rak": TestResult(False, "Teste RAK: NG - sem resposta"),
+            "inclinometro": TestResult(False, "Teste Inclinômetro: NG - sem resposta"), 
+            "adc": TestResult(False, "Teste ADC: NG - sem resposta")
+        }
+        
+        if '$ok' in response and 'startTest' in response:
+            # Dividir por vírgulas e analisar
+            parts = response.replace('$ok,', '').strip().split(',')
+            
+            # Procurar pelos componentes e seus status
+            for i, part in enumerate(parts):
+                part = part.strip().lower()
+                
+                if 'rak' in part and i + 1 < len(parts):
+                    status = parts[i + 1].strip().lower()
+                    results["rak"] = TestResult(
+                        status == 'ok',
+                        f"Teste RAK: {'OK' if status == 'ok' else 'NG'}"
+                    )
+                
+                elif 'inc' in part and i + 1 < len(parts):
+                    status = parts[i + 1].strip().lower()
+                    results["inclinometro"] = TestResult(
+                        status == 'ok',
+                        f"Teste Inclinômetro: {'OK' if status == 'ok' else 'NG'}"
+                    )
+                
+                elif 'adc' in part and i + 1 < len(parts):
+                    status = parts[i + 1].strip().lower()
+                    results["adc"] = TestResult(
+                        status == 'ok',
+                        f"Teste ADC: {'OK' if status == 'ok' else 'NG'}"
+                    )
+        else:
+            print(f"[ERRO] Resposta inválida ou timeout: {response}")
+        
+        return results
+    
     def test_rtc_communication(self) -> TestResult:
         """Teste de comunicação do RTC - sequência robusta baseada no initialize_system."""
         if not self.ser or not self.ser.is_open:
@@ -1129,22 +1535,21 @@ class Model:
         
         try:     
             self.initialize_system()
-            self.ser.write(b'LIGBT')
-            self._wait_for_ack()
-            self.ser.write(b'LIGDC')
-            self._wait_for_ack()
-            time.sleep(5)
-            command = f"$cTime,{int(time.time())}".encode()
+            self.send_batch([b'LIGBT', b'LIGDC'])
+            # Aguarda o 5V da placa estabilizar (até 5s) antes de falar com o RTC
+            self.wait_settled(("adc_5v",), max_wait=5, samples=5,
+                              condition=lambda r: r.adc_5v > 4.5)
+            command = f"$cTime,{int(self.clock.time())}".encode()
             response = ""
             
             for attempt in range(3):
                 print(f"[DEBUG RTC] Tentativa {attempt + 1}: Enviando comando RTC")
-                self.ser.reset_input_buffer()
+                self._reset_input()
                 self.ser.write(command)
                 self.ser.write(command)
                 self.ser.write(command)
                 try:
-                    response = self.ser.read_until().decode()
+                    response = self._read_line(self.ser.timeout)
                     print(f"[DEBUG RTC] Tentativa {attempt + 1}: Resposta: {response}")
                     
                     if '$ok' in response.lower() and 'rtc' in response.lower():
@@ -1153,12 +1558,13 @@ class Model:
                         
                 except Exception as e:
                     print(f"[DEBUG RTC] Tentativa {attempt + 1}: Erro na leitura: {e}")
-                    time.sleep(1)
+                    self.sleep(1)
                 
                 if attempt < 2:  # Não fazer delay após última tentativa
                     self.initialize_system()
-                    self.ser.write(b'LIGBT')
-                    time.sleep(5)
+                    self.send_command(b'LIGBT')
+                    self.wait_settled(("adc_5v",), max_wait=5, samples=5,
+                                      condition=lambda r: r.adc_5v > 4.5)
             
             # Restaurar timeout original
             print(f"[DEBUG RTC] Todas as tentativas falharam. Resposta final: {response}")
@@ -1187,28 +1593,26 @@ class Model:
             print(f"[DEBUG SN] Comando enviado: {command}")
             
             # Enviar comando 1x apenas
-            self.ser.reset_input_buffer()
+            self._reset_input()
             self.ser.write(command)
             print(f"[DEBUG SN] Comando enviado 1x")
             
             # Aguardar resposta "$ok,serialNumber" por 30s
-            start_time = time.time()
-            buffer = ""
             timeout = 30.0
-            
+
             print(f"[DEBUG SN] Aguardando resposta por {timeout}s...")
-            while time.time() - start_time < timeout:
-                if self.ser.in_waiting:
-                    new_data = self.ser.read(self.ser.in_waiting).decode(errors='ignore')
-                    buffer += new_data
-                    print(f"[DEBUG SN] Dados recebidos: {repr(new_data)}")
-                    print(f"[DEBUG SN] Buffer total: {repr(buffer)}")
-                    
-                    if "$ok,serialnumber" in buffer.lower():
-                        print(f"[DEBUG SN] Sucesso! Resposta válida encontrada")
-                        return TestResult(True, "Teste Serial Number: OK")
-                time.sleep(0.01)
-            
+            # Desconectado durante o teste (ex.: cancelamento): NG, não AttributeError
+            reader = self.reader
+            if reader is None:
+                return TestResult(False, "Teste Serial Number: NG - porta desconectada")
+            frame, skipped = reader.wait_for(
+                lambda f: "$ok,serialnumber" in f.text.lower(), timeout
+            ) or (None, [])
+            buffer = "\n".join(f.text for f in skipped)
+            if frame:
+                print(f"[DEBUG SN] Sucesso! Resposta válida encontrada: {repr(frame.text)}")
+                return TestResult(True, "Teste Serial Number: OK")
+
             print(f"[DEBUG SN] Timeout após 30s! Buffer final: {repr(buffer)}")
             return TestResult(False, f"Teste Serial Number: NG - resposta: {buffer}")
             
@@ -1218,10 +1622,10 @@ class Model:
     
     def test_eeprom_communication(self) -> TestResult:
         """Teste de comunicação da EEPROM - sempre retorna OK por enquanto."""
-        time.sleep(0.1)  # Simula tempo de teste
+        self.sleep(0.1)  # Simula tempo de teste
         return TestResult(True, "Teste de comunicação EEPROM OK")
     
     def test_ponte_h_communication(self) -> TestResult:
         """Teste de comunicação da Ponte H - sempre retorna OK por enquanto."""
-        time.sleep(0.1)  # Simula tempo de teste
+        self.sleep(0.1)  # Simula tempo de teste
         return TestResult(True, "Teste de comunicação Ponte H OK")
\ No newline at end of file
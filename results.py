@@ -0,0 +1,320 @@
+"""
+Armazenamento dos resultados das sessões de teste.
+
+Cada sessão é uma linha inserida numa base SQLite em modo WAL
+(``log/resultados.db``): gravar uma placa custa o mesmo com 10 ou 100 mil
+placas no histórico, e uma queda no meio da gravação não corrompe as sessões
+anteriores. A planilha ``resultados_testes.xlsx`` passa a ser uma exportação,
+gerada sob demanda ou periodicamente em segundo plano.
+
+A tabela é indexada por ``Numero_Serie`` e cada sessão guarda onde estão seus
+dados brutos (curva da varredura, tempos por passo e posição no log de
+eventos): ``ResultsStore.history`` responde "o que aconteceu com a placa X"
+sem varrer o histórico. Pela linha de comando:
+
+    python results.py historico NUMERO_SERIE [--db log/resultados.db] [--eventos]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence
+from urllib.request import pathname2url
+
+import pandas as pd
+
+# Colunas numéricas; as demais são texto
+REAL_COLUMNS = {
+    "Tensao_Bateria_Alarme_V", "Duty_Cycle_Alarme_Carga_Percent",
+    "Tensao_Bateria_5V_V", "Duty_Cycle_Queda_5V_Percent",
+    "Tensao_Bateria_15V_V", "Duty_Cycle_Queda_15V_Percent",
+}
+
+# Referências aos dados brutos da sessão (não vão para a planilha)
+REF_COLUMNS = ["Id_Sessao", "Arquivo_Curva", "Arquivo_Tempos", "Segmento_Eventos", "Posicao_Eventos"]
+INTEGER_COLUMNS = {"Posicao_Eventos"}
+
+
+def _column_type(name: str) -> str:
+    if name in REAL_COLUMNS:
+        return "REAL"
+    if name in INTEGER_COLUMNS:
+        return "INTEGER"
+    return "TEXT"
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+@dataclass
+class SessionRecord:
+    """Uma sessão no histórico de uma placa."""
+    id: int
+    data_hora: Optional[str]
+    numero_serie: str
+    operador: Optional[str]
+    resultado: Optional[str]
+    testes: Dict[str, Optional[str]] = field(default_factory=dict)
+    id_sessao: Optional[str] = None
+    arquivo_curva: Optional[str] = None
+    arquivo_tempos: Optional[str] = None
+    segmento_eventos: Optional[str] = None
+    posicao_eventos: Optional[int] = None
+
+
+class ResultsStore:
+    """
+    Tabela de sessões append-only em SQLite, com exportação para Excel.
+
+    ``columns`` são as colunas da planilha; as ``REF_COLUMNS`` são gravadas
+    junto, mas ficam fora da exportação. Sem ``columns``, serve só para
+    consultar uma base existente (ex.: ``history``); com ``read_only`` a base
+    é aberta só para leitura, sem criar tabelas, migrar colunas nem mudar o
+    journal_mode de uma base que a aplicação pode estar usando.
+    """
+
+    def __init__(self, db_path: str, columns: Sequence[str] = (), read_only: bool = False):
+        self.db_path = db_path
+        self.columns = list(columns)
+        self.all_columns = self.columns + [c for c in REF_COLUMNS if c not in self.columns]
+        self._lock = threading.Lock()
+        if read_only:
+            uri = "file:" + pathname2url(os.path.abspath(db_path)) + "?mode=ro"
+            self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            return
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._create_table()
+
+    def _create_table(self):
+        columns = ", ".join(f"{_quote(c)} {_column_type(c)}" for c in self.all_columns)
+        with self._lock, self._conn:
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS sessions (id INTEGER PRIMARY KEY AUTOINCREMENT, {columns})")
+            # Bases criadas por versões anteriores: acrescenta as colunas que faltam
+            existing = {row[1] for row in self._conn.execute("PRAGMA table_info(sessions)")}
+            for c in self.all_columns:
+                if c not in existing:
+                    self._conn.execute(f"ALTER TABLE sessions ADD COLUMN {_quote(c)} {_column_type(c)}")
+            if "Numero_Serie" in self.all_columns:
+                self._conn.execute('CREATE INDEX IF NOT EXISTS sessions_numero_serie ON sessions ("Numero_Serie", id)')
+            # Última sessão presente na planilha exportada
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def last_id(self) -> int:
+        """Id da sessão mais recente (0 se vazia)."""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM sessions").fetchone()[0]
+
+    def exported_id(self) -> int:
+        """Id da última sessão já exportada para a planilha (0 se nunca exportada)."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'excel_ultimo_id'").fetchone()
+        return int(row[0]) if row else 0
+
+    def _set_exported_id(self, last_id: int):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('excel_ultimo_id', ?)", (last_id,))
+
+    def append(self, row: Dict) -> int:
+        """Insere uma sessão e retorna seu id."""
+        return self.extend([row])[-1]
+
+    def extend(self, rows: Iterable[Dict]) -> List[int]:
+        """Insere várias sessões numa única transação."""
+        placeholders = ", ".join("?" for _ in self.all_columns)
+        sql = f"INSERT INTO sessions ({', '.join(_quote(c) for c in self.all_columns)}) VALUES ({placeholders})"
+        ids = []
+        with self._lock, self._conn:
+            for row in rows:
+                cursor = self._conn.execute(sql, [row.get(c) for c in self.all_columns])
+                ids.append(cursor.lastrowid)
+        return ids
+
+    def recent_values(self, columns: List[str], limit: int = 50) -> Dict[str, List[float]]:
+        """Últimos `limit` valores não vazios de cada coluna, do mais antigo ao mais recente."""
+        values = {}
+        with self._lock:
+            for column in columns:
+                if column not in self.columns:
+                    values[column] = []
+                    continue
+                rows = self._conn.execute(
+                    f"SELECT {_quote(column)} FROM sessions WHERE {_quote(column)} IS NOT NULL "
+                    f"ORDER BY id DESC LIMIT ?", (limit,)
+                ).fetchall()
+                values[column] = [float(v) for (v,) in reversed(rows)]
+        return values
+
+    def history(self, numero_serie: str) -> List[SessionRecord]:
+        """Todas as sessões de uma placa, da mais antiga à mais recente (busca pelo índice)."""
+        with self._lock:
+            cursor = self._conn.execute(
+                'SELECT * FROM sessions WHERE "Numero_Serie" = ? ORDER BY id', (str(numero_serie),)
+            )
+            names = [d[0] for d in cursor.description]
+            rows = cursor.fetchall()
+
+        records = []
+        for values in rows:
+            row = dict(zip(names, values))
+            records.append(SessionRecord(
+                id=row["id"],
+                data_hora=row.get("Data_Hora"),
+                numero_serie=row.get("Numero_Serie"),
+                operador=row.get("Operador"),
+                resultado=row.get("Resultado_Geral"),
+                testes={c: v for c, v in row.items() if c.startswith("Teste_")},
+                id_sessao=row.get("Id_Sessao"),
+                arquivo_curva=row.get("Arquivo_Curva"),
+                arquivo_tempos=row.get("Arquivo_Tempos"),
+                segmento_eventos=row.get("Segmento_Eventos"),
+                posicao_eventos=row.get("Posicao_Eventos"),
+            ))
+        return records
+
+    def dataframe(self) -> pd.DataFrame:
+        """Todas as sessões, na ordem de gravação."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_quote(c) for c in self.columns)} FROM sessions ORDER BY id"
+            ).fetchall()
+        return pd.DataFrame(rows, columns=self.columns)
+
+    def import_excel(self, excel_file: str) -> int:
+        """Importa as linhas de uma planilha antiga; retorna quantas foram importadas."""
+        df = pd.read_excel(excel_file, engine='openpyxl')
+        df = df.astype(object).where(pd.notna(df), None)
+        rows = [{c: row.get(c) for c in self.columns} for row in df.to_dict("records")]
+        for row in rows:
+            if row.get("Data_Hora") is not None:
+                row["Data_Hora"] = str(row["Data_Hora"])
+            if row.get("Numero_Serie") is not None:
+                row["Numero_Serie"] = str(row["Numero_Serie"])
+        ids = self.extend(rows)
+        # Essas sessões já estão na planilha de origem
+        if ids:
+            self._set_exported_id(ids[-1])
+        return len(ids)
+
+    def export_excel(self, excel_file: str):
+        """Gera a planilha com todo o histórico (arquivo temporário + rename atômico)."""
+        last_id = self.last_id()
+        tmp_file = excel_file + ".tmp.xlsx"
+        self.dataframe().to_excel(tmp_file, index=False, engine='openpyxl')
+        os.replace(tmp_file, excel_file)
+        self._set_exported_id(last_id)
+
+    def is_exported(self, excel_file: str) -> bool:
+        """A planilha existe e já contém todas as sessões da base."""
+        return os.path.exists(excel_file) and self.exported_id() >= self.last_id()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class PeriodicExport:
+    """Thread que regenera a planilha a cada `interval` segundos, se houver sessões novas."""
+
+    def __init__(self, store: ResultsStore, excel_file: str, interval: float):
+        self.store = store
+        self.excel_file = excel_file
+        self.interval = interval
+        self._dirty = threading.Event()
+        self._stop = threading.Event()
+        # Exportação sob demanda (botão Compilar) pode coincidir com a periódica
+        self._export_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def mark_dirty(self):
+        self._dirty.set()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="ExcelExport", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if self._dirty.is_set():
+                self.export()
+
+    def export(self) -> bool:
+        with self._export_lock:
+            self._dirty.clear()
+            try:
+                self.store.export_excel(self.excel_file)
+                return True
+            except Exception as e:
+                self._dirty.set()
+                print(f"Erro ao exportar planilha Excel: {e}")
+                return False
+
+    def stop(self, flush: bool = True, timeout: Optional[float] = 10.0):
+        """Para a thread; com flush exporta as sessões ainda não exportadas."""
+        self._stop.set()
+        # Uma exportação periódica em andamento termina antes do flush e do close da base
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if flush and self._dirty.is_set():
+            self.export()
+
+
+# ─────────────────────────────────────────────────
+#  Linha de comando
+# ─────────────────────────────────────────────────
+
+def print_history(records: List[SessionRecord], events_dir: Optional[str] = None):
+    """Imprime o histórico de uma placa; com ``events_dir`` lista os eventos de cada sessão."""
+    for record in records:
+        failed = [name for name, status in record.testes.items() if status == "NG"]
+        print(f"#{record.id}  {record.data_hora}  {record.resultado or '-':<9} "
+              f"operador: {record.operador or '-'}" + (f"  NG: {', '.join(failed)}" if failed else ""))
+        if record.arquivo_curva:
+            print(f"    curva:   {record.arquivo_curva}")
+        if record.arquivo_tempos:
+            print(f"    tempos:  {record.arquivo_tempos}")
+        if record.segmento_eventos:
+            print(f"    eventos: {record.segmento_eventos} @ {record.posicao_eventos}")
+            if events_dir:
+                from events import read_session
+                for event in read_session(events_dir, record.segmento_eventos,
+                                          record.posicao_eventos, record.id_sessao):
+                    print(f"      {event['t']:>10.3f}s  {event['evento']:<30} {event.get('status', '')}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Consulta a base de resultados dos testes JT2302")
+    commands = parser.add_subparsers(dest="command", required=True)
+    history = commands.add_parser("historico", help="todas as sessões de um número de série")
+    history.add_argument("numero_serie")
+    history.add_argument("--db", default=os.path.join("log", "resultados.db"), help="base de resultados")
+    history.add_argument("--eventos", action="store_true", help="lista os eventos de cada sessão")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"Base de resultados não encontrada: {args.db}")
+        return 1
+
+    store = ResultsStore(args.db, read_only=True)
+    try:
+        records = store.history(args.numero_serie)
+    finally:
+        store.close()
+
+    if not records:
+        print(f"Nenhuma sessão para o número de série {args.numero_serie}")
+        return 1
+    print(f"{len(records)} sessões para {args.numero_serie}:")
+    print_history(records, os.path.join(os.path.dirname(args.db), "eventos") if args.eventos else None)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
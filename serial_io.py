@@ -0,0 +1,424 @@
+"""
+Leitura orientada a eventos da porta serial da jiga.
+
+Uma thread de leitura por porta consome os bytes assim que chegam, separa o
+fluxo em frames (ACKOK, linhas AQADC, respostas $ok,...) e entrega cada frame
+para a chamada que está aguardando através de uma fila.
+
+Também traz a captura de transcripts da porta (CaptureSerial) e a reprodução
+determinística desses transcripts sem hardware (ReplaySerial).
+"""
+import json
+import queue
+import re
+import threading
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+import serial
+
+from cancel import CancelToken
+from clock import Clock, REAL_CLOCK
+
+
+# Tipos de frame reconhecidos
+FRAME_ACK = "ack"
+FRAME_ADC = "adc"
+FRAME_REPLY = "reply"
+FRAME_OTHER = "other"
+
+# Resposta AQADC: 1 caractere inicial + 9 campos de 5 dígitos separados por 1 caractere
+ADC_FRAME_LEN = 54
+
+_LINE_SEPARATOR = re.compile(rb'[\r\n]')
+
+
+@dataclass
+class Frame:
+    """Frame recebido da placa."""
+    kind: str
+    raw: bytes
+    timestamp: float
+
+    @property
+    def text(self) -> str:
+        return self.raw.decode(errors='ignore').strip()
+
+
+def classify_frame(raw: bytes) -> str:
+    """Identifica o tipo de um frame já separado."""
+    if b'ACKOK' in raw:
+        return FRAME_ACK
+    if len(raw) >= ADC_FRAME_LEN and raw[1:6].isdigit():
+        return FRAME_ADC
+    if raw.startswith(b'$'):
+        return FRAME_REPLY
+    return FRAME_OTHER
+
+
+class FrameSplitter:
+    """Separa o fluxo de bytes em frames.
+
+    Linhas terminadas em CR/LF viram frames; um ACKOK é entregue assim que
+    chega, mesmo sem terminador, e vários ACKs colados são separados.
+    """
+
+    def __init__(self):
+        self._buffer = b''
+
+    def reset(self):
+        self._buffer = b''
+
+    def feed(self, data: bytes) -> List[bytes]:
+        parts = _LINE_SEPARATOR.split(self._buffer + data)
+        remainder = parts.pop()
+        frames = []
+        for part in parts:
+            frames.extend(self._split_acks(part))
+
+        # ACK sem terminador de linha é entregue imediatamente
+        while b'ACKOK' in remainder:
+            end = remainder.index(b'ACKOK') + len(b'ACKOK')
+            frames.append(remainder[:end].strip())
+            remainder = remainder[end:]
+
+        self._buffer = remainder
+        return [frame for frame in frames if frame]
+
+    @staticmethod
+    def _split_acks(part: bytes) -> List[bytes]:
+        frames = []
+        while b'ACKOK' in part:
+            end = part.index(b'ACKOK') + len(b'ACKOK')
+            frames.append(part[:end].strip())
+            part = part[end:]
+        frames.append(part.strip())
+        return frames
+
+
+class SerialReader:
+    """Thread de leitura contínua de uma porta serial.
+
+    Os frames recebidos ficam numa fila até que alguma chamada os consuma
+    com ``wait_for``; bytes que chegam depois de um ACK não são perdidos.
+    Se ``on_frame`` for informado, cada frame é entregue a ele em vez da fila.
+
+    Com um relógio virtual não há thread: ``wait_for`` lê a porta de forma
+    síncrona e avança o relógio até a próxima resposta ou o timeout.
+
+    Com ``cancel``, ``wait_for`` levanta ``Cancelled`` assim que o token é
+    cancelado, sem esperar o timeout.
+    """
+
+    def __init__(self, ser: serial.Serial, on_frame: Optional[Callable[[Frame], None]] = None,
+                 clock: Clock = REAL_CLOCK, cancel: Optional[CancelToken] = None):
+        self.ser = ser
+        self.on_frame = on_frame
+        self.clock = clock
+        self.cancel = cancel
+        self.threaded = not clock.is_virtual
+        self._splitter = FrameSplitter()
+        self._frames: "queue.Queue[Frame]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._cleared_at = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Inicia a thread de leitura."""
+        if not self.threaded:
+            return
+        if self.cancel:
+            self.cancel.add_callback(self._wake)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="SerialReader", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Encerra a thread de leitura."""
+        self._stop.set()
+        if self.cancel:
+            self.cancel.remove_callback(self._wake)
+        cancel_read = getattr(self.ser, 'cancel_read', None)
+        if cancel_read:
+            try:
+                cancel_read()
+            except Exception:
+                pass
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                # Bloqueia até o primeiro byte chegar e leva o que já estiver no buffer
+                data = self.ser.read(max(1, self.ser.in_waiting))
+            except (serial.SerialException, OSError, TypeError, AttributeError):
+                break
+            if data:
+                self._feed(data, self.clock.monotonic())
+
+    def _wake(self):
+        # None na fila acorda um wait_for bloqueado para ele ver o cancelamento
+        self._frames.put(None)
+
+    def pump(self):
+        """Lê sem bloquear os bytes já disponíveis na porta (modo sem thread)."""
+        waiting = self.ser.in_waiting
+        if waiting:
+            self._feed(self.ser.read(waiting), self.clock.monotonic())
+
+    def _feed(self, data: bytes, received_at: float):
+        with self._lock:
+            # Bytes recebidos antes de um clear() pertencem a respostas antigas
+            if received_at < self._cleared_at:
+                return
+            for raw in self._splitter.feed(data):
+                frame = Frame(classify_frame(raw), raw, received_at)
+                if self.on_frame:
+                    self.on_frame(frame)
+                else:
+                    self._frames.put(frame)
+
+    def clear(self):
+        """Descarta frames pendentes (equivalente ao reset_input_buffer)."""
+        with self._lock:
+            self._cleared_at = self.clock.monotonic()
+            self._splitter.reset()
+            while True:
+                try:
+                    self._frames.get_nowait()
+                except queue.Empty:
+                    break
+
+    def wait_for(self, predicate: Callable[[Frame], bool],
+                 timeout: float) -> Tuple[Optional[Frame], List[Frame]]:
+        """Aguarda o primeiro frame que satisfaça ``predicate``.
+
+        Retorna o frame encontrado (ou None no timeout) e a lista de frames
+        descartados até ele.
+        """
+        deadline = self.clock.monotonic() + timeout
+        skipped = []
+        while True:
+            if self.cancel:
+                self.cancel.check()
+            remaining = deadline - self.clock.monotonic()
+            if remaining <= 0 and self.threaded:
+                return None, skipped
+            try:
+                if self.threaded:
+                    frame = self._frames.get(timeout=remaining)
+                else:
+                    self.pump()
+                    frame = self._frames.get_nowait()
+            except queue.Empty:
+                if self.threaded or remaining <= 0:
+                    return None, skipped
+                self._advance(remaining)
+                continue
+            if frame is None:
+                continue
+            if predicate(frame):
+                return frame, skipped
+            skipped.append(frame)
+
+    def _advance(self, remaining: float):
+        """Avança o relógio virtual até a próxima resposta prevista pela porta, ou um passo."""
+        next_ready_at = getattr(self.ser, 'next_ready_at', None)
+        ready_at = next_ready_at() if next_ready_at else None
+        now = self.clock.monotonic()
+        if ready_at is not None and ready_at > now:
+            step = ready_at - now
+        else:
+            step = self.clock.resolution
+        self.clock.sleep(min(step, remaining))
+
+    def wait_for_kind(self, kind: str, timeout: float) -> Tuple[Optional[Frame], List[Frame]]:
+        """Aguarda o próximo frame de um tipo específico."""
+        return self.wait_for(lambda frame: frame.kind == kind, timeout)
+
+
+class CaptureSerial:
+    """Repassa tudo para a porta real e grava cada bloco escrito/lido num transcript JSONL.
+
+    Cada linha é ``{"t": segundos desde o início, "w"|"r": bytes em hex}``;
+    a primeira linha é um cabeçalho com a porta e o horário da captura.
+    """
+
+    def __init__(self, ser, path: str, clock: Clock = REAL_CLOCK):
+        self.ser = ser
+        self.path = path
+        self.clock = clock
+        self._start = clock.monotonic()
+        self._lock = threading.Lock()
+        self._file = open(path, 'w', encoding='ascii')
+        self._file.write(json.dumps({
+            "version": 1,
+            "port": getattr(ser, 'port', None),
+            "started_at": clock.time(),
+        }) + "\n")
+
+    def _record(self, direction: str, data: bytes):
+        if not data:
+            return
+        line = json.dumps({"t": round(self.clock.monotonic() - self._start, 6), direction: data.hex()})
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(line + "\n")
+
+    def __getattr__(self, name):
+        return getattr(self.ser, name)
+
+    @property
+    def timeout(self):
+        return self.ser.timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        self.ser.timeout = value
+
+    def write(self, data: bytes) -> int:
+        written = self.ser.write(data)
+        self._record("w", bytes(data))
+        return written
+
+    def read(self, size: int = 1) -> bytes:
+        data = self.ser.read(size)
+        self._record("r", data)
+        return data
+
+    def close(self):
+        self.ser.close()
+        with self._lock:
+            self._file.close()
+
+
+class ReplaySerial:
+    """Porta que reproduz um transcript gravado pela CaptureSerial.
+
+    Cada bloco lido só fica disponível depois que o Model escreveu os mesmos
+    bytes que antecediam esse bloco na gravação, mantendo o atraso original
+    em relação a essa escrita. Assim a sessão é reproduzida de forma
+    determinística, mesmo que os comandos sejam agrupados em writes
+    diferentes. Escritas que divergem da gravação ficam em ``divergences``
+    (ou geram erro com ``strict=True``).
+    """
+
+    def __init__(self, path: str, clock: Clock = REAL_CLOCK, strict: bool = False, timeout: float = 2.0):
+        self.path = path
+        self.clock = clock
+        self.strict = strict
+        self.timeout = timeout
+        self.port = f"replay:{path}"
+        self.is_open = True
+        self.divergences: List[int] = []
+
+        self._expected = bytearray()
+        # (bytes escritos antes do bloco, atraso após essa escrita, bytes lidos)
+        self._reads: List[Tuple[int, float, bytes]] = []
+        self._load(path)
+
+        self._written = 0
+        self._written_at = {0: clock.monotonic()}
+        self._rx = bytearray()
+        self._cond = threading.Condition()
+        self._cancelled = False
+
+    def _load(self, path: str):
+        last_write_t = 0.0
+        with open(path, encoding='ascii') as f:
+            f.readline()  # cabeçalho
+            for line in f:
+                event = json.loads(line)
+                if "w" in event:
+                    self._expected += bytes.fromhex(event["w"])
+                    last_write_t = event["t"]
+                elif "r" in event:
+                    delay = max(0.0, event["t"] - last_write_t)
+                    self._reads.append((len(self._expected), delay, bytes.fromhex(event["r"])))
+
+    def _ready_at(self, index: int) -> Optional[float]:
+        gate, delay, _ = self._reads[index]
+        if self._written < gate:
+            return None
+        return self._written_at[gate] + delay
+
+    def _deliver(self):
+        now = self.clock.monotonic()
+        while self._reads:
+            ready_at = self._ready_at(0)
+            if ready_at is None or ready_at > now:
+                break
+            self._rx += self._reads.pop(0)[2]
+
+    def next_ready_at(self) -> Optional[float]:
+        with self._cond:
+            return self._ready_at(0) if self._reads else None
+
+    @property
+    def in_waiting(self) -> int:
+        with self._cond:
+            self._deliver()
+            return len(self._rx)
+
+    def write(self, data: bytes) -> int:
+        data = bytes(data)
+        with self._cond:
+            start = self._written
+            recorded = bytes(self._expected[start:start + len(data)])
+            if recorded != data:
+                self.divergences.append(start)
+                if self.strict:
+                    raise serial.SerialException(
+                        f"Replay divergiu no byte {start}: esperado {recorded!r}, escrito {data!r}"
+                    )
+            self._written += len(data)
+            now = self.clock.monotonic()
+            # Registra o instante em que cada marco de bytes da gravação foi atingido
+            for gate, _, _ in self._reads:
+                if gate > self._written:
+                    break
+                if gate > start:
+                    self._written_at.setdefault(gate, now)
+            self._cond.notify_all()
+        return len(data)
+
+    def read(self, size: int = 1) -> bytes:
+        if not self.is_open:
+            raise serial.SerialException("porta fechada")
+        deadline = self.clock.monotonic() + self.timeout
+        with self._cond:
+            self._deliver()
+            while not self._rx and not self._cancelled:
+                now = self.clock.monotonic()
+                if now >= deadline:
+                    break
+                ready_at = self._ready_at(0) if self._reads else None
+                wake = ready_at if ready_at is not None else deadline
+                self._cond.wait(max(min(wake, deadline) - now, 0.001))
+                self._deliver()
+            self._cancelled = False
+            data = bytes(self._rx[:size])
+            del self._rx[:size]
+            return data
+
+    def reset_input_buffer(self):
+        with self._cond:
+            self._deliver()
+            self._rx.clear()
+
+    def cancel_read(self):
+        with self._cond:
+            self._cancelled = True
+            self._cond.notify_all()
+
+    def close(self):
+        self.cancel_read()
+        self.is_open = False
+
+    @property
+    def finished(self) -> bool:
+        """True quando todos os bytes gravados já foram escritos e lidos."""
+        return self._written >= len(self._expected) and not self._reads and not self._rx
@@ -0,0 +1,189 @@
+"""
+Modo estação: várias jigas JT2302 testadas em paralelo por um único processo.
+
+Cada jiga tem seu próprio Model, porta serial e TestSession, executados pelo
+mesmo Controller.run_tests em threads separadas. Todas reportam para uma única
+View e gravam na mesma planilha de resultados.
+
+Uso: python station.py COM3 COM4 [COM5 ...]
+"""
+import re
+import sys
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from controller import Controller
+from model import Model, ExcelLogger
+from view import View
+
+
+@dataclass
+class Fixture:
+    """Uma jiga da estação e o estado do seu último teste."""
+    name: str
+    port: str
+    numero_serie: str = ""
+    controller: Optional[Controller] = None
+    results: Dict[str, bool] = field(default_factory=dict)
+    passed: Optional[bool] = None
+    duration: Optional[float] = None
+
+
+class FixtureView:
+    """
+    View vista pelo Controller de uma jiga.
+
+    Encaminha mensagens para a View da estação com o nome da jiga como
+    prefixo e consolida os indicadores: um teste só aparece OK na tela se
+    passou em todas as jigas que já o executaram.
+    """
+
+    def __init__(self, station: "Station", fixture: Fixture):
+        self._station = station
+        self._fixture = fixture
+
+    def add_update(self, func: callable, *args) -> None:
+        self._station.view.add_update(func, *args)
+
+    def get_user_inputs(self) -> tuple:
+        usuario, _, _, is_test_mode = self._station.view.get_user_inputs()
+        return usuario, self._fixture.port, self._fixture.numero_serie, is_test_mode
+
+    def show_message(self, msg: str, error_tag: bool = False) -> None:
+        self._station.view.show_message(f"[{self._fixture.name}] {msg}", error_tag)
+
+    def update_result_label(self, key: str, success: bool) -> None:
+        self._fixture.results[key] = success
+        self._station.view.update_result_label(key, self._station.combined_result(key))
+
+    def show_final_results(self, results_text: str, duration: float) -> None:
+        self._fixture.duration = duration
+
+    def show_test_result(self, msg: str, result: bool) -> None:
+        self._fixture.passed = result
+        self.show_message(msg, not result)
+
+    # Estado global da tela (carregando, botão conectar, limpeza) fica com a estação
+    def clear_result_label(self) -> None:
+        pass
+
+    def hide_final_results(self) -> None:
+        pass
+
+    def show_loading(self, show: bool = True) -> None:
+        pass
+
+    def toggle_connection(self, is_connected: bool) -> None:
+        pass
+
+
+class Station:
+    """Controller da UI no modo estação, com uma jiga por porta serial."""
+
+    def __init__(self, ports: List[str], view=None):
+        self.view = view or View(self)
+        self.excel_logger = ExcelLogger()
+        self.fixtures: List[Fixture] = []
+        for i, port in enumerate(ports):
+            fixture = Fixture(name=f"J{i + 1}", port=port)
+            fixture.controller = Controller(FixtureView(self, fixture), Model(excel_logger=self.excel_logger))
+            self.fixtures.append(fixture)
+        self._running = False
+
+    def start(self):
+        self.view.run()
+
+    def combined_result(self, key: str) -> bool:
+        """Resultado consolidado de um teste entre as jigas que já o reportaram."""
+        return all(f.results[key] for f in self.fixtures if key in f.results)
+
+    # ═══════════════════════════════════════════════════════════════════
+    # HANDLERS DA VIEW
+    # ═══════════════════════════════════════════════════════════════════
+
+    def _carregar_dados_iniciais(self):
+        usuarios = ["Mário", "Thiago", "Thiago Dias", "João", "Márcia"]
+        self.view.set_users_available(usuarios)
+        self.view.set_ports_available([f"{f.port}: {f.name}" for f in self.fixtures])
+
+    def connect_btn_handler(self):
+        if self._running:
+            return
+
+        _, _, numeros_serie, _ = self.view.get_user_inputs()
+        numeros = [n for n in re.split(r"[,;\s]+", numeros_serie) if n]
+        if len(numeros) != len(self.fixtures):
+            self.view.add_update(
+                self.view.show_message,
+                f"Informe {len(self.fixtures)} números de série separados por vírgula "
+                f"(um por jiga: {', '.join(f.name for f in self.fixtures)}).",
+                True,
+            )
+            return
+
+        for fixture, numero in zip(self.fixtures, numeros):
+            fixture.numero_serie = numero
+
+        self.view.add_update(self.view.toggle_connection, True)
+        threading.Thread(target=self.run_all, daemon=True).start()
+
+    def cancel_btn_handler(self):
+        if not self._running:
+            self.view.add_update(self.view.show_message, "Nenhum teste em andamento.")
+            return
+        for fixture in self.fixtures:
+            fixture.controller.cancel_btn_handler()
+
+    def compile_btn_handler(self):
+        self.view.add_update(self.view.show_message, "Compilação de logs ainda não implementada.")
+
+    # ═══════════════════════════════════════════════════════════════════
+    # EXECUÇÃO
+    # ═══════════════════════════════════════════════════════════════════
+
+    def run_all(self):
+        """Executa todas as jigas em paralelo e aguarda o fim de todas."""
+        self._running = True
+        for fixture in self.fixtures:
+            fixture.results.clear()
+            fixture.passed = None
+            fixture.duration = None
+
+        self.view.clear_result_label()
+        self.view.add_update(self.view.hide_final_results)
+        self.view.add_update(self.view.show_loading, True)
+
+        try:
+            threads = [
+                threading.Thread(target=f.controller.run_tests, args=(f.port,), name=f.name, daemon=True)
+                for f in self.fixtures
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            self._running = False
+            # Entra na fila depois das últimas atualizações das jigas
+            self.view.add_update(self._show_summary)
+
+    def _show_summary(self):
+        all_passed = all(f.passed for f in self.fixtures)
+        lines = [f"{f.name} ({f.numero_serie}): {'OK' if f.passed else 'NG'}" for f in self.fixtures]
+        duration = max((f.duration or 0.0) for f in self.fixtures)
+
+        self.view.show_loading(False)
+        self.view.show_final_results("\n".join(lines), duration)
+        self.view.toggle_connection(False)
+
+        popup_message = "\n".join(lines)
+        popup_message += "\n\nResultados salvos na planilha Excel."
+        self.view.show_test_result(popup_message, all_passed)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python station.py PORTA [PORTA ...]")
+        sys.exit(1)
+    Station(sys.argv[1:]).start()
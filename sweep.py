@@ -0,0 +1,144 @@
+"""
+Busca de limiares de duty cycle.
+
+Em vez de varrer o duty em passos finos, ``find_thresholds`` desce em passos
+grossos até cada evento ocorrer e depois bissecta o intervalo encontrado na
+resolução aceita pelo firmware (FR1D com uma casa decimal). O duty reportado é
+o maior da grade em que o evento ocorre, como numa varredura descendente.
+
+Quando há histórico (``hints``), a busca de um evento parte da faixa em que ele
+costuma ocorrer: confirma que a faixa contém o limiar e, se não contiver,
+alarga a faixa para cima ou para baixo até encontrá-lo.
+
+Eventos com histerese (ex.: alarme de carga, que só rearma acima da tensão de
+reconexão) exigem ``reset``: chamado antes da sonda seguinte a um disparo
+desses eventos, para que cada sonda se aproxime por cima.
+"""
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Resolução do comando FR1D
+DUTY_RESOLUTION = 0.1
+
+Probe = Callable[[float], Tuple[Dict[str, bool], Any]]
+
+
+@dataclass
+class ThresholdResult:
+    """Limiar encontrado para um evento."""
+    duty: Optional[float] = None    # Maior duty em que o evento ocorre (None se não ocorreu)
+    reading: Any = None             # Leitura da sonda nesse duty
+    probes: int = 0                 # Sondas que avaliaram este evento (podem ser compartilhadas)
+    warm_start: bool = False        # Busca partiu da faixa do histórico
+
+
+def find_thresholds(probe: Probe, events: Iterable[str], start: float, stop: float,
+                    coarse_step: float = 1.0, resolution: float = DUTY_RESOLUTION,
+                    reset: Optional[Callable[[], None]] = None,
+                    hysteretic: Optional[Iterable[str]] = None,
+                    hints: Optional[Dict[str, Tuple[float, float]]] = None) -> Dict[str, ThresholdResult]:
+    """
+    Localiza, para cada evento, o maior duty em [stop, start] em que ele ocorre.
+
+    ``probe(duty)`` aplica o duty e retorna ({evento: ocorreu}, leitura). Os
+    eventos devem ser monotônicos: uma vez ocorridos, continuam ocorrendo em
+    duties menores. ``hysteretic`` lista os eventos que exigem ``reset`` após
+    disparar (padrão: todos). ``hints`` dá, por evento, a faixa (min, max) de
+    duty esperada para o limiar.
+    """
+    events = list(events)
+    hysteretic = set(events if hysteretic is None else hysteretic) if reset else set()
+    hints = {name: band for name, band in (hints or {}).items() if name in events}
+    results = {name: ThresholdResult(warm_start=name in hints) for name in events}
+
+    # Trabalha em passos inteiros da resolução para evitar erros de ponto flutuante
+    start_i = int(round(start / resolution))
+    stop_i = int(round(stop / resolution))
+    step_i = max(1, int(round(coarse_step / resolution)))
+
+    # O resultado de um duty não muda entre sondas (eventos monotônicos): guarda em cache
+    cache: Dict[int, Tuple[Dict[str, bool], Any]] = {}
+    pending_reset = False
+
+    def run(duty_i: int, name: str) -> bool:
+        nonlocal pending_reset
+        results[name].probes += 1
+        if duty_i not in cache:
+            if pending_reset:
+                reset()
+                pending_reset = False
+            flags, reading = probe(round(duty_i * resolution, 6))
+            cache[duty_i] = (flags, reading)
+            pending_reset = any(flags.get(h) for h in hysteretic)
+        return bool(cache[duty_i][0].get(name))
+
+    brackets: Dict[str, Tuple[Optional[int], int]] = {}
+
+    # Estágio grosso (eventos sem histórico): desce até todos ocorrerem ou acabar a faixa
+    cold = [name for name in events if name not in hints]
+    last_clear_i = None
+    duty_i = start_i
+    while cold:
+        for name in list(cold):
+            if run(duty_i, name):
+                brackets[name] = (last_clear_i, duty_i)
+                cold.remove(name)
+        if not cold or duty_i == stop_i:
+            break
+        last_clear_i = duty_i
+        duty_i = max(duty_i - step_i, stop_i)
+
+    # Eventos com histórico: confirma a faixa e alarga (dobrando) até conter o limiar
+    for name, (low, high) in hints.items():
+        high_i = min(int(np.ceil(high / resolution - 1e-9)), start_i)
+        low_i = max(int(np.floor(low / resolution + 1e-9)), stop_i)
+        width = max(high_i - low_i, 1)
+
+        while run(high_i, name) and high_i < start_i:
+            low_i = high_i
+            high_i = min(high_i + width, start_i)
+            width *= 2
+        if run(high_i, name):
+            # Ocorre já no início da faixa permitida
+            brackets[name] = (None, high_i)
+            continue
+
+        while not run(low_i, name) and low_i > stop_i:
+            high_i = low_i
+            low_i = max(low_i - width, stop_i)
+            width *= 2
+        if run(low_i, name):
+            brackets[name] = (high_i, low_i)
+
+    # Estágio fino: bissecção entre o último duty sem evento e o primeiro com evento
+    for name, (clear_i, hit_i) in brackets.items():
+        if clear_i is not None:
+            while clear_i - hit_i > 1:
+                mid_i = (clear_i + hit_i) // 2
+                if run(mid_i, name):
+                    hit_i = mid_i
+                else:
+                    clear_i = mid_i
+        results[name].duty = round(hit_i * resolution, 6)
+        results[name].reading = cache[hit_i][1]
+
+    return results
+
+
+def warm_start_hints(history: Dict[str, Sequence[float]], margin: float = 0.5,
+                     min_samples: int = 5) -> Dict[str, Tuple[float, float]]:
+    """
+    Faixa esperada de cada limiar a partir de valores recentes: do 5º ao 95º
+    percentil, alargada por ``margin``. Eventos com menos de ``min_samples``
+    valores ficam sem faixa (busca completa).
+    """
+    hints = {}
+    for name, values in history.items():
+        values = np.asarray([v for v in values if v is not None and np.isfinite(v)], dtype=float)
+        if len(values) < min_samples:
+            continue
+        low, high = np.percentile(values, [5, 95])
+        hints[name] = (float(low) - margin, float(high) + margin)
+    return hints
@@ -1,25 +1,19 @@
 import serial
 import time
 
-def aguardar_ack(ser, timeout=1.0):
+from serial_io import SerialReader, FRAME_ACK, FRAME_REPLY
+
+
+def aguardar_ack(reader: SerialReader, timeout=1.0):
     """
     Aguarda até receber 'RXACKOK' ou até timeout.
     
     Retorna:
     - Tuple: (status_bool, resposta_string)
     """
-    inicio = time.time()
-    buffer = ""
-
-    while time.time() - inicio < timeout:
-        if ser.in_waiting:
-            buffer += ser.read(ser.in_waiting).decode(errors='ignore')
-            if "ACKOK" in buffer:
-                return True, buffer.strip()
-        else:
-            time.sleep(0.005)
-
-    return False, buffer.strip()
+    frame, skipped = reader.wait_for_kind(FRAME_ACK, timeout)
+    resposta = "\n".join(f.text for f in skipped + ([frame] if frame else []))
+    return frame is not None, resposta
 
 ser = serial.Serial(
         port='COM5',
@@ -37,14 +31,19 @@ ser = serial.Serial(
 
 # msg = f"$cTime,{int(time.time())}"
 # msg = "$cSerialNumber,0000000000001"
-ser.timeout = 20
+reader = SerialReader(ser)
+reader.start()
+
 ser.write(b"DESBT")
+print(aguardar_ack(reader))
 time.sleep(2)
 ser.write(b"LIGBT")
+print(aguardar_ack(reader))
 time.sleep(2)
-ser.reset_input_buffer()
+reader.clear()
 ser.write(b"$cTime,1757338736")
-response = ser.read_until().decode()
-print(response)
+frame, _ = reader.wait_for_kind(FRAME_REPLY, timeout=20)
+print(frame.text if frame else "Sem resposta")
+reader.stop()
 
 
@@ -0,0 +1,336 @@
+"""
+Plano de testes declarativo.
+
+Cada passo declara o estado de alimentação de que precisa, como medir, os
+critérios de cada indicador (chave da UI e campo da sessão) e as mensagens que
+gera. O ``TestPlanRunner`` escolhe a ordem de execução (respeitando as
+dependências e minimizando as trocas de estado de alimentação), pula os passos
+fora do perfil escolhido e reporta cada resultado por callbacks.
+
+A política de interrupção decide se a execução continua depois de uma falha:
+``ABORT_NEVER`` roda tudo, ``ABORT_ON_SHORT`` para num curto e
+``ABORT_ON_NG`` para no primeiro NG. Ao interromper, a jiga é desligada na hora.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from model import Model, PowerState, PWMSweepResult, TestResult, POWER_OFF
+
+
+@dataclass
+class Check:
+    """Um indicador de resultado: chave na UI, nome do teste na sessão e critério de aprovação."""
+    ui_key: str
+    session_key: str    # Nome aceito por Model.update_test_result
+    label: str
+    passed: Callable[[Any], bool]
+
+
+# Mensagem para a UI: (texto, é_erro)
+Message = Tuple[str, bool]
+
+# Políticas de interrupção
+ABORT_NEVER = "nunca"
+ABORT_ON_SHORT = "curto"
+ABORT_ON_NG = "primeiro_ng"
+ABORT_POLICIES = (ABORT_NEVER, ABORT_ON_SHORT, ABORT_ON_NG)
+
+
+@dataclass
+class TestStep:
+    """Passo do plano de testes."""
+    name: str
+    measure: Callable[[Model], Any]
+    checks: List[Check]
+    requires: Optional[PowerState] = None   # None: o próprio passo configura a jiga
+    leaves: Optional[PowerState] = None     # Estado ao final (None: igual a requires)
+    after: Tuple[str, ...] = ()             # Passos que precisam rodar antes deste
+    profiles: FrozenSet[str] = frozenset({"completo"})
+    report: Optional[Callable[[Any, Dict[str, bool]], List[Message]]] = None
+    short: bool = False                     # Falha indica curto (interrompe com ABORT_ON_SHORT)
+
+    @property
+    def final_state(self) -> Optional[PowerState]:
+        return self.leaves if self.leaves is not None else self.requires
+
+
+@dataclass
+class PlanResult:
+    """Resultado da execução de um plano."""
+    success: bool = True
+    order: List[str] = field(default_factory=list)
+    raw: Dict[str, Any] = field(default_factory=dict)        # Retorno de cada passo
+    checks: Dict[str, bool] = field(default_factory=dict)    # ui_key -> aprovado
+    details: List[str] = field(default_factory=list)         # Linhas "Label: OK/NG"
+    aborted: Optional[str] = None                            # Passo que interrompeu a execução
+    skipped: List[str] = field(default_factory=list)         # Passos não executados pela interrupção
+
+
+class TestPlanRunner:
+    """Executa um plano de testes sobre um Model."""
+
+    # Acima disso a ordenação usa heurística gulosa em vez de busca exaustiva
+    MAX_EXHAUSTIVE_STEPS = 9
+
+    def __init__(self, model: Model,
+                 on_check: Optional[Callable[[Check, bool], None]] = None,
+                 on_message: Optional[Callable[[str, bool], None]] = None,
+                 abort_policy: str = ABORT_NEVER):
+        if abort_policy not in ABORT_POLICIES:
+            raise ValueError(f"Política de interrupção desconhecida: {abort_policy}")
+        self.model = model
+        self.abort_policy = abort_policy
+        self.on_check = on_check or (lambda check, passed: None)
+        self.on_message = on_message or (lambda msg, error: None)
+
+    @staticmethod
+    def select(steps: Sequence[TestStep], profile: str) -> List[TestStep]:
+        """Passos que fazem parte do perfil."""
+        return [step for step in steps if profile in step.profiles]
+
+    def order(self, steps: Sequence[TestStep], initial: PowerState = POWER_OFF) -> List[TestStep]:
+        """
+        Ordem de execução que respeita ``after`` e minimiza as trocas de estado
+        de alimentação. Em caso de empate mantém a ordem declarada no plano.
+        """
+        steps = list(steps)
+        names = {step.name for step in steps}
+        deps = {step.name: {d for d in step.after if d in names} for step in steps}
+
+        def cost(state: Optional[PowerState], step: TestStep) -> int:
+            if step.requires is None or state is None:
+                return 0
+            return state.distance(step.requires)
+
+        def next_state(state: Optional[PowerState], step: TestStep) -> Optional[PowerState]:
+            return step.final_state if step.final_state is not None else state
+
+        if len(steps) > self.MAX_EXHAUSTIVE_STEPS:
+            order, done, state = [], set(), initial
+            while len(order) < len(steps):
+                ready = [s for s in steps if s.name not in done and deps[s.name] <= done]
+                step = min(ready, key=lambda s: cost(state, s))
+                order.append(step)
+                done.add(step.name)
+                state = next_state(state, step)
+            return order
+
+        best: List[Any] = [None, None]  # [custo, ordem]
+
+        def search(order: List[TestStep], done: set, state: Optional[PowerState], total: int):
+            if best[0] is not None and total >= best[0]:
+                return
+            if len(order) == len(steps):
+                best[0], best[1] = total, list(order)
+                return
+            for step in steps:
+                if step.name in done or not deps[step.name] <= done:
+                    continue
+                order.append(step)
+                done.add(step.name)
+                search(order, done, next_state(state, step), total + cost(state, step))
+                done.discard(step.name)
+                order.pop()
+
+        search([], set(), initial, 0)
+        if best[1] is None:
+            raise ValueError("Dependências circulares no plano de testes")
+        return best[1]
+
+    def should_abort(self, step: TestStep, passed: bool) -> bool:
+        """Se a política manda interromper depois deste passo."""
+        if passed or self.abort_policy == ABORT_NEVER:
+            return False
+        return self.abort_policy == ABORT_ON_NG or step.short
+
+    def run(self, steps: Sequence[TestStep], profile: str = "completo") -> PlanResult:
+        """Executa os passos do perfil na ordem escolhida, respeitando a política de interrupção."""
+        result = PlanResult()
+        order = self.order(self.select(steps, profile))
+
+        for index, step in enumerate(order):
+            result.order.append(step.name)
+
+            with self.model.tracer.step(step.name):
+                if step.requires is not None:
+                    self.model.set_power_state(step.requires)
+
+                try:
+                    raw = step.measure(self.model)
+                except Exception as e:
+                    self.on_message(f"Erro no passo {step.name}: {e}", True)
+                    raw = None
+            result.raw[step.name] = raw
+
+            verdicts = {}
+            for check in step.checks:
+                try:
+                    passed = raw is not None and bool(check.passed(raw))
+                except Exception:
+                    passed = False
+                verdicts[check.ui_key] = passed
+                result.checks[check.ui_key] = passed
+                result.details.append(f"{check.label}: {'OK' if passed else 'NG'}")
+                result.success &= passed
+                self.model.update_test_result(check.session_key, passed)
+                self.on_check(check, passed)
+
+            if step.report is not None and raw is not None:
+                for msg, error in step.report(raw, verdicts):
+                    self.on_message(msg, error)
+
+            if self.should_abort(step, all(verdicts.values())):
+                result.aborted = step.name
+                result.skipped = [s.name for s in order[index + 1:]]
+                self.on_message(f"⛔ Testes interrompidos após falha em {step.name}; "
+                                f"{len(result.skipped)} passo(s) não executado(s).", True)
+                self.model.power_down()
+                break
+
+        return result
+
+
+# ═══════════════════════════════════════════════════════════════════
+# PLANO PADRÃO JT2302
+# ═══════════════════════════════════════════════════════════════════
+
+def _passed(result: TestResult) -> bool:
+    return result.passed
+
+
+def _report_short(channel: str, label: str, ok_msg: str, ng_msg: str):
+    def report(result: TestResult, verdicts: Dict[str, bool]) -> List[Message]:
+        messages = []
+        if channel in result.details:
+            messages.append((f"Leitura ADC {label}: {result.details[channel]:.3f}V", False))
+        passed = all(verdicts.values())
+        messages.append((ok_msg, False) if passed else (ng_msg, True))
+        return messages
+    return report
+
+
+def _report_dcdc_load(result, verdicts: Dict[str, bool]) -> List[Message]:
+    if all(verdicts.values()):
+        return [("\n🟢 Testes DCDC e carga concluídos com sucesso!", False)]
+    return [("\n🔴 Houve falha nos testes DCDC e carga.", False)]
+
+
+def _report_isolated(result: TestResult, verdicts: Dict[str, bool]) -> List[Message]:
+    if 'adc_batt' not in result.details:
+        return []
+    d = result.details
+    return [(f"  Batt: {d['adc_batt']:.2f}V | DCDC: {d.get('adc_dcdc', 0):.2f}V | Load: {d.get('adc_load', 0):.2f}V", False)]
+
+
+def _report_temperature(result, verdicts: Dict[str, bool]) -> List[Message]:
+    if all(verdicts.values()):
+        return [("✅ Testes de temperatura concluídos com sucesso.", False)]
+    return [("🔴 Falhas nos testes de temperatura.", False)]
+
+
+def pwm_summary_lines(result: PWMSweepResult) -> List[str]:
+    """Linhas de duty/tensão de cada evento da varredura PWM."""
+    lines = []
+    if result.duty_adc_at_load_alarm is not None:
+        lines.append(f"{'Duty Cycle no Alarme de Carga':<30} {result.duty_adc_at_load_alarm:.1f}%")
+        lines.append(f"{'Tensão da Bateria no Alarme':<30} {result.adc_batt_at_load_alarm:.2f} V")
+    if result.duty_adc5v_below5v is not None:
+        lines.append(f"{'Duty Cycle na Queda de 5V':<30} {result.duty_adc5v_below5v:.1f}%")
+        lines.append(f"{'Tensão da Bateria em 5V':<30} {result.adc_batt_at5v:.2f} V")
+    if result.duty_adc15v_below15v is not None:
+        lines.append(f"{'Duty Cycle na Queda de 15V':<30} {result.duty_adc15v_below15v:.1f}%")
+        lines.append(f"{'Tensão da Bateria em 15V':<30} {result.adc_batt_at15v:.2f} V")
+    return lines
+
+
+def _report_pwm(result: PWMSweepResult, verdicts: Dict[str, bool]) -> List[Message]:
+    if not verdicts["pwm_pth"]:
+        return [("🔴 Nenhuma queda detectada no range de duty.", False)]
+    header = [f"{'Evento':<30} {'Valor':>10}", "-" * 42]
+    return [(line, False) for line in header + pwm_summary_lines(result)]
+
+
+def _measure_pwm_sweep(model: Model) -> PWMSweepResult:
+    result = model.test_pwm_sweep(use_enpth=True, check_adc_load=True)
+    model.update_pwm_results(result)  # Salvar resultados PWM detalhados
+    return result
+
+
+def _temperature_check(key: str, ui_key: str, label: str) -> Check:
+    return Check(ui_key, key, label, lambda r: key in r and r[key].passed)
+
+
+JT2302_PLAN: List[TestStep] = [
+    TestStep(
+        name="bateria_curto",
+        measure=lambda m: m.test_battery_short(),
+        checks=[Check("bateria", "teste_bateria_curto", "Teste Curto Bateria", _passed)],
+        requires=POWER_OFF,
+        profiles=frozenset({"completo", "rapido", "curtos"}),
+        report=_report_short("adc_batt", "Bateria", "✅ Bateria operando normalmente.",
+                             "🔴 Atenção: possível curto na bateria!"),
+        short=True,
+    ),
+    TestStep(
+        name="dcdc_curto",
+        measure=lambda m: m.test_dcdc_short(),
+        checks=[Check("dcdc", "teste_dcdc_curto", "Teste Curto DCDC", _passed)],
+        requires=POWER_OFF,
+        profiles=frozenset({"completo", "rapido", "curtos"}),
+        report=_report_short("adc_dcdc", "DCDC", "✅ DCDC operando normalmente.",
+                             "🔴 Atenção: possível curto no DCDC!"),
+        short=True,
+    ),
+    TestStep(
+        name="dcdc_carga",
+        measure=lambda m: m.test_dcdc_and_load(),
+        checks=[
+            Check("teste1a", "teste1a", "Teste Tensão DCDC/Load/StepUp", lambda r: r[0].passed),
+            Check("teste1b", "teste1b", "Teste Circ Carga Bateria", lambda r: r[1].passed),
+        ],
+        requires=POWER_OFF,
+        leaves=PowerState(dcdc=True),
+        after=("bateria_curto", "dcdc_curto"),
+        profiles=frozenset({"completo", "rapido"}),
+        report=_report_dcdc_load,
+    ),
+    TestStep(
+        name="bateria_isolada",
+        measure=lambda m: m.test_isolated_battery(),
+        checks=[Check("bateria_isolada", "teste_bateria_isolada", "Teste Bateria Isolada", _passed)],
+        requires=PowerState(dcdc=True),
+        leaves=PowerState(battery=True),
+        after=("dcdc_carga",),
+        profiles=frozenset({"completo", "rapido"}),
+        report=_report_isolated,
+    ),
+    TestStep(
+        name="alarmes_temperatura",
+        measure=lambda m: m.test_temperature_alarms(),
+        checks=[
+            _temperature_check("Teste4A", "temp_alarm1", "Teste Alarme Temp1"),
+            _temperature_check("Teste4B", "temp_return1", "Teste Retorno Alarme Temp1"),
+            _temperature_check("Teste4C", "temp_alarm2", "Teste Alarme Temp2"),
+            _temperature_check("Teste4D", "temp_return2", "Teste Retorno Alarme Temp2"),
+        ],
+        requires=PowerState(battery=True),
+        after=("bateria_isolada",),
+        profiles=frozenset({"completo", "rapido"}),
+        report=_report_temperature,
+    ),
+    TestStep(
+        name="varredura_pwm",
+        measure=_measure_pwm_sweep,
+        checks=[
+            Check("pwm", "teste_pwm", "Teste PWM", lambda r: r.rails_valid()),
+            Check("pwm_pth", "teste_pwm_pth", "Teste PWM PTH", lambda r: r.load_alarm_valid()),
+        ],
+        requires=PowerState(battery=True),
+        leaves=POWER_OFF,
+        after=("bateria_isolada",),
+        report=_report_pwm,
+    ),
+]
+
+# completo: todos os passos | rapido: sem varredura PWM | curtos: só testes de curto
+PROFILES = ("completo", "rapido", "curtos")
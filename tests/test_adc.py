@@ -0,0 +1,128 @@
+import random
+
+import numpy as np
+import pytest
+
+from adc import CHANNELS, AdcDecoder, SampleBuffer, gain_vector
+from model import ADCReading, ExcelLogger, Model
+
+
+def _fill(buffer, n):
+    for i in range(n):
+        buffer.append(float(i), 80.0 - i * 0.1, np.full(len(CHANNELS), float(i)))
+
+
+def test_buffer_grows_without_losing_samples():
+    buffer = SampleBuffer(capacity=4, max_capacity=64)
+    _fill(buffer, 50)
+    assert len(buffer) == 50
+    assert buffer.capacity == 64
+    assert buffer.dropped == 0
+    assert buffer.column("t").tolist() == [float(i) for i in range(50)]
+
+
+def test_buffer_wraps_at_max_capacity_and_counts_dropped():
+    buffer = SampleBuffer(capacity=4, max_capacity=16)
+    _fill(buffer, 20)
+    assert len(buffer) == 16
+    assert buffer.dropped == 4
+    # Mantém as mais recentes, em ordem cronológica
+    assert buffer.column("t").tolist() == [float(i) for i in range(4, 20)]
+    assert buffer.array().shape == (16, len(CHANNELS) + 2)
+
+
+def test_clear_resets_dropped():
+    buffer = SampleBuffer(capacity=2, max_capacity=2)
+    _fill(buffer, 5)
+    buffer.clear()
+    assert len(buffer) == 0 and buffer.dropped == 0
+    _fill(buffer, 1)
+    assert buffer.column("duty").tolist() == [80.0]
+
+
+# ─────────────────────────────────────────────────
+#  AdcDecoder x conversão escalar original
+# ─────────────────────────────────────────────────
+
+def _scalar_reading(model, response):
+    """Conversão campo a campo do read_adc original (fatias de 5 caracteres e float())."""
+    response = response.strip()
+    if len(response) < 54:
+        return None
+    try:
+        return ADCReading(
+            adc_15v=float(response[1:6]) * model.const_fonte * model.red_adcs,
+            adc_5v=float(response[7:12]) * model.const_fonte * model.red_adcs,
+            adc_load=float(response[13:18]) * model.const_fonte * model.red_adcs,
+            adc_dcdc=float(response[19:24]) * model.const_fonte * model.red_adcs,
+            adc_batt=float(response[25:30]) * model.const_fonte * model.red_batt,
+            adc_cf=float(response[31:36]) * model.const_fonte * model.red_cf,
+            adc_pwm=float(response[37:42]) * model.const_fonte * model.red_pwm,
+            adc_stepup=float(response[43:48]) * model.const_fonte * model.red_batt,
+            adc_leit_corr=float(response[49:54]) * model.const_fonte * model.red_load,
+        )
+    except ValueError:
+        return None
+
+
+def _frame(counts, pad="0"):
+    return "#" + ",".join(str(c).rjust(5, pad) for c in counts) + "\r\n"
+
+
+@pytest.fixture(scope="module")
+def model(tmp_path_factory):
+    return Model(excel_logger=ExcelLogger(str(tmp_path_factory.mktemp("log"))))
+
+
+def test_vectorized_decode_matches_scalar_conversion(model):
+    rng = random.Random(7)
+    frames = [_frame([rng.randint(0, 4095) for _ in CHANNELS]) for _ in range(200)]
+    frames.append(_frame([0] * len(CHANNELS)))
+    frames.append(_frame([4095] * len(CHANNELS)))
+    # Campos sem zero de preenchimento
+    frames.append(_frame([rng.randint(0, 999) for _ in CHANNELS], pad=" "))
+
+    for frame in frames:
+        expected = _scalar_reading(model, frame)
+        decoded = model.parse_adc(frame)
+        assert decoded is not None
+        for channel in CHANNELS:
+            assert getattr(decoded, channel) == pytest.approx(getattr(expected, channel), rel=1e-12)
+
+    batch = model.adc_decoder.decode_batch([f.encode() for f in frames])
+    assert batch.shape == (len(frames), len(CHANNELS))
+    assert np.allclose(batch[0], [getattr(_scalar_reading(model, frames[0]), c) for c in CHANNELS])
+
+
+def test_gain_vector_matches_model_calibration(model):
+    expected = [model.const_fonte * red for red in (
+        model.red_adcs, model.red_adcs, model.red_adcs, model.red_adcs, model.red_batt,
+        model.red_cf, model.red_pwm, model.red_batt, model.red_load)]
+    assert np.allclose(gain_vector(), expected)
+    assert np.allclose(model.adc_decoder.gains, expected)
+
+
+@pytest.mark.parametrize("frame", [
+    "#01000,0100X,01000,01000,01000,01000,01000,01000,01000",    # caractere inválido
+    "#01000,01000,01000",                                        # frame curto
+    "RXACKOK",                                                   # outra resposta
+    "",
+])
+def test_malformed_frame_rejected_like_scalar(model, frame):
+    assert _scalar_reading(model, frame) is None
+    assert model.parse_adc(frame) is None
+    assert model.parse_adc(frame.encode()) is None
+
+
+def test_malformed_field_only_invalidates_its_channel():
+    counts = AdcDecoder().counts([b"#01000,0100X,01000,01000,01000,01000,01000,01000,01000"])[0]
+    assert np.isnan(counts[1])
+    assert np.count_nonzero(np.isnan(counts)) == 1
+
+
+def test_decode_stream_skips_partial_lines(model):
+    good = _frame([100 * (i + 1) for i in range(len(CHANNELS))]).encode()
+    data = b"RXACKOK\r\n" + good + b"#0100" + b"\r\n" + good
+    values = model.adc_decoder.decode_stream(data)
+    assert values.shape == (2, len(CHANNELS))
+    assert np.allclose(values[0], [getattr(_scalar_reading(model, good.decode()), c) for c in CHANNELS])
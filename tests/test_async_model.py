@@ -0,0 +1,121 @@
+import asyncio
+import time
+
+import pytest
+
+from async_model import AsyncModel
+from emulator import BoardConfig, BoardEmulator, EmulatedSerial
+from model import ExcelLogger, Model
+
+
+def _run(tmp_path, scenario, config=None):
+    """Roda scenario(async_model, board) num event loop novo, com a placa emulada em tempo real."""
+    async def main():
+        board = BoardEmulator(config)
+        model = Model(excel_logger=ExcelLogger(str(tmp_path)))
+        async_model = AsyncModel(model)
+        await async_model.attach(EmulatedSerial(board))
+        try:
+            return await scenario(async_model, board)
+        finally:
+            await async_model.disconnect()
+
+    return asyncio.run(main())
+
+
+def test_rejects_virtual_clock(tmp_path):
+    from clock import VirtualClock
+    with pytest.raises(ValueError):
+        AsyncModel(Model(clock=VirtualClock(), excel_logger=ExcelLogger(str(tmp_path))))
+
+
+# ─────────────────────────────────────────────────
+#  send_batch
+# ─────────────────────────────────────────────────
+
+def test_send_batch_matches_acks_in_order(tmp_path):
+    async def scenario(am, board):
+        ok, results = await am.send_batch([b'LIGBT', b'FR1D80', b'ACLOAD'])
+        return ok, results, list(board.commands), dict(am.model.fixture_state.values)
+
+    ok, results, commands, state = _run(tmp_path, scenario)
+    assert ok
+    assert [cmd for cmd, _, _ in results] == [b'LIGBT\r', b'FR1D80\r', b'ACLOAD\r']
+    assert all(acked for _, acked, _ in results)
+    assert commands == [b'LIGBT', b'FR1D80', b'ACLOAD']
+    assert state["battery"] is True and state["load"] is True and state["duty"] == 80.0
+
+
+def test_send_batch_elides_known_state(tmp_path):
+    async def scenario(am, board):
+        await am.send_batch([b'LIGBT', b'DGLOAD'])
+        ok, results = await am.send_batch([b'LIGBT', b'ACLOAD', b'DGLOAD'])
+        return ok, results, list(board.commands)
+
+    ok, results, commands = _run(tmp_path, scenario)
+    assert ok and all(acked for _, acked, _ in results)
+    # Só ACLOAD e o DGLOAD seguinte mudam a jiga
+    assert commands == [b'LIGBT', b'DGLOAD', b'ACLOAD', b'DGLOAD']
+
+
+def test_send_batch_without_ack_leaves_state_unknown(tmp_path):
+    async def scenario(am, board):
+        # Placa muda: nenhum ACK chega
+        board.feed = lambda data: b''
+        return await am.send_batch([b'LIGBT'], timeout=0.1), am.model.fixture_state.values["battery"]
+
+    (ok, results), battery = _run(tmp_path, scenario)
+    assert not ok
+    assert battery is None
+
+
+# ─────────────────────────────────────────────────
+#  Testes de comunicação (nativos no loop)
+# ─────────────────────────────────────────────────
+
+def test_communication_group_runs_once(tmp_path):
+    config = BoardConfig(comm_status={"rak": True, "inc": False, "adc": True}, dcdc_boot_delay=0.0)
+
+    async def scenario(am, board):
+        results = [await am.test_inclinometro(), await am.test_adc_communication(), await am.test_rak_communication()]
+        return results, board.commands.count(b'$startTest')
+
+    (inc, adc, rak), start_tests = _run(tmp_path, scenario, config)
+    assert not inc.passed and adc.passed and rak.passed
+    assert start_tests == 1
+
+
+def test_rtc_and_serial_number(tmp_path):
+    config = BoardConfig(dcdc_boot_delay=0.0)
+
+    async def scenario(am, board):
+        am.model.start_test_session("SN123", "pytest")
+        return await am.test_rtc_communication(), await am.test_serial_number_communication(), board
+
+    rtc, sn, board = _run(tmp_path, scenario, config)
+    assert rtc.passed and board.rtc_time is not None
+    assert sn.passed and board.serial_number == "SN123"
+
+
+# ─────────────────────────────────────────────────
+#  Cancelamento
+# ─────────────────────────────────────────────────
+
+def test_task_cancel_interrupts_sync_sweep(tmp_path):
+    async def scenario(am, board):
+        await am.send_batch([b'LIGBT'])
+        task = asyncio.create_task(am.test_pwm_sweep())
+        await asyncio.sleep(0.2)
+        start = time.perf_counter()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        elapsed = time.perf_counter() - start
+        # A porta volta para o loop e o token é rearmado
+        ok, _ = await am.send_batch([b'DGLOAD', b'ACLOAD'])
+        return elapsed, ok, am.model.cancel_token.cancelled
+
+    elapsed, ok, cancelled = _run(tmp_path, scenario)
+    assert elapsed < 0.3
+    assert ok
+    assert not cancelled
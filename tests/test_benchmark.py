@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+import benchmark
+from testplan import JT2302_PLAN
+
+
+@pytest.fixture(scope="module")
+def result_file(tmp_path_factory):
+    out = tmp_path_factory.mktemp("bench") / "resultado.json"
+    assert benchmark.main(["--out", str(out)]) == 0
+    return out
+
+
+def test_virtual_time_run_passes_every_step(result_file):
+    with open(result_file, encoding="utf-8") as f:
+        result = json.load(f)
+
+    assert result["virtual_time"] is True
+    total = result["median"]["run_tests"]
+    assert total["passed"] is True
+    # Tempo de jiga virtual (DCDC, varredura...) muito maior que o de parede
+    assert total["fixture_time"] > 10 * total["wall_time"]
+    assert set(step.name for step in JT2302_PLAN) <= set(total["steps"])
+    for name, _, _ in benchmark.METHODS:
+        step = result["median"]["methods"][name]
+        assert step["fixture_time"] >= 0 and step["bytes_tx"] >= 0
+    assert result["median"]["methods"]["varredura_pwm"]["adc_reads"] > 0
+
+
+def test_compare_with_previous_run(result_file, tmp_path, capsys):
+    assert benchmark.main(["--out", str(tmp_path / "novo.json"), "--compare", str(result_file)]) == 0
+    out = capsys.readouterr().out
+    # Relógio virtual e placa com semente fixa: ciclo idêntico
+    assert "em relação à referência" in out and "+0.00s" in out
+
+
+def test_median_of_repeats():
+    runs = [{"a": 3, "b": {"c": 1.0}, "ok": True}, {"a": 1, "b": {"c": 5.0}, "ok": False},
+            {"a": 2, "b": {"c": 2.0}, "ok": True}]
+    assert benchmark._median(runs) == {"a": 2, "b": {"c": 2.0}, "ok": True}
@@ -0,0 +1,129 @@
+import threading
+import time
+
+import pytest
+
+from benchmark import Bench, HeadlessView
+from cancel import Cancelled, CancelToken
+from clock import VirtualClock
+from controller import Controller
+from emulator import emulated_model
+from testplan import TestStep as Step
+
+# Limite para "na hora": bem abaixo de qualquer timeout ou espera interrompida
+PROMPT = 0.3
+
+
+@pytest.fixture
+def model(tmp_path):
+    model = emulated_model(virtual_time=False, log_dir=str(tmp_path))
+    yield model
+    model.cancel_token.reset()
+    model.disconnect()
+
+
+def _cancel_after(model, delay=0.05):
+    timer = threading.Timer(delay, model.cancel)
+    timer.start()
+    return timer
+
+
+def _interrupted(model, func):
+    """Roda func cancelando o Model logo depois; retorna o tempo até o Cancelled."""
+    _cancel_after(model)
+    start = time.perf_counter()
+    with pytest.raises(Cancelled):
+        func()
+    return time.perf_counter() - start
+
+
+# ─────────────────────────────────────────────────
+#  CancelToken
+# ─────────────────────────────────────────────────
+
+def test_token_check_and_reset():
+    token = CancelToken()
+    token.check()
+    token.cancel()
+    with pytest.raises(Cancelled):
+        token.check()
+    token.reset()
+    token.check()
+
+
+def test_cancelled_is_not_an_exception():
+    # Atravessa os "except Exception" dos testes sem virar NG
+    assert not issubclass(Cancelled, Exception)
+
+
+def test_token_sleep_on_virtual_clock_checks_first():
+    token, clock = CancelToken(), VirtualClock()
+    token.cancel()
+    with pytest.raises(Cancelled):
+        token.sleep(clock, 10)
+    assert clock.monotonic() == 0
+
+
+# ─────────────────────────────────────────────────
+#  Esperas do Model na placa emulada
+# ─────────────────────────────────────────────────
+
+def test_cancel_interrupts_sleep(model):
+    assert _interrupted(model, lambda: model.sleep(10)) < PROMPT
+
+
+def test_cancel_interrupts_wait_for_ack(model):
+    # Nada foi enviado: sem cancelamento a espera iria até o timeout
+    assert _interrupted(model, lambda: model._wait_for_ack(timeout=10)) < PROMPT
+
+
+def test_cancel_interrupts_pwm_sweep(model):
+    model.send_batch([b'LIGBT\r'])
+    assert _interrupted(model, model.test_pwm_sweep) < PROMPT
+
+
+# ─────────────────────────────────────────────────
+#  Controller.run_tests
+# ─────────────────────────────────────────────────
+
+def _controller(tmp_path, measure):
+    bench = Bench(str(tmp_path))
+    controller = Controller(HeadlessView(), bench.model)
+    controller.plan = [Step("passo", measure, [])]
+    return bench, controller
+
+
+def test_cancel_after_plan_does_not_skip_teardown(tmp_path):
+    # Cancelamento que chega com o plano já terminado: a desmontagem roda inteira
+    def load_on_then_cancel(model):
+        model.send_command(b'ACLOAD\r')
+        model.cancel()
+
+    bench, controller = _controller(tmp_path, load_on_then_cancel)
+    controller.run_tests("emulador")
+    bench.close()
+
+    commands = bench.board.commands
+    assert b'DGLOAD' in commands[commands.index(b'ACLOAD'):]
+    assert not bench.model.is_connected
+    assert controller.view.passed is not None
+    assert not bench.model.cancel_token.cancelled
+
+
+def test_cancel_during_teardown_still_disconnects(tmp_path, monkeypatch):
+    # Carga ligada: desligá-la na desmontagem passa por esperas canceláveis
+    bench, controller = _controller(tmp_path, lambda m: m.send_command(b'ACLOAD\r'))
+    finalize = bench.model.finalize_test_session
+
+    def finalize_then_cancel(**kwargs):
+        queued = finalize(**kwargs)
+        bench.model.cancel()
+        return queued
+
+    monkeypatch.setattr(bench.model, "finalize_test_session", finalize_then_cancel)
+    with pytest.raises(Cancelled):
+        controller.run_tests("emulador")
+    bench.close()
+
+    assert not bench.model.is_connected
+    assert "Porta serial fechada." in controller.view.messages
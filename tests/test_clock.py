@@ -0,0 +1,84 @@
+import threading
+import time
+
+from clock import REAL_CLOCK, VirtualClock
+from emulator import BoardEmulator, EmulatedSerial
+from model import ExcelLogger, Model
+
+
+# ─────────────────────────────────────────────────
+#  Clock
+# ─────────────────────────────────────────────────
+
+def test_real_clock_follows_system_time():
+    assert not REAL_CLOCK.is_virtual
+    assert abs(REAL_CLOCK.time() - time.time()) < 1
+    first = REAL_CLOCK.monotonic()
+    REAL_CLOCK.sleep(0.01)
+    assert REAL_CLOCK.monotonic() - first >= 0.01
+
+
+def test_real_clock_ignores_non_positive_sleep():
+    start = time.perf_counter()
+    REAL_CLOCK.sleep(0)
+    REAL_CLOCK.sleep(-5)
+    assert time.perf_counter() - start < 0.1
+
+
+# ─────────────────────────────────────────────────
+#  VirtualClock
+# ─────────────────────────────────────────────────
+
+def test_virtual_sleep_advances_without_waiting():
+    clock = VirtualClock(epoch=1000.0)
+    start = time.perf_counter()
+    clock.sleep(3600)
+    assert time.perf_counter() - start < 0.1
+    assert clock.monotonic() == 3600
+    assert clock.time() == 1000.0 + 3600
+
+
+def test_virtual_sleep_ignores_non_positive():
+    clock = VirtualClock(start=5.0)
+    clock.sleep(0)
+    clock.sleep(-1)
+    assert clock.monotonic() == 5.0
+
+
+def test_advance_to_never_goes_back():
+    clock = VirtualClock()
+    clock.advance_to(2.0)
+    clock.advance_to(1.0)
+    assert clock.monotonic() == 2.0
+
+
+def test_concurrent_sleeps_all_count():
+    clock = VirtualClock()
+    threads = [threading.Thread(target=lambda: [clock.sleep(0.001) for _ in range(1000)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert abs(clock.monotonic() - 4.0) < 1e-6
+
+
+# ─────────────────────────────────────────────────
+#  Esperas do Model
+# ─────────────────────────────────────────────────
+
+class WallClockStepBack(VirtualClock):
+    """Relógio de parede ajustado para trás (ex.: NTP) enquanto o monotônico avança."""
+
+    def time(self) -> float:
+        return super().time() - 2 * self.monotonic()
+
+
+def test_wait_for_5v_measures_elapsed_on_monotonic_clock(tmp_path):
+    clock = WallClockStepBack()
+    model = Model(clock=clock, excel_logger=ExcelLogger(str(tmp_path)))
+    model.attach(EmulatedSerial(BoardEmulator(clock=clock)))
+    model.send_command(b'LIGDC\r')
+
+    # O 5V sobe com o temporizador da placa (16 s): pelo relógio de parede seriam -16 s
+    assert model._wait_for_adc_5v()
+    model.disconnect()
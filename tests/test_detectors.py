@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from detectors import (DETECTORS, ChangeDetector, CusumDetector, KalmanDetector, MedianDetector,
+                       run_detector)
+
+STEP_AT = 40
+
+
+def _step_series(noise=0.02, spike_at=None, seed=0):
+    """|ADC_load - ADC_Batt| sintético: ~0 até STEP_AT, ~1.5 V depois."""
+    rng = np.random.default_rng(seed)
+    values = np.where(np.arange(80) < STEP_AT, 0.1, 1.5) + rng.normal(0, noise, 80)
+    if spike_at is not None:
+        values[spike_at] = 2.0
+    return values
+
+
+def test_change_detector_is_abstract():
+    with pytest.raises(TypeError):
+        ChangeDetector()
+
+
+@pytest.mark.parametrize("name", sorted(DETECTORS))
+def test_detects_step(name):
+    detection = run_detector(DETECTORS[name](), _step_series())
+    assert detection is not None
+    assert STEP_AT <= detection.detected_at <= STEP_AT + 3
+    assert detection.delay == detection.detected_at - detection.onset
+
+
+@pytest.mark.parametrize("name", sorted(DETECTORS))
+def test_quiet_series_not_detected(name):
+    assert run_detector(DETECTORS[name](), np.full(80, 0.1)) is None
+
+
+def test_update_latches_after_detection():
+    detector = MedianDetector(threshold=0.7, window=1)
+    assert not detector.update(0.1)
+    assert detector.update(1.0)
+    assert detector.update(0.1)
+    assert detector.detected_at == 1
+
+
+# ─────────────────────────────────────────────────
+#  CUSUM
+# ─────────────────────────────────────────────────
+
+def test_cusum_accumulates_small_shift():
+    # Desvio pequeno (abaixo de um limiar absoluto de 0.7) mas persistente
+    values = [0.0] * 10 + [0.6] * 10
+    detection = run_detector(CusumDetector(target=0.0, drift=0.35, threshold=1.0), values)
+    assert detection.onset == 10
+    # Soma: 0.25 por amostra -> passa de 1.0 na 5ª amostra após o degrau
+    assert detection.detected_at == 14
+    assert detection.delay == 4
+
+
+def test_cusum_sum_resets_on_return():
+    detector = CusumDetector(target=0.0, drift=0.35, threshold=1.0)
+    for x in [0.6, 0.6, 0.0, 0.0]:
+        detector.update(x)
+    assert detector.sum == 0.0
+    assert detector.onset is None
+
+
+# ─────────────────────────────────────────────────
+#  Mediana
+# ─────────────────────────────────────────────────
+
+def test_median_ignores_isolated_spike():
+    values = _step_series(noise=0.0, spike_at=10)
+    assert run_detector(MedianDetector(threshold=0.7, window=3), values).detected_at == STEP_AT + 1
+
+
+def test_median_onset_is_first_sample_above_threshold():
+    detection = run_detector(MedianDetector(threshold=0.7, window=3), _step_series(noise=0.0))
+    assert detection.onset == STEP_AT
+    assert detection.delay == 1
+
+
+# ─────────────────────────────────────────────────
+#  Kalman
+# ─────────────────────────────────────────────────
+
+def test_kalman_ignores_isolated_spike():
+    values = _step_series(spike_at=10)
+    assert run_detector(KalmanDetector(), values).detected_at >= STEP_AT
+
+
+def test_kalman_jumps_to_step_after_two_innovations():
+    detection = run_detector(KalmanDetector(), _step_series(noise=0.0))
+    assert detection.detected_at == STEP_AT + 1
+
+
+def test_kalman_smooths_noise():
+    detector = KalmanDetector(threshold=10.0)
+    values = 0.5 + np.random.default_rng(1).normal(0, 0.03, 200)
+    for x in values:
+        detector.update(float(x))
+    assert detector.estimate == pytest.approx(0.5, abs=0.02)
+    assert detector.variance < detector.measurement_var
+
+
+def test_reset_prepares_new_series():
+    detector = KalmanDetector()
+    run_detector(detector, _step_series())
+    detector.reset()
+    assert detector.detected_at is None and detector.estimate is None and detector.index == -1
@@ -0,0 +1,122 @@
+import datetime
+import os
+
+import pytest
+
+from events import COMPRESSED_SUFFIX, SUFFIX, EventLog, read_events, read_session
+from writer import FSYNC_NEVER, BackgroundWriter
+
+
+@pytest.fixture
+def writer():
+    writer = BackgroundWriter(fsync=FSYNC_NEVER)
+    yield writer
+    writer.close()
+
+
+def _log(tmp_path, writer, **kwargs):
+    return EventLog(str(tmp_path / "eventos"), writer, **kwargs)
+
+
+def test_record_returns_position_of_line(tmp_path, writer):
+    log = _log(tmp_path, writer)
+    first = log.record("teste_bateria_curto", 1.5, "s1", "A1", "OK", {"adc_batt": 25.28731})
+    second = log.record("teste_dcdc_curto", 2.0, "s1", "A1", "NG", {"adc_dcdc": float("nan")}, motivo="curto")
+    assert first[0] == second[0]
+    assert first[1] == 0 and second[1] > 0
+    writer.flush(timeout=5)
+
+    event = log.read_at(*second)
+    assert event["evento"] == "teste_dcdc_curto"
+    assert event["status"] == "NG"
+    assert event["valores"] == {"adc_dcdc": None}
+    assert event["motivo"] == "curto"
+    assert log.read_at(*first)["valores"] == {"adc_batt": 25.2873}
+
+
+def test_size_rotation_compresses_closed_segment(tmp_path, writer):
+    log = _log(tmp_path, writer, max_bytes=1000)
+    refs = [log.record("leitura", i, "s1", "A1", "OK", {"i": i}) for i in range(40)]
+    writer.flush(timeout=5)
+
+    segments = log.segments()
+    assert len(segments) > 1
+    assert all(name.endswith(COMPRESSED_SUFFIX) for name in segments[:-1])
+    assert segments[-1].endswith(SUFFIX)
+    # A posição continua válida depois da compressão
+    for i, ref in enumerate(refs):
+        assert log.read_at(*ref)["valores"] == {"i": i}
+
+
+def test_daily_rotation(tmp_path, writer):
+    log = _log(tmp_path, writer)
+    segment, _ = log.record("a", 0.0)
+    log._day -= datetime.timedelta(days=1)
+    assert log.record("b", 1.0)[0] != segment
+
+
+def test_no_compression(tmp_path, writer):
+    log = _log(tmp_path, writer, max_bytes=200, compress=False)
+    for i in range(10):
+        log.record("leitura", i)
+    writer.flush(timeout=5)
+    assert all(name.endswith(SUFFIX) for name in log.segments())
+
+
+def test_resume_continues_active_segment(tmp_path, writer):
+    log = _log(tmp_path, writer)
+    segment, _ = log.record("a", 0.0)
+    writer.flush(timeout=5)
+
+    resumed = _log(tmp_path, writer)
+    again, offset = resumed.record("b", 1.0)
+    assert again == segment and offset > 0
+    writer.flush(timeout=5)
+    assert [e["evento"] for e in read_events(str(tmp_path / "eventos"))] == ["a", "b"]
+
+
+def test_resume_compresses_leftover_segments(tmp_path, writer):
+    directory = tmp_path / "eventos"
+    directory.mkdir()
+    for name in ("eventos_20260101_000000_000000.jsonl", "eventos_20260102_000000_000000.jsonl"):
+        (directory / name).write_text('{"evento": "x"}\n')
+    log = _log(tmp_path, writer)
+    writer.flush(timeout=5)
+    assert log.segments() == ["eventos_20260101_000000_000000.jsonl.gz", "eventos_20260102_000000_000000.jsonl"]
+
+
+def test_read_events_filters_and_skips_truncated_lines(tmp_path, writer):
+    log = _log(tmp_path, writer, max_bytes=300)
+    for i in range(6):
+        log.record("leitura", i, f"s{i % 2}", f"A{i % 3}")
+    writer.flush(timeout=5)
+    # Última linha truncada por queda de energia
+    with open(os.path.join(log.directory, log.segments()[-1]), "a") as f:
+        f.write('{"evento": "leit')
+
+    directory = log.directory
+    assert len(list(read_events(directory))) == 6
+    assert [e["t"] for e in read_events(directory, numero_serie="A1")] == [1, 4]
+    assert [e["t"] for e in read_events(directory, session_id="s0")] == [0, 2, 4]
+
+
+def test_read_session_follows_rotation(tmp_path, writer):
+    log = _log(tmp_path, writer, max_bytes=400)
+    log.record("leitura", 0, "anterior", "A0")
+    start = log.record("sessao_inicio", 1, "s1", "A1")
+    for i in range(10):
+        log.record("leitura", 2 + i, "s1" if i % 2 else "outra", "A1")
+    log.record("sessao_fim", 20, "s1", "A1")
+    log.record("leitura", 21, "s1", "A1")   # depois do fim: não faz parte da sessão
+    writer.flush(timeout=5)
+    assert len(log.segments()) > 1
+
+    events = list(read_session(log.directory, *start, "s1"))
+    assert events[0]["evento"] == "sessao_inicio"
+    assert events[-1]["evento"] == "sessao_fim"
+    assert {e["sessao"] for e in events} == {"s1"}
+    assert len(events) == 7
+
+
+def test_read_session_missing_directory(tmp_path):
+    assert list(read_session(str(tmp_path / "nada"), "eventos_1.jsonl", 0, "s1")) == []
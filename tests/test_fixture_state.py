@@ -0,0 +1,123 @@
+from emulator import emulated_model
+from model import POWER_OFF, FixtureState, PowerState
+
+BATTERY = PowerState(battery=True)
+
+
+def _relay_commands(model):
+    """Comandos recebidos pela placa emulada, sem as leituras de ADC."""
+    return [cmd for cmd in model.ser.board.commands if cmd != b'AQADC']
+
+
+# ─────────────────────────────────────────────────
+#  FixtureState
+# ─────────────────────────────────────────────────
+
+def test_starts_unknown():
+    state = FixtureState()
+    assert state.power is None
+    assert not state.is_redundant(b'DESBT\r')
+
+
+def test_confirmed_command_makes_repeat_redundant():
+    state = FixtureState()
+    state.apply(b'LIGBT\r')
+    assert state.is_redundant(b'LIGBT\r')
+    assert not state.is_redundant(b'DESBT\r')
+
+
+def test_unconfirmed_command_makes_field_unknown():
+    state = FixtureState()
+    state.apply(b'LIGBT\r')
+    state.apply(b'DESBT\r', confirmed=False)
+    assert state.values["battery"] is None
+    assert not state.is_redundant(b'LIGBT\r')
+
+
+def test_duty_is_compared_at_firmware_resolution():
+    state = FixtureState()
+    state.apply(b'FR1D80\r')
+    assert state.is_redundant(b'FR1D80.0\r')
+    assert not state.is_redundant(b'FR1D79.9\r')
+
+
+def test_untracked_commands_are_never_redundant():
+    state = FixtureState()
+    state.apply(b'AQADC\r')
+    assert not state.is_redundant(b'AQADC\r')
+    assert state.needed([b'AQADC\r', b'AQADC\r']) == [True, True]
+
+
+def test_needed_considers_earlier_commands_in_batch():
+    state = FixtureState()
+    state.apply(b'DESBT\r')
+    assert state.needed([b'DESBT\r', b'LIGBT\r', b'LIGBT\r', b'DESBT\r']) == [False, True, False, True]
+    # needed não altera o estado
+    assert state.values["battery"] is False
+
+
+def test_commands_to_only_changes_what_differs():
+    state = FixtureState()
+    for cmd in POWER_OFF.commands():
+        state.apply(cmd)
+    assert state.power == POWER_OFF
+    assert state.commands_to(POWER_OFF) == []
+    assert state.commands_to(BATTERY, pth=True, duty=80) == [b'FR1D80.0\r', b'ENPTH\r', b'LIGBT\r']
+
+
+def test_commands_to_turns_on_before_off():
+    state = FixtureState()
+    for cmd in BATTERY.commands():
+        state.apply(cmd)
+    assert state.commands_to(PowerState(dcdc=True)) == [b'LIGDC\r', b'DESBT\r']
+
+
+def test_forget():
+    state = FixtureState()
+    state.apply(b'LIGBT\r')
+    state.forget()
+    assert state.values == dict.fromkeys(FixtureState.FIELDS)
+
+
+# ─────────────────────────────────────────────────
+#  Model na placa emulada
+# ─────────────────────────────────────────────────
+
+def test_model_skips_redundant_commands(tmp_path):
+    model = emulated_model(log_dir=str(tmp_path))
+    assert model.send_command(b'LIGBT\r')[0]
+    assert model.send_command(b'LIGBT\r')[0]
+    assert _relay_commands(model) == [b'LIGBT']
+    assert model.fixture_state.elided == 1
+
+
+def test_model_batch_sends_only_needed_commands(tmp_path):
+    model = emulated_model(log_dir=str(tmp_path))
+    model.send_batch([b'LIGBT', b'DESDC'])
+    ok, results = model.send_batch([b'LIGBT', b'LIGDC', b'DESDC'])
+    assert ok and all(result_ok for _, result_ok, _ in results)
+    assert _relay_commands(model) == [b'LIGBT', b'DESDC', b'LIGDC', b'DESDC']
+
+
+def test_model_set_power_state_is_idempotent(tmp_path):
+    model = emulated_model(log_dir=str(tmp_path))
+    assert model.set_power_state(BATTERY)
+    sent = len(_relay_commands(model))
+    assert model.set_power_state(BATTERY)
+    assert len(_relay_commands(model)) == sent
+    assert model.fixture_state.power == BATTERY
+
+
+def test_model_forgets_state_on_disconnect(tmp_path):
+    model = emulated_model(log_dir=str(tmp_path))
+    model.send_command(b'LIGBT\r')
+    model.disconnect()
+    assert model.fixture_state.values["battery"] is None
+
+
+def test_elision_can_be_disabled(tmp_path):
+    model = emulated_model(log_dir=str(tmp_path))
+    model.elide_redundant = False
+    model.send_command(b'LIGBT\r')
+    model.send_command(b'LIGBT\r')
+    assert _relay_commands(model) == [b'LIGBT', b'LIGBT']
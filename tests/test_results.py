@@ -0,0 +1,262 @@
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from model import ExcelLogger
+from results import PeriodicExport, ResultsStore, main
+
+COLUMNS = ["Data_Hora", "Numero_Serie", "Operador", "Teste_PWM", "Tensao_Bateria_5V_V", "Resultado_Geral"]
+
+
+def _row(numero_serie="A1", resultado="OK", **extra):
+    row = {"Data_Hora": "2026-10-16 10:00:00", "Numero_Serie": numero_serie, "Operador": "Ana",
+           "Teste_PWM": "OK", "Tensao_Bateria_5V_V": 23.1, "Resultado_Geral": resultado}
+    row.update(extra)
+    return row
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultsStore(str(tmp_path / "resultados.db"), COLUMNS)
+    yield store
+    store.close()
+
+
+# ─────────────────────────────────────────────────
+#  ResultsStore
+# ─────────────────────────────────────────────────
+
+def test_append_returns_increasing_ids(store):
+    assert store.append(_row()) == 1
+    assert store.extend([_row("A2"), _row("A3")]) == [2, 3]
+    assert len(store) == 3
+    assert store.last_id() == 3
+
+
+def test_rows_survive_reopen(tmp_path):
+    path = str(tmp_path / "resultados.db")
+    store = ResultsStore(path, COLUMNS)
+    store.append(_row())
+    store.close()
+    store = ResultsStore(path, COLUMNS)
+    assert len(store) == 1
+    store.close()
+
+
+def test_new_columns_added_to_existing_database(tmp_path):
+    path = str(tmp_path / "resultados.db")
+    ResultsStore(path, COLUMNS[:3]).close()
+    store = ResultsStore(path, COLUMNS)
+    store.append(_row())
+    assert store.dataframe()["Teste_PWM"].tolist() == ["OK"]
+    store.close()
+
+
+def test_recent_values(store):
+    store.extend([_row(Tensao_Bateria_5V_V=v) for v in (23.0, None, 23.2, 23.4)])
+    values = store.recent_values(["Tensao_Bateria_5V_V", "Inexistente"], limit=2)
+    assert values == {"Tensao_Bateria_5V_V": [23.2, 23.4], "Inexistente": []}
+
+
+def test_dataframe_leaves_out_reference_columns(store):
+    store.append(_row(Id_Sessao="abc", Arquivo_Curva="curva.npz"))
+    df = store.dataframe()
+    assert list(df.columns) == COLUMNS
+    assert df.iloc[0]["Numero_Serie"] == "A1"
+
+
+# ─────────────────────────────────────────────────
+#  Exportação
+# ─────────────────────────────────────────────────
+
+def test_export_and_import_round_trip(store, tmp_path):
+    store.extend([_row("A1"), _row("A2", "NG")])
+    excel_file = str(tmp_path / "resultados.xlsx")
+    store.export_excel(excel_file)
+    assert not os.path.exists(excel_file + ".tmp.xlsx")
+
+    other = ResultsStore(str(tmp_path / "outra.db"), COLUMNS)
+    assert other.import_excel(excel_file) == 2
+    assert other.dataframe()["Resultado_Geral"].tolist() == ["OK", "NG"]
+    # As linhas importadas já estão na planilha de origem
+    assert other.is_exported(excel_file)
+    other.close()
+
+
+def test_is_exported_tracks_new_rows(store, tmp_path):
+    excel_file = str(tmp_path / "resultados.xlsx")
+    store.append(_row())
+    assert not store.is_exported(excel_file)
+    store.export_excel(excel_file)
+    assert store.is_exported(excel_file)
+    store.append(_row("A2"))
+    assert not store.is_exported(excel_file)
+    store.export_excel(excel_file)
+    assert store.is_exported(excel_file)
+    # Planilha apagada: precisa exportar de novo
+    os.remove(excel_file)
+    assert not store.is_exported(excel_file)
+
+
+def test_periodic_export_only_when_dirty(store, tmp_path):
+    excel_file = str(tmp_path / "resultados.xlsx")
+    exporter = PeriodicExport(store, excel_file, interval=3600)
+    exporter.stop(flush=True)
+    assert not os.path.exists(excel_file)
+
+    exporter = PeriodicExport(store, excel_file, interval=3600)
+    store.append(_row())
+    exporter.mark_dirty()
+    exporter.stop(flush=True)
+    assert len(pd.read_excel(excel_file, engine='openpyxl')) == 1
+
+
+def test_periodic_stop_waits_for_running_export(store, tmp_path, monkeypatch):
+    started, finished = threading.Event(), threading.Event()
+
+    def slow_export(excel_file):
+        started.set()
+        time.sleep(0.2)
+        finished.set()
+
+    monkeypatch.setattr(store, "export_excel", slow_export)
+    exporter = PeriodicExport(store, str(tmp_path / "resultados.xlsx"), interval=0.01)
+    exporter.mark_dirty()
+    assert started.wait(2)
+    exporter.stop(flush=False)
+    # A base pode ser fechada logo depois: a exportação em andamento já terminou
+    assert finished.is_set()
+
+
+def test_failed_export_stays_dirty(store, tmp_path):
+    exporter = PeriodicExport(store, str(tmp_path / "inexistente" / "resultados.xlsx"), interval=3600)
+    store.append(_row())
+    assert not exporter.export()
+    assert exporter._dirty.is_set()
+    exporter.stop(flush=False)
+
+
+# ─────────────────────────────────────────────────
+#  ExcelLogger
+# ─────────────────────────────────────────────────
+
+def test_excel_logger_exports_on_close(tmp_path):
+    logger = ExcelLogger(str(tmp_path))
+    logger.store.append(_row())
+    logger.exporter.mark_dirty()
+    logger.close()
+    logger.close()  # idempotente (também registrado no atexit)
+    assert len(pd.read_excel(logger.excel_file, engine='openpyxl')) == 1
+
+
+def test_excel_logger_startup_skips_export_without_new_rows(tmp_path):
+    logger = ExcelLogger(str(tmp_path))
+    logger.store.append(_row())
+    assert logger.export_excel()
+    logger.close()
+
+    logger = ExcelLogger(str(tmp_path))
+    assert not logger.exporter._dirty.is_set()
+    logger.store.append(_row("A2"))
+    logger.close()
+
+    # Sessão gravada depois da última exportação: a nova execução exporta
+    logger = ExcelLogger(str(tmp_path))
+    assert logger.exporter._dirty.is_set()
+    logger.close()
+
+
+def test_excel_logger_imports_legacy_workbook(tmp_path):
+    pd.DataFrame([_row("A1"), _row("A2")]).to_excel(tmp_path / "resultados_testes.xlsx", index=False)
+    logger = ExcelLogger(str(tmp_path))
+    assert len(logger.store) == 2
+    # A planilha de origem já tem essas sessões: nada a exportar
+    assert not logger.exporter._dirty.is_set()
+    logger.close()
+
+
+# ─────────────────────────────────────────────────
+#  Histórico por número de série
+# ─────────────────────────────────────────────────
+
+def test_history_by_serial_number(store):
+    store.extend([
+        _row("A1"),
+        _row("B7"),
+        _row("A1", "NG", Teste_PWM="NG", Id_Sessao="s3", Segmento_Eventos="eventos_1.jsonl", Posicao_Eventos=120),
+    ])
+    records = store.history("A1")
+    assert [r.id for r in records] == [1, 3]
+    assert records[1].resultado == "NG"
+    assert records[1].testes == {"Teste_PWM": "NG"}
+    assert (records[1].id_sessao, records[1].segmento_eventos, records[1].posicao_eventos) == \
+        ("s3", "eventos_1.jsonl", 120)
+    assert store.history("Z9") == []
+
+
+def test_history_uses_serial_number_index(store):
+    plan = store._conn.execute(
+        'EXPLAIN QUERY PLAN SELECT * FROM sessions WHERE "Numero_Serie" = ? ORDER BY id', ("A1",)
+    ).fetchall()
+    assert any("sessions_numero_serie" in row[-1] for row in plan)
+
+
+def test_history_of_emulated_session(tmp_path):
+    """Sessão completa na placa emulada: a linha aponta para a curva, os tempos e os eventos."""
+    from emulator import emulated_model
+    from events import read_session
+    from testplan import JT2302_PLAN, TestPlanRunner
+
+    model = emulated_model(log_dir=str(tmp_path))
+    model.tracer.enabled = True
+    model.start_test_session("SN42", "Ana")
+    assert model.initialize_system()
+    TestPlanRunner(model).run(JT2302_PLAN, "completo")
+    assert model.finalize_test_session()
+    assert model.writer.flush(timeout=10)
+
+    [record] = model.excel_logger.history("SN42")
+    assert record.resultado == "OK"
+    assert os.path.exists(record.arquivo_curva)
+    assert os.path.exists(record.arquivo_tempos)
+    events = list(read_session(os.path.join(model.excel_logger.log_dir, "eventos"), record.segmento_eventos,
+                               record.posicao_eventos, record.id_sessao))
+    assert events[-1]["evento"] == "sessao_fim"
+    assert {e["numero_serie"] for e in events} == {"SN42"}
+
+
+def test_cli_history(store, capsys):
+    store.extend([_row("A1"), _row("A1", "NG", Teste_PWM="NG")])
+    assert main(["historico", "A1", "--db", store.db_path]) == 0
+    out = capsys.readouterr().out
+    assert "2 sessões para A1" in out
+    assert "NG: Teste_PWM" in out
+    assert main(["historico", "Z9", "--db", store.db_path]) == 1
+
+
+def test_cli_history_opens_database_read_only(tmp_path, capsys):
+    # Base de uma versão anterior: sem colunas novas, meta nem índice, em modo rollback
+    db_file = str(tmp_path / "antiga.db")
+    conn = sqlite3.connect(db_file)
+    conn.execute('CREATE TABLE sessions (id INTEGER PRIMARY KEY AUTOINCREMENT, "Numero_Serie" TEXT, "Data_Hora" TEXT)')
+    conn.execute('INSERT INTO sessions ("Numero_Serie", "Data_Hora") VALUES (\'A1\', \'2026-10-16 10:00:00\')')
+    conn.commit()
+    conn.close()
+
+    assert main(["historico", "A1", "--db", db_file]) == 0
+    assert "1 sessões para A1" in capsys.readouterr().out
+
+    conn = sqlite3.connect(db_file)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    assert [row[1] for row in conn.execute("PRAGMA table_info(sessions)")] == ["id", "Numero_Serie", "Data_Hora"]
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name IN ('meta', 'sessions_numero_serie')").fetchall() == []
+    conn.close()
+
+
+def test_cli_missing_database(tmp_path, capsys):
+    assert main(["historico", "A1", "--db", str(tmp_path / "nao_existe.db")]) == 1
+    assert "não encontrada" in capsys.readouterr().out
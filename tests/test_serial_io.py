@@ -0,0 +1,204 @@
+import json
+
+import pytest
+import serial
+
+from clock import VirtualClock
+from emulator import BoardEmulator, EmulatedSerial, emulated_model
+from model import PowerState
+from serial_io import (FRAME_ACK, FRAME_ADC, FRAME_OTHER, FRAME_REPLY, FrameSplitter, ReplaySerial,
+                       classify_frame)
+
+ADC_FRAME = b'#00001,00002,00003,00004,00005,00006,00007,00008,00009'
+
+
+# ─────────────────────────────────────────────────
+#  FrameSplitter
+# ─────────────────────────────────────────────────
+
+def test_splits_lines_on_cr_and_lf():
+    splitter = FrameSplitter()
+    assert splitter.feed(b'$cTime 12:00\r\n' + ADC_FRAME + b'\r\n') == [b'$cTime 12:00', ADC_FRAME]
+
+
+def test_keeps_partial_line_until_terminator():
+    splitter = FrameSplitter()
+    assert splitter.feed(ADC_FRAME[:20]) == []
+    assert splitter.feed(ADC_FRAME[20:]) == []
+    assert splitter.feed(b'\r\n') == [ADC_FRAME]
+
+
+def test_ack_without_terminator_is_delivered_immediately():
+    splitter = FrameSplitter()
+    assert splitter.feed(b'RXACKOK') == [b'RXACKOK']
+    # O terminador que chega depois não gera frame vazio
+    assert splitter.feed(b'\r\n') == []
+
+
+def test_ack_split_across_reads():
+    splitter = FrameSplitter()
+    assert splitter.feed(b'RXAC') == []
+    assert splitter.feed(b'KOK') == [b'RXACKOK']
+
+
+def test_glued_acks_are_separated():
+    splitter = FrameSplitter()
+    assert splitter.feed(b'RXACKOKRXACKOK\r\nRXACKOKRXACKOK') == [b'RXACKOK'] * 4
+
+
+def test_bytes_after_ack_are_kept():
+    splitter = FrameSplitter()
+    assert splitter.feed(b'RXACKOK' + ADC_FRAME[:10]) == [b'RXACKOK']
+    assert splitter.feed(ADC_FRAME[10:] + b'\n') == [ADC_FRAME]
+
+
+def test_reset_discards_partial_frame():
+    splitter = FrameSplitter()
+    splitter.feed(b'$cSerial')
+    splitter.reset()
+    assert splitter.feed(b'$cTime\r\n') == [b'$cTime']
+
+
+def test_classify_frame():
+    assert classify_frame(b'RXACKOK') == FRAME_ACK
+    assert classify_frame(ADC_FRAME) == FRAME_ADC
+    assert classify_frame(b'$cTime 12:00') == FRAME_REPLY
+    assert classify_frame(b'ERRO') == FRAME_OTHER
+    # Frame ADC truncado não é classificado como ADC
+    assert classify_frame(ADC_FRAME[:30]) == FRAME_OTHER
+
+
+# ─────────────────────────────────────────────────
+#  ReplaySerial
+# ─────────────────────────────────────────────────
+
+def _write_transcript(path, events):
+    with open(path, 'w', encoding='ascii') as f:
+        f.write(json.dumps({"version": 1, "port": "teste", "started_at": 0.0}) + "\n")
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+
+
+def _transcript(tmp_path):
+    path = str(tmp_path / "captura.jsonl")
+    _write_transcript(path, [
+        {"t": 0.0, "w": b'LIGBT\r'.hex()},
+        {"t": 0.010, "r": b'RXACKOK\r\n'.hex()},
+        {"t": 1.0, "w": b'AQADC\r'.hex()},
+        {"t": 1.050, "r": ADC_FRAME.hex()},
+        {"t": 1.060, "r": b'\r\n'.hex()},
+    ])
+    return path
+
+
+def test_replay_gates_reads_on_written_bytes(tmp_path):
+    clock = VirtualClock()
+    port = ReplaySerial(_transcript(tmp_path), clock=clock)
+    clock.sleep(5)
+    # Nada é entregue antes de o Model escrever o comando que antecedia a resposta
+    assert port.in_waiting == 0
+
+    port.write(b'LIGBT\r')
+    assert port.in_waiting == 0
+    assert port.next_ready_at() == pytest.approx(clock.monotonic() + 0.010)
+    clock.sleep(0.010)
+    assert port.read(64) == b'RXACKOK\r\n'
+
+
+def test_replay_keeps_delay_relative_to_write(tmp_path):
+    clock = VirtualClock()
+    port = ReplaySerial(_transcript(tmp_path), clock=clock)
+    port.write(b'LIGBT\r')
+    clock.sleep(0.010)
+    port.read(64)
+
+    # A resposta do AQADC chega 50 ms após a escrita, não no instante absoluto gravado
+    clock.sleep(3.0)
+    port.write(b'AQADC\r')
+    clock.sleep(0.049)
+    assert port.in_waiting == 0
+    clock.sleep(0.011)
+    assert port.read(128) == ADC_FRAME + b'\r\n'
+    assert port.finished
+    assert port.divergences == []
+
+
+def test_replay_accepts_regrouped_writes(tmp_path):
+    clock = VirtualClock()
+    port = ReplaySerial(_transcript(tmp_path), clock=clock)
+    # Os dois comandos num único write (ex.: send_batch): os marcos de bytes continuam valendo
+    port.write(b'LIGBT\rAQADC\r')
+    clock.sleep(0.1)
+    assert port.read(128) == b'RXACKOK\r\n' + ADC_FRAME + b'\r\n'
+    assert port.divergences == []
+
+
+def test_replay_records_divergence(tmp_path):
+    port = ReplaySerial(_transcript(tmp_path), clock=VirtualClock())
+    port.write(b'DESBT\r')
+    assert port.divergences == [0]
+
+
+def test_replay_strict_raises_on_divergence(tmp_path):
+    port = ReplaySerial(_transcript(tmp_path), clock=VirtualClock(), strict=True)
+    with pytest.raises(serial.SerialException):
+        port.write(b'DESBT\r')
+
+
+def test_capture_and_replay_session(tmp_path):
+    """Uma sessão capturada da placa emulada é reproduzida com os mesmos resultados."""
+    path = str(tmp_path / "sessao.jsonl")
+
+    model = emulated_model(log_dir=str(tmp_path / "log"))
+    model.disconnect()
+    model.attach(EmulatedSerial(BoardEmulator(clock=model.clock)), capture_path=path)
+    assert model.initialize_system()
+    recorded = model.test_battery_short()
+    model.disconnect()
+
+    model = emulated_model(log_dir=str(tmp_path / "log"))
+    model.disconnect()
+    port = ReplaySerial(path, clock=model.clock, strict=True)
+    model.attach(port)
+    assert model.initialize_system()
+    replayed = model.test_battery_short()
+
+    assert replayed.passed == recorded.passed
+    assert replayed.details == recorded.details
+    assert port.finished
+
+
+# ─────────────────────────────────────────────────
+#  Número de série
+# ─────────────────────────────────────────────────
+
+def _serial_number_model(tmp_path, config=None):
+    model = emulated_model(config, log_dir=str(tmp_path / "log"))
+    model.start_test_session("SN42", "pytest")
+    return model
+
+
+def test_serial_number_ok(tmp_path):
+    model = _serial_number_model(tmp_path)
+    model.set_power_state(PowerState(battery=True))
+    result = model.test_serial_number_communication()
+    assert result.passed
+    assert model.ser.board.serial_number == "SN42"
+
+
+def test_serial_number_timeout_is_ng(tmp_path):
+    # Sem 5V o firmware não responde: 30 s de timeout no relógio virtual
+    model = _serial_number_model(tmp_path)
+    result = model.test_serial_number_communication()
+    assert not result.passed
+    assert "NG" in result.message
+
+
+def test_serial_number_without_reader_is_ng(tmp_path):
+    model = _serial_number_model(tmp_path)
+    # Leitura já encerrada (ex.: desconexão) com a porta ainda aberta
+    model.reader.stop()
+    model.reader = None
+    result = model.test_serial_number_communication()
+    assert not result.passed
+    assert result.message == "Teste Serial Number: NG - porta desconectada"
@@ -0,0 +1,122 @@
+import inspect
+import re
+import threading
+
+import pytest
+
+from clock import VirtualClock
+from controller import Controller
+from emulator import BoardConfig, BoardEmulator, EmulatedSerial
+from model import Model
+from station import FixtureView, Station
+
+
+class StationView:
+    """View da estação sem interface: executa as atualizações na hora e guarda o que foi mostrado."""
+
+    def __init__(self, numeros_serie: str):
+        self.numeros_serie = numeros_serie
+        self._lock = threading.Lock()
+        self.messages = []
+        self.labels = {}
+        self.final_results = None
+        self.popup = None
+        self.connected = None
+        self.done = threading.Event()
+
+    def add_update(self, func, *args):
+        with self._lock:
+            func(*args)
+
+    def get_user_inputs(self):
+        return "pytest", "", self.numeros_serie, False
+
+    def show_message(self, msg, error_tag=False):
+        self.messages.append(msg)
+
+    def update_result_label(self, key, success):
+        self.labels[key] = success
+
+    def clear_result_label(self):
+        self.labels.clear()
+
+    def hide_final_results(self):
+        pass
+
+    def show_loading(self, show=True):
+        pass
+
+    def show_final_results(self, results_text, duration):
+        self.final_results = (results_text, duration)
+
+    def toggle_connection(self, is_connected):
+        self.connected = is_connected
+
+    def show_test_result(self, msg, result):
+        self.popup = (msg, result)
+        self.done.set()
+
+
+def _emulated(station, configs):
+    """Troca o Model de cada jiga por um ligado a uma placa emulada, com relógio virtual próprio."""
+    for fixture, config in zip(station.fixtures, configs):
+        clock = VirtualClock()
+        board = BoardEmulator(config, clock=clock)
+        model = Model(clock=clock, excel_logger=station.excel_logger)
+        model.open_serial = lambda port, board=board: EmulatedSerial(board)
+        fixture.controller = Controller(FixtureView(station, fixture), model)
+
+
+@pytest.fixture
+def station(tmp_path, monkeypatch):
+    # A estação grava em log/ do diretório atual
+    monkeypatch.chdir(tmp_path)
+    station = Station(["COM3", "COM4"], view=StationView("SN0001, SN0002"))
+    # J2 com DCDC em curto (sem ruído: a leitura em curto é exatamente zero)
+    _emulated(station, [BoardConfig(), BoardConfig(dcdc_short=True, noise_counts=0.0)])
+    yield station
+    for fixture in station.fixtures:
+        fixture.controller.model.writer.flush()
+    station.excel_logger.close()
+
+
+def test_fixtures_run_in_parallel_and_combine_results(station):
+    station.connect_btn_handler()
+    assert station.view.done.wait(30)
+
+    j1, j2 = station.fixtures
+    assert (j1.numero_serie, j2.numero_serie) == ("SN0001", "SN0002")
+    assert j1.passed is True
+    assert j2.passed is False
+    # Um indicador só fica OK se passou em todas as jigas que o executaram
+    assert j1.results["dcdc"] and not j2.results["dcdc"]
+    assert station.combined_result("dcdc") is False
+    assert station.combined_result("bateria") is True
+    assert station.view.labels["dcdc"] is False
+    # Indicador que só J1 executou (J2 parou no curto)
+    assert "pwm" not in j2.results
+    assert station.combined_result("pwm") is j1.results["pwm"]
+
+    text, duration = station.view.final_results
+    assert text.splitlines() == ["J1 (SN0001): OK", "J2 (SN0002): NG"]
+    assert duration == max(j1.duration, j2.duration)
+    assert station.view.popup[1] is False
+    assert station.view.connected is False
+    assert any(m.startswith("[J2] ") for m in station.view.messages)
+
+
+def test_serial_numbers_must_match_fixtures(station):
+    station.view.numeros_serie = "SN0001"
+    station.connect_btn_handler()
+    assert station.view.connected is None
+    assert "Informe 2 números de série" in station.view.messages[-1]
+
+
+def test_fixture_view_covers_view_calls_of_a_test_run():
+    # O que o Controller chama na view durante um teste (a tela em si é da estação)
+    source = "".join(inspect.getsource(method) for method in (
+        Controller.run_tests, Controller.cancel_btn_handler, Controller._on_session_saved))
+    used = set(re.findall(r"self\.view\.(\w+)", source))
+    assert "show_test_result" in used
+    missing = [name for name in used if not hasattr(FixtureView, name)]
+    assert missing == []
@@ -0,0 +1,135 @@
+import math
+
+import pytest
+
+from emulator import BoardConfig, emulated_model
+from sweep import find_thresholds, warm_start_hints
+
+
+class FakeBoard:
+    """Sonda sintética: cada evento ocorre em duties menores ou iguais ao seu limiar."""
+
+    def __init__(self, thresholds, hysteretic=()):
+        self.thresholds = thresholds
+        self.hysteretic = set(hysteretic)
+        self.probed = []
+        self.resets = 0
+        self.latched = False
+
+    def probe(self, duty):
+        # Evento com histerese disparado e sem reset: a sonda seguinte não é válida
+        assert not self.latched, "sonda após disparo sem reset"
+        self.probed.append(duty)
+        flags = {name: duty <= limit + 1e-9 for name, limit in self.thresholds.items()}
+        self.latched = any(flags[name] for name in self.hysteretic)
+        return flags, f"leitura@{duty}"
+
+    def reset(self):
+        self.resets += 1
+        self.latched = False
+
+
+def test_bisection_finds_threshold_on_firmware_grid():
+    board = FakeBoard({"5v": 66.87})
+    results = find_thresholds(board.probe, ["5v"], 72, 60)
+    assert results["5v"].duty == pytest.approx(66.8)
+    assert results["5v"].reading == "leitura@66.8"
+    assert not results["5v"].warm_start
+    # Grosso de 72 a 66 (7 sondas) + bissecção de 1% em passos de 0,1 (~4 sondas)
+    assert len(board.probed) <= 11
+
+
+def test_several_events_share_coarse_probes():
+    board = FakeBoard({"5v": 68.2, "15v": 66.9, "load": 62.8})
+    results = find_thresholds(board.probe, ["5v", "15v", "load"], 72, 60)
+    assert {name: r.duty for name, r in results.items()} == pytest.approx(
+        {"5v": 68.2, "15v": 66.9, "load": 62.8})
+    # A varredura fina custaria 121 sondas
+    assert len(board.probed) < 30
+
+
+def test_event_that_never_occurs():
+    board = FakeBoard({"5v": 50.0})
+    results = find_thresholds(board.probe, ["5v"], 72, 60)
+    assert results["5v"].duty is None
+    assert min(board.probed) == 60
+
+
+def test_event_already_at_start():
+    board = FakeBoard({"5v": 80.0})
+    results = find_thresholds(board.probe, ["5v"], 72, 60)
+    assert results["5v"].duty == 72
+    assert board.probed == [72]
+
+
+def test_cache_avoids_repeated_probes():
+    board = FakeBoard({"a": 66.87, "b": 66.85})
+    find_thresholds(board.probe, ["a", "b"], 72, 60)
+    # Os dois eventos bissectam o mesmo intervalo: nenhum duty é sondado duas vezes
+    assert len(board.probed) == len(set(board.probed))
+
+
+def test_hysteretic_event_resets_before_next_probe():
+    board = FakeBoard({"load": 62.8}, hysteretic=["load"])
+    results = find_thresholds(board.probe, ["load"], 72, 60, reset=board.reset)
+    assert results["load"].duty == pytest.approx(62.8)
+    assert board.resets > 0
+
+
+def test_warm_start_inside_band():
+    board = FakeBoard({"5v": 68.2})
+    results = find_thresholds(board.probe, ["5v"], 72, 60, hints={"5v": (67.5, 69.0)})
+    assert results["5v"].duty == pytest.approx(68.2)
+    assert results["5v"].warm_start
+    # Confirma os extremos da faixa e bissecta 1,5%: bem menos que a busca a frio
+    assert len(board.probed) <= 6
+
+
+@pytest.mark.parametrize("limit", [71.3, 61.2])
+def test_warm_start_widens_band(limit):
+    # O limiar saiu da faixa do histórico (acima ou abaixo): a faixa é alargada até contê-lo
+    board = FakeBoard({"5v": limit})
+    results = find_thresholds(board.probe, ["5v"], 72, 60, hints={"5v": (66.0, 67.0)})
+    assert results["5v"].duty == pytest.approx(limit)
+
+
+def test_warm_start_band_clipped_to_range():
+    board = FakeBoard({"5v": 50.0})
+    results = find_thresholds(board.probe, ["5v"], 72, 60, hints={"5v": (55.0, 80.0)})
+    assert results["5v"].duty is None
+    assert min(board.probed) >= 60 and max(board.probed) <= 72
+
+
+def test_warm_start_hints_from_history():
+    hints = warm_start_hints({
+        "5v": [68.0, 68.1, 68.2, 68.3, 68.4],
+        "15v": [66.9, 67.0],                # poucas amostras: sem faixa
+        "load": [62.8, None, float("nan"), 62.9, 63.0, 62.7, 62.8],
+    })
+    assert set(hints) == {"5v", "load"}
+    low, high = hints["5v"]
+    assert low < 68.0 - 0.4 and high > 68.4 + 0.4
+
+
+# ─────────────────────────────────────────────────
+#  Varredura PWM na placa emulada
+# ─────────────────────────────────────────────────
+
+def _grid_threshold(config, voltage):
+    """Maior duty da grade de 0.1% em que a bateria fica abaixo de `voltage`."""
+    return math.floor((voltage - config.pwm_offset) / config.pwm_gain * 10 - 1e-6) / 10
+
+
+@pytest.mark.parametrize("delay", [0.0, 0.2])
+def test_pwm_sweep_matches_board_thresholds(tmp_path, delay):
+    config = BoardConfig(load_alarm_delay=delay, rail_drop_delay=delay)
+    model = emulated_model(config, log_dir=str(tmp_path))
+    model.send_batch([b'LIGBT\r'])
+
+    result = model.test_pwm_sweep()
+
+    # Com latência na placa, uma sonda que encerra cedo acharia limiares mais baixos
+    assert result.duty_adc_at_load_alarm == pytest.approx(_grid_threshold(config, config.load_alarm_voltage))
+    assert result.duty_adc5v_below5v == pytest.approx(_grid_threshold(config, config.rail_5v_min_voltage))
+    assert result.duty_adc15v_below15v == pytest.approx(_grid_threshold(config, config.rail_15v_min_voltage))
+    model.disconnect()
@@ -0,0 +1,193 @@
+import pytest
+
+from emulator import BoardConfig, emulated_model
+from model import POWER_OFF, PowerState
+from testplan import ABORT_NEVER, ABORT_ON_NG, ABORT_ON_SHORT, JT2302_PLAN, Check
+# Apelidos: classes com nome "Test..." seriam coletadas pelo pytest
+from testplan import TestPlanRunner as Runner
+from testplan import TestStep as Step
+
+BATTERY = PowerState(battery=True)
+DCDC = PowerState(dcdc=True)
+
+
+def _step(name, requires=None, leaves=None, after=()):
+    return Step(name=name, measure=lambda m: True, checks=[], requires=requires, leaves=leaves, after=after)
+
+
+def _cost(steps, initial=POWER_OFF):
+    total, state = 0, initial
+    for step in steps:
+        if step.requires is not None:
+            total += state.distance(step.requires)
+        state = step.final_state or state
+    return total
+
+
+def _names(steps):
+    return [step.name for step in steps]
+
+
+def _runner(model=None, **kwargs):
+    return Runner(model, **kwargs)
+
+
+# ─────────────────────────────────────────────────
+#  Ordenação
+# ─────────────────────────────────────────────────
+
+def test_order_groups_steps_by_power_state():
+    steps = [_step("a", BATTERY), _step("b", POWER_OFF), _step("c", BATTERY)]
+    order = _runner().order(steps)
+    assert _names(order) == ["b", "a", "c"]
+    assert _cost(order) == 1
+
+
+def test_order_respects_dependencies():
+    steps = [_step("a", BATTERY), _step("b", POWER_OFF, after=("a",)), _step("c", BATTERY)]
+    order = _names(_runner().order(steps))
+    assert order.index("a") < order.index("b")
+    assert order == ["a", "c", "b"]
+
+
+def test_order_keeps_declared_order_on_ties():
+    steps = [_step(name, POWER_OFF) for name in "dcba"]
+    assert _names(_runner().order(steps)) == ["d", "c", "b", "a"]
+
+
+def test_order_follows_leaves():
+    # "liga" deixa o DCDC ligado: o passo que precisa do DCDC vem logo depois
+    both = PowerState(battery=True, dcdc=True)
+    steps = [_step("bateria", both), _step("dcdc", DCDC), _step("liga", POWER_OFF, leaves=DCDC)]
+    assert _names(_runner().order(steps)) == ["liga", "dcdc", "bateria"]
+
+
+def test_order_ignores_dependencies_outside_selection():
+    steps = [_step("a", BATTERY, after=("fora_do_perfil",))]
+    assert _names(_runner().order(steps)) == ["a"]
+
+
+def test_circular_dependencies_raise():
+    steps = [_step("a", after=("b",)), _step("b", after=("a",))]
+    with pytest.raises(ValueError):
+        _runner().order(steps)
+
+
+def test_exhaustive_order_is_optimal():
+    # A escolha gulosa (passo mais barato agora) custa mais no total
+    steps = [
+        _step("x", DCDC),
+        _step("y", BATTERY, leaves=DCDC),
+        _step("z", PowerState(battery=True, dcdc=True), after=("x",)),
+    ]
+    runner = _runner()
+    exhaustive = runner.order(steps, initial=BATTERY)
+    runner.MAX_EXHAUSTIVE_STEPS = 0
+    greedy = runner.order(steps, initial=BATTERY)
+    assert _cost(exhaustive, BATTERY) <= _cost(greedy, BATTERY)
+    assert _cost(exhaustive, BATTERY) == min(
+        _cost([steps[i] for i in perm], BATTERY)
+        for perm in [(0, 1, 2), (0, 2, 1), (1, 0, 2)]
+    )
+
+
+def test_greedy_order_for_large_plans():
+    states = [POWER_OFF, BATTERY, DCDC]
+    steps = [_step(f"s{i:02d}", states[i % 3], after=(f"s{i - 3:02d}",) if i >= 3 else ())
+             for i in range(15)]
+    runner = _runner()
+    assert len(steps) > runner.MAX_EXHAUSTIVE_STEPS
+    order = _names(runner.order(steps))
+    assert sorted(order) == sorted(_names(steps))
+    for i in range(3, 15):
+        assert order.index(f"s{i - 3:02d}") < order.index(f"s{i:02d}")
+    # Agrupa os passos de cada estado: 2 trocas em vez de uma a cada passo
+    assert _cost(runner.order(steps)) == 3
+
+
+def test_jt2302_plan_order():
+    order = _runner().order(Runner.select(JT2302_PLAN, "completo"))
+    assert _names(order) == ["bateria_curto", "dcdc_curto", "dcdc_carga", "bateria_isolada",
+                             "alarmes_temperatura", "varredura_pwm"]
+
+
+def test_select_by_profile():
+    assert _names(Runner.select(JT2302_PLAN, "curtos")) == ["bateria_curto", "dcdc_curto"]
+    assert "varredura_pwm" not in _names(Runner.select(JT2302_PLAN, "rapido"))
+
+
+# ─────────────────────────────────────────────────
+#  Execução
+# ─────────────────────────────────────────────────
+
+def test_run_reports_checks(tmp_path):
+    model = emulated_model(log_dir=str(tmp_path))
+    model.start_test_session("123", "teste")
+    assert model.initialize_system()
+    reported = []
+    result = _runner(model, on_check=lambda check, passed: reported.append((check.ui_key, passed))).run(
+        JT2302_PLAN, "rapido")
+    assert result.success
+    assert result.order == ["bateria_curto", "dcdc_curto", "dcdc_carga", "bateria_isolada", "alarmes_temperatura"]
+    assert all(passed for _, passed in reported)
+    assert [key for key, _ in reported] == list(result.checks)
+
+
+def test_run_marks_failed_measurement_as_ng(tmp_path):
+    model = emulated_model(log_dir=str(tmp_path))
+    model.start_test_session("123", "teste")
+
+    def broken(m):
+        raise RuntimeError("sem leitura")
+
+    steps = [Step("quebrado", broken, [Check("bateria", "teste_bateria_curto", "Quebrado", bool)])]
+    messages = []
+    result = _runner(model, on_message=lambda msg, error: messages.append((msg, error))).run(steps)
+    assert not result.success
+    assert result.checks == {"bateria": False}
+    assert messages and messages[0][1]
+
+
+# ─────────────────────────────────────────────────
+#  Interrupção
+# ─────────────────────────────────────────────────
+
+@pytest.mark.parametrize("policy, short, passed, expected", [
+    (ABORT_NEVER, True, False, False),
+    (ABORT_ON_SHORT, True, False, True),
+    (ABORT_ON_SHORT, False, False, False),
+    (ABORT_ON_NG, False, False, True),
+    (ABORT_ON_NG, True, True, False),
+    (ABORT_ON_SHORT, True, True, False),
+])
+def test_should_abort(policy, short, passed, expected):
+    step = Step("passo", lambda m: None, [], short=short)
+    assert _runner(abort_policy=policy).should_abort(step, passed) is expected
+
+
+def test_unknown_policy_rejected():
+    with pytest.raises(ValueError):
+        _runner(abort_policy="talvez")
+
+
+def _run_shorted(tmp_path, policy):
+    # Sem ruído: o critério de curto é leitura exatamente zero
+    model = emulated_model(BoardConfig(battery_short=True, noise_counts=0.0), log_dir=str(tmp_path))
+    model.start_test_session("123", "teste")
+    return model, _runner(model, abort_policy=policy).run(JT2302_PLAN, "rapido")
+
+
+def test_short_aborts_and_powers_down(tmp_path):
+    model, result = _run_shorted(tmp_path, ABORT_ON_SHORT)
+    assert result.aborted == "bateria_curto"
+    assert result.order == ["bateria_curto"]
+    assert result.skipped == ["dcdc_curto", "dcdc_carga", "bateria_isolada", "alarmes_temperatura"]
+    assert not result.success
+    assert model.fixture_state.power == POWER_OFF
+
+
+def test_abort_never_runs_every_step(tmp_path):
+    _, result = _run_shorted(tmp_path, ABORT_NEVER)
+    assert result.aborted is None
+    assert len(result.order) == 5
+    assert not result.checks["bateria"]
@@ -0,0 +1,102 @@
+import json
+import os
+
+from benchmark import HeadlessView
+from clock import VirtualClock
+from controller import Controller
+from model import ExcelLogger, Model
+from timing import ACK, ADC, COMMAND, SETTLE, SLEEP, Tracer
+
+
+def _session(tracer):
+    """Dois passos com o tempo gasto em cada categoria conhecido de antemão."""
+    clock = tracer.clock
+    with tracer.step("bateria"):
+        with tracer.span("send_batch", COMMAND, n=3):
+            clock.sleep(0.01)
+        with tracer.span("ACK", ACK):
+            clock.sleep(0.02)
+        with tracer.span("AQADC", ADC):
+            clock.sleep(0.005)
+        with tracer.span("AQADC", ADC):
+            clock.sleep(0.005)
+    with tracer.step("dcdc"):
+        with tracer.span("wait_settled", SETTLE):
+            clock.sleep(0.3)
+        with tracer.span("sleep", SLEEP, seconds=1):
+            clock.sleep(1.0)
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer(VirtualClock())
+    _session(tracer)
+    assert tracer.spans == []
+    assert tracer.summary() == []
+
+
+def test_summary_per_step():
+    tracer = Tracer(VirtualClock(), enabled=True)
+    _session(tracer)
+    bateria, dcdc = tracer.summary()
+
+    assert bateria.step == "bateria"
+    assert abs(bateria.total - 0.04) < 1e-9
+    assert bateria.commands == 3
+    assert abs(bateria.ack_wait - 0.02) < 1e-9
+    assert bateria.adc_reads == 2 and abs(bateria.adc_time - 0.01) < 1e-9
+
+    assert dcdc.step == "dcdc"
+    assert abs(dcdc.total - 1.3) < 1e-9
+    assert abs(dcdc.settle_time - 0.3) < 1e-9
+    assert abs(dcdc.sleep_time - 1.0) < 1e-9
+    assert "bateria" in tracer.summary_table()
+
+
+def test_spans_outside_steps_are_not_summarized():
+    tracer = Tracer(VirtualClock(), enabled=True)
+    with tracer.span("AQADC", ADC):
+        pass
+    assert len(tracer.spans) == 1
+    assert tracer.summary() == []
+
+
+def test_chrome_trace_export(tmp_path):
+    clock = VirtualClock(start=100.0)
+    tracer = Tracer(clock, enabled=True)
+    _session(tracer)
+
+    path = tracer.export(str(tmp_path / "tempos" / "sessao.json"), numero_serie="SN1")
+    with open(path, encoding="utf-8") as f:
+        trace = json.load(f)
+
+    events = trace["traceEvents"]
+    assert len(events) == len(tracer.spans)
+    assert {e["ph"] for e in events} == {"X"}
+    # Tempos em µs, relativos ao primeiro span
+    assert min(e["ts"] for e in events) == 0
+    step = next(e for e in events if e["name"] == "dcdc")
+    assert step["cat"] == "step" and step["dur"] == 1.3e6
+    assert next(e for e in events if e["cat"] == COMMAND)["args"] == {"n": 3}
+    assert {e["tid"] for e in events} == {1}
+    assert trace["otherData"]["numero_serie"] == "SN1"
+    assert [s["step"] for s in trace["otherData"]["steps"]] == ["bateria", "dcdc"]
+
+
+def test_controller_tracing_is_opt_in(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    model = Model(excel_logger=ExcelLogger(str(tmp_path / "log")))
+    assert not Controller(HeadlessView(), model).model.tracer.enabled
+
+    with open("config.json", "w") as f:
+        json.dump({"tempos_por_passo": True}, f)
+    assert Controller(HeadlessView(), model).model.tracer.enabled
+
+    # Sem a opção, um tracer já ligado (ex.: benchmark) continua ligado
+    os.remove("config.json")
+    assert Controller(HeadlessView(), model).model.tracer.enabled
+
+    # Salvar a porta não apaga a opção
+    with open("config.json", "w") as f:
+        json.dump({"tempos_por_passo": True}, f)
+    model.save_config("COM3")
+    assert model.load_config() == {"tempos_por_passo": True, "porta": "COM3"}
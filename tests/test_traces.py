@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+import pytest
+
+from adc import CHANNELS, DEFAULT_GAINS, SampleBuffer
+from traces import TraceStore
+
+
+def _samples(n=500, seed=3):
+    """Amostras com tensões exatamente sobre a grade do ADC, como as lidas da placa."""
+    rng = np.random.default_rng(seed)
+    buffer = SampleBuffer(capacity=64)
+    for i in range(n):
+        counts = rng.integers(0, 4096, len(CHANNELS))
+        buffer.append(1000.0 + i * 0.01, 72.0 - i * 0.02, counts * DEFAULT_GAINS)
+    return buffer
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TraceStore(str(tmp_path / "traces"))
+
+
+@pytest.mark.parametrize("mmap", [False, True])
+def test_save_load_round_trip(store, mmap):
+    samples = _samples()
+    path = store.save("SN/01", samples, DEFAULT_GAINS, operador="Ana")
+
+    trace = store.load(path, mmap=mmap)
+    original = samples.array()
+    assert len(trace) == len(samples)
+    assert trace.meta["numero_serie"] == "SN/01"
+    assert trace.meta["operador"] == "Ana"
+    assert trace.meta["channels"] == list(CHANNELS)
+    # t relativo à primeira amostra; t e duty em float32
+    assert np.allclose(trace.t, original[:, 0] - original[0, 0], atol=1e-4)
+    assert np.allclose(trace.duty, original[:, 1], atol=1e-4)
+    # Contagens inteiras: as tensões voltam sem perda
+    assert np.allclose(trace.array()[:, 2:], original[:, 2:], rtol=0, atol=1e-9)
+    assert np.array_equal(trace.gains, DEFAULT_GAINS)
+
+
+def test_mmap_loader_maps_columns_and_reuses_cache(store):
+    path = store.save("SN01", _samples(), DEFAULT_GAINS)
+
+    trace = store.load(path)
+    assert isinstance(trace.counts["adc_batt"], np.memmap)
+    assert isinstance(trace.t, np.memmap)
+    cache_dir = os.path.splitext(path)[0] + ".cols"
+    stamp = os.path.join(cache_dir, ".complete")
+    assert os.path.exists(stamp)
+
+    # Segunda carga usa as colunas já descomprimidas
+    stamped_at = os.path.getmtime(stamp)
+    again = store.load(path)
+    assert os.path.getmtime(stamp) == stamped_at
+    assert np.array_equal(again.counts["adc_5v"], trace.counts["adc_5v"])
+
+
+def test_stale_cache_is_rebuilt(store):
+    path = store.save("SN01", _samples(seed=1), DEFAULT_GAINS)
+    store.load(path)
+
+    # Arquivo regravado depois do cache (mesmo caminho)
+    replacement = store.save("SN01", _samples(n=10, seed=2), DEFAULT_GAINS)
+    os.replace(replacement, path)
+    stamp = os.path.join(os.path.splitext(path)[0] + ".cols", ".complete")
+    os.utime(stamp, (0, 0))
+    assert len(store.load(path)) == 10
+
+
+def test_empty_buffer_is_not_saved(store):
+    assert store.save("SN01", SampleBuffer(), DEFAULT_GAINS) is None
+    assert store.files("SN01") == []
+
+
+def test_files_per_board_in_order(store):
+    first = store.save("SN 01", _samples(n=5), DEFAULT_GAINS)
+    second = store.save("SN 01", _samples(n=5), DEFAULT_GAINS)
+    store.save("SN02", _samples(n=5), DEFAULT_GAINS)
+    assert store.files("SN 01") == [first, second]
+    assert os.path.basename(store.board_dir("SN 01")) == "SN_01"
+    assert os.path.basename(store.board_dir("")) == "sem_serie"
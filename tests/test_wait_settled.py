@@ -0,0 +1,73 @@
+import pytest
+
+from cancel import Cancelled
+from emulator import BoardConfig, emulated_model
+
+
+@pytest.fixture
+def model(tmp_path):
+    model = emulated_model(BoardConfig(noise_counts=0.0), log_dir=str(tmp_path))
+    yield model
+    model.disconnect()
+
+
+def _elapsed(model, start):
+    return model.clock.monotonic() - start
+
+
+def test_returns_settled_reading(model):
+    model.send_command(b'FR1D80\r')
+    start = model.clock.monotonic()
+    reading = model.wait_settled(("adc_batt",), max_wait=1)
+    assert reading.adc_batt == pytest.approx(model.ser.board.config.pwm_voltage(80), abs=0.1)
+    assert _elapsed(model, start) < 1
+
+
+def test_times_out_with_last_reading(tmp_path):
+    model = emulated_model(BoardConfig(noise_counts=50.0), log_dir=str(tmp_path))
+    model.send_command(b'FR1D80\r')
+    start = model.clock.monotonic()
+    reading = model.wait_settled(("adc_batt",), max_wait=0.3, tolerance=0.001)
+    assert reading is not None
+    assert 0.3 <= _elapsed(model, start) < 0.4
+    model.disconnect()
+
+
+def test_waits_for_condition(model):
+    model.send_command(b'FR1D80\r')
+    model.wait_settled(("adc_batt",), max_wait=1)
+    start = model.clock.monotonic()
+    reading = model.wait_settled(("adc_batt",), max_wait=0.5, condition=lambda r: r.adc_batt > 100)
+    # Canal estável, mas a condição nunca vale: só o prazo encerra a espera
+    assert reading is not None
+    assert _elapsed(model, start) >= 0.5
+
+
+def test_stop_ends_wait_on_first_match(model):
+    model.send_command(b'FR1D80\r')
+    seen = []
+    reading = model.wait_settled(("adc_batt",), max_wait=1,
+                                 stop=lambda r: seen.append(r) or r.adc_batt > 10)
+    assert reading is seen[-1]
+    assert reading.adc_batt > 10
+    assert all(r.adc_batt <= 10 for r in seen[:-1])
+
+
+def test_min_wait_holds_flat_window(model):
+    model.send_command(b'FR1D80\r')
+    model.wait_settled(("adc_batt",), max_wait=1)
+    start = model.clock.monotonic()
+    model.wait_settled(("adc_batt",), max_wait=0.05, min_wait=0.2)
+    # min_wait acima de max_wait estende o prazo
+    assert _elapsed(model, start) >= 0.2
+
+
+def test_cancel_interrupts_wait(model):
+    model.cancel_token.cancel()
+    with pytest.raises(Cancelled):
+        model.wait_settled(("adc_batt",), max_wait=1)
+
+
+def test_disconnected_returns_none(model):
+    model.disconnect()
+    assert model.wait_settled(("adc_batt",), max_wait=1) is None
@@ -0,0 +1,146 @@
+import threading
+
+import pytest
+
+from writer import FSYNC_ALWAYS, FSYNC_NEVER, BackgroundWriter
+
+
+@pytest.fixture
+def writer():
+    writer = BackgroundWriter(fsync=FSYNC_NEVER)
+    yield writer
+    writer.close()
+
+
+def _read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_appends_in_order(writer, tmp_path):
+    path = str(tmp_path / "log.txt")
+    for i in range(1000):
+        writer.append(path, f"{i}\n")
+    assert writer.flush(timeout=5)
+    assert _read(path).splitlines() == [str(i) for i in range(1000)]
+
+
+def test_separate_files(writer, tmp_path):
+    a, b = str(tmp_path / "a.txt"), str(tmp_path / "b.txt")
+    writer.append(a, "a1\n")
+    writer.append(b, "b1\n")
+    writer.append(a, "a2\n")
+    assert writer.flush(timeout=5)
+    assert _read(a) == "a1\na2\n"
+    assert _read(b) == "b1\n"
+
+
+def test_task_sees_lines_queued_before_it(writer, tmp_path):
+    path = str(tmp_path / "log.txt")
+    seen = []
+    writer.append(path, "antes\n")
+    writer.submit(lambda: seen.append(_read(path)))
+    writer.append(path, "depois\n")
+    assert writer.flush(timeout=5)
+    assert seen == ["antes\n"]
+
+
+def test_failing_task_does_not_stop_writer(writer, tmp_path):
+    path = str(tmp_path / "log.txt")
+
+    def broken():
+        raise OSError("disco cheio")
+
+    writer.submit(broken)
+    writer.append(path, "ok\n")
+    assert writer.flush(timeout=5)
+    assert _read(path) == "ok\n"
+
+
+def test_release_closes_file_inside_writer_thread(writer, tmp_path):
+    path = str(tmp_path / "log.txt")
+    writer.append(path, "linha\n")
+    writer.submit(lambda: writer.release(path))
+    assert writer.flush(timeout=5)
+    assert path not in writer._files
+
+
+def test_flush_without_writes_returns_immediately():
+    assert BackgroundWriter().flush(timeout=0)
+
+
+def test_fsync_policy_validated():
+    with pytest.raises(ValueError):
+        BackgroundWriter(fsync="sempre")
+
+
+def test_fsync_always(tmp_path):
+    writer = BackgroundWriter(fsync=FSYNC_ALWAYS)
+    path = str(tmp_path / "log.txt")
+    writer.append(path, "a\n")
+    writer.append(path, "b\n")
+    writer.close()
+    assert _read(path) == "a\nb\n"
+
+
+# ─────────────────────────────────────────────────
+#  Encerramento
+# ─────────────────────────────────────────────────
+
+def test_close_writes_pending_and_closes_files(tmp_path):
+    writer = BackgroundWriter(fsync=FSYNC_NEVER)
+    path = str(tmp_path / "log.txt")
+    for i in range(100):
+        writer.append(path, f"{i}\n")
+    writer.close()
+    assert len(_read(path).splitlines()) == 100
+    assert writer._files == {}
+    writer.close()  # idempotente
+
+
+def test_producers_raise_after_close(tmp_path):
+    writer = BackgroundWriter()
+    writer.append(str(tmp_path / "log.txt"), "a\n")
+    writer.close()
+    with pytest.raises(RuntimeError):
+        writer.append(str(tmp_path / "log.txt"), "b\n")
+    with pytest.raises(RuntimeError):
+        writer.submit(lambda: None)
+
+
+@pytest.mark.parametrize("started", [False, True])
+def test_flush_after_close_returns(tmp_path, started):
+    writer = BackgroundWriter()
+    if started:
+        writer.append(str(tmp_path / "log.txt"), "a\n")
+    writer.close()
+    result = []
+    thread = threading.Thread(target=lambda: result.append(writer.flush()), daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+    assert not thread.is_alive(), "flush() bloqueou depois do close()"
+    assert result == [True]
+
+
+def test_concurrent_producers_and_close(tmp_path):
+    """Nada é aceito depois do close(): cada append ou foi gravado ou levantou erro."""
+    writer = BackgroundWriter(max_queue=16, fsync=FSYNC_NEVER)
+    path = str(tmp_path / "log.txt")
+    accepted = []
+
+    def produce(n):
+        for i in range(500):
+            try:
+                writer.append(path, f"{n}-{i}\n")
+            except RuntimeError:
+                return
+            accepted.append(f"{n}-{i}")
+
+    threads = [threading.Thread(target=produce, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    writer.close()
+    for thread in threads:
+        thread.join(timeout=5)
+    written = _read(path).splitlines() if accepted else []
+    assert sorted(written) == sorted(accepted)
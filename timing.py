@@ -0,0 +1,190 @@
+"""
+Instrumentação de tempo por passo do teste.
+
+O ``Tracer`` do Model registra spans (início e duração no relógio do Model) em
+volta de cada passo do plano, comando, espera de ACK, leitura AQADC, espera de
+estabilização e sleep. Desligado, ``span()`` devolve um contexto vazio
+compartilhado e o custo é de uma chamada de função.
+
+Os spans de uma sessão podem ser exportados no formato Chrome trace (abre no
+Perfetto ou em chrome://tracing) e resumidos numa tabela por passo.
+"""
+import json
+import os
+import threading
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+
+from clock import Clock, REAL_CLOCK
+
+# Categorias de span
+STEP = "step"
+COMMAND = "cmd"
+ACK = "ack"
+ADC = "adc"
+SETTLE = "settle"
+SLEEP = "sleep"
+
+
+@dataclass
+class Span:
+    """Um intervalo medido."""
+    name: str
+    cat: str
+    start: float
+    duration: float
+    step: Optional[str]
+    tid: int
+    args: Optional[Dict] = None
+
+
+@dataclass
+class StepTiming:
+    """Resumo de um passo: tempo total e onde ele foi gasto."""
+    step: str
+    total: float = 0.0
+    commands: int = 0
+    ack_wait: float = 0.0
+    adc_reads: int = 0
+    adc_time: float = 0.0
+    settle_time: float = 0.0
+    sleep_time: float = 0.0
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _ActiveSpan:
+    __slots__ = ("tracer", "name", "cat", "args", "start", "previous_step")
+
+    def __init__(self, tracer: "Tracer", name: str, cat: str, args: Optional[Dict]):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        if self.cat == STEP:
+            self.previous_step = self.tracer.current_step
+            self.tracer.current_step = self.name
+        self.start = self.tracer.clock.monotonic()
+        return self
+
+    def __exit__(self, *exc):
+        tracer = self.tracer
+        end = tracer.clock.monotonic()
+        if self.cat == STEP:
+            tracer.current_step = self.previous_step
+            step = self.name
+        else:
+            step = tracer.current_step
+        tracer.spans.append(Span(self.name, self.cat, self.start, end - self.start,
+                                 step, threading.get_ident(), self.args))
+        return False
+
+
+class Tracer:
+    """Coleta spans de uma sessão de testes."""
+
+    def __init__(self, clock: Clock = REAL_CLOCK, enabled: bool = False):
+        self.clock = clock
+        self.enabled = enabled
+        self.spans: List[Span] = []
+        self.current_step: Optional[str] = None
+
+    def clear(self):
+        self.spans = []
+        self.current_step = None
+
+    def span(self, name: str, cat: str, **args):
+        """Contexto que mede o bloco; ``args`` vão para o trace (ex.: n=comandos enviados)."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _ActiveSpan(self, name, cat, args or None)
+
+    def step(self, name: str):
+        """Span de um passo; os spans internos são contabilizados nele."""
+        return self.span(name, STEP)
+
+    # ─────────────────────────────────────────────────
+    #  Resumo e exportação
+    # ─────────────────────────────────────────────────
+
+    def summary(self) -> List[StepTiming]:
+        """Tempo de cada passo, na ordem de execução, e sua divisão por categoria."""
+        steps: Dict[str, StepTiming] = {}
+        for span in sorted(self.spans, key=lambda s: s.start):
+            if span.step is None:
+                continue
+            timing = steps.setdefault(span.step, StepTiming(span.step))
+            if span.cat == STEP:
+                timing.total += span.duration
+            elif span.cat == COMMAND:
+                timing.commands += (span.args or {}).get("n", 1)
+            elif span.cat == ACK:
+                timing.ack_wait += span.duration
+            elif span.cat == ADC:
+                timing.adc_reads += 1
+                timing.adc_time += span.duration
+            elif span.cat == SETTLE:
+                timing.settle_time += span.duration
+            elif span.cat == SLEEP:
+                timing.sleep_time += span.duration
+        return list(steps.values())
+
+    def summary_table(self) -> str:
+        """Tabela de texto do resumo por passo (tempos em segundos)."""
+        header = f"{'Passo':<22} {'Total':>8} {'Cmds':>5} {'ACK':>7} {'AQADC':>6} {'ADC':>7} {'Estab.':>7} {'Sleep':>7}"
+        lines = [header, "-" * len(header)]
+        for t in self.summary():
+            lines.append(f"{t.step:<22} {t.total:>8.2f} {t.commands:>5d} {t.ack_wait:>7.2f} "
+                         f"{t.adc_reads:>6d} {t.adc_time:>7.2f} {t.settle_time:>7.2f} {t.sleep_time:>7.2f}")
+        return "\n".join(lines)
+
+    def chrome_trace(self, **metadata) -> Dict:
+        """Spans no formato JSON do Chrome trace (eventos 'X', tempos em µs)."""
+        origin = min((s.start for s in self.spans), default=0.0)
+        tids = {tid: i + 1 for i, tid in enumerate(dict.fromkeys(s.tid for s in self.spans))}
+        events = []
+        for span in self.spans:
+            event = {
+                "name": span.name,
+                "cat": span.cat,
+                "ph": "X",
+                "ts": round((span.start - origin) * 1e6, 1),
+                "dur": round(span.duration * 1e6, 1),
+                "pid": 1,
+                "tid": tids[span.tid],
+            }
+            if span.args:
+                event["args"] = span.args
+            events.append(event)
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": dict(metadata, steps=[asdict(t) for t in self.summary()]),
+        }
+
+    def export(self, path: str, **metadata) -> str:
+        """Grava o Chrome trace (com o resumo por passo em otherData) e retorna o caminho."""
+        return write_json(path, self.chrome_trace(**metadata))
+
+
+def write_json(path: str, data: Dict) -> str:
+    """Grava um JSON via arquivo temporário (nunca deixa um arquivo pela metade)."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, default=str)
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,131 @@
+"""
+Armazenamento das curvas completas das varreduras PWM.
+
+Cada varredura vira um arquivo ``.npz`` comprimido em
+``log/traces/<numero_serie>/<data_hora>.npz``, em formato colunar: ``t``
+(segundos desde a primeira amostra), ``duty`` e uma coluna por canal com a
+contagem bruta do ADC (uint16). As tensões são reconstruídas com o vetor de
+ganhos gravado junto, sem perda.
+
+Para análise, ``TraceStore.load`` descomprime cada coluna uma única vez para um
+``.npy`` ao lado do arquivo e o abre com memory-map.
+"""
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from adc import CHANNELS, SampleBuffer
+
+TRACE_DIR = os.path.join("log", "traces")
+
+_UNSAFE_CHARS = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+@dataclass
+class SweepTrace:
+    """Curva de uma varredura carregada do disco."""
+    path: str
+    meta: Dict = field(default_factory=dict)
+    t: Optional[np.ndarray] = None
+    duty: Optional[np.ndarray] = None
+    counts: Dict[str, np.ndarray] = field(default_factory=dict)
+    gains: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return 0 if self.t is None else len(self.t)
+
+    def volts(self, channel: str) -> np.ndarray:
+        """Tensões calibradas de um canal."""
+        return self.counts[channel] * self.gains[CHANNELS.index(channel)]
+
+    def array(self) -> np.ndarray:
+        """Matriz (n, 11) no mesmo formato de SampleBuffer.array()."""
+        return np.column_stack([self.t, self.duty] + [self.volts(ch) for ch in CHANNELS])
+
+
+class TraceStore:
+    """Grava e carrega curvas de varredura por número de série."""
+
+    def __init__(self, root: str = TRACE_DIR):
+        self.root = root
+
+    def board_dir(self, numero_serie: str) -> str:
+        return os.path.join(self.root, _UNSAFE_CHARS.sub("_", numero_serie) or "sem_serie")
+
+    def save(self, numero_serie: str, samples: SampleBuffer, gains: np.ndarray, **meta) -> Optional[str]:
+        """Grava as amostras de uma varredura e retorna o caminho do arquivo (None se vazia)."""
+        data = samples.array()
+        if len(data) == 0:
+            return None
+
+        gains = np.asarray(gains, dtype=np.float64)
+        counts = np.clip(np.rint(data[:, 2:] / gains), 0, np.iinfo(np.uint16).max).astype(np.uint16)
+
+        meta = dict(meta, numero_serie=numero_serie, channels=list(CHANNELS), samples=len(data))
+        columns = {
+            "t": (data[:, 0] - data[0, 0]).astype(np.float32),
+            "duty": data[:, 1].astype(np.float32),
+            "gains": gains,
+            "meta": np.array(json.dumps(meta, default=str)),
+        }
+        for i, channel in enumerate(CHANNELS):
+            columns[channel] = counts[:, i]
+
+        directory = self.board_dir(numero_serie)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, datetime.now().strftime("%Y%m%d_%H%M%S_%f") + ".npz")
+
+        # Grava em arquivo temporário para nunca deixar um .npz pela metade
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(f, **columns)
+        os.replace(tmp_path, path)
+        return path
+
+    def files(self, numero_serie: str) -> List[str]:
+        """Arquivos de varredura de uma placa, do mais antigo ao mais recente."""
+        directory = self.board_dir(numero_serie)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".npz"))
+
+    def load(self, path: str, mmap: bool = True) -> SweepTrace:
+        """Carrega uma varredura; com ``mmap`` as colunas são abertas por memory-map."""
+        if not mmap:
+            with np.load(path) as npz:
+                columns = {name: npz[name] for name in npz.files}
+        else:
+            columns = self._mapped_columns(path)
+
+        return SweepTrace(
+            path=path,
+            meta=json.loads(str(columns["meta"])),
+            t=columns["t"],
+            duty=columns["duty"],
+            counts={ch: columns[ch] for ch in CHANNELS if ch in columns},
+            gains=np.asarray(columns["gains"]),
+        )
+
+    def _mapped_columns(self, path: str) -> Dict[str, np.ndarray]:
+        cache_dir = os.path.splitext(path)[0] + ".cols"
+        stamp = os.path.join(cache_dir, ".complete")
+
+        if not os.path.exists(stamp) or os.path.getmtime(stamp) < os.path.getmtime(path):
+            os.makedirs(cache_dir, exist_ok=True)
+            with np.load(path) as npz:
+                for name in npz.files:
+                    np.save(os.path.join(cache_dir, name + ".npy"), npz[name])
+            open(stamp, "w").close()
+
+        columns = {}
+        for name in os.listdir(cache_dir):
+            if name.endswith(".npy"):
+                column = name[:-4]
+                # Escalares (meta) não podem ser mapeados
+                columns[column] = np.load(os.path.join(cache_dir, name), mmap_mode=None if column == "meta" else "r")
+        return columns
@@ -0,0 +1,176 @@
+"""
+Gravação em disco em segundo plano (write-behind).
+
+Uma única thread por processo recebe, por uma fila limitada, as linhas de log
+de texto e as tarefas de persistência das sessões (base de resultados, curvas,
+tempos). Quem produz só enfileira e segue; a thread agrupa as linhas de cada
+arquivo, mantém os arquivos abertos e aplica a política de fsync. Com a fila
+cheia, ``append``/``submit`` esperam por espaço em vez de descartar dados.
+
+``flush()`` espera tudo o que já foi enfileirado ser gravado; ``close()`` (também
+chamado na saída do processo) faz o flush e fecha os arquivos. Depois do
+``close()``, ``append``/``submit`` levantam RuntimeError e ``flush`` retorna na hora.
+"""
+import atexit
+import os
+import queue
+import threading
+from typing import Callable, Dict, List, Optional, TextIO
+
+# Políticas de fsync dos arquivos de texto
+FSYNC_NEVER = "never"      # só flush para o sistema operacional
+FSYNC_BATCH = "batch"      # fsync ao fim de cada lote gravado
+FSYNC_ALWAYS = "always"    # fsync a cada append
+
+_STOP = object()
+
+
+class BackgroundWriter:
+    """Thread única de escrita em disco com fila limitada."""
+
+    def __init__(self, max_queue: int = 10000, batch_size: int = 256, fsync: str = FSYNC_BATCH):
+        if fsync not in (FSYNC_NEVER, FSYNC_BATCH, FSYNC_ALWAYS):
+            raise ValueError(f"Política de fsync desconhecida: {fsync}")
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._files: Dict[str, TextIO] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def _enqueue(self, item):
+        # Sob o lock: nada entra na fila depois do _STOP do close()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("BackgroundWriter fechado")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="BackgroundWriter", daemon=True)
+                self._thread.start()
+            self._queue.put(item)
+
+    # ─────────────────────────────────────────────────
+    #  Produtores
+    # ─────────────────────────────────────────────────
+
+    def append(self, path: str, text: str):
+        """Acrescenta texto ao fim de um arquivo."""
+        self._enqueue(("append", path, text))
+
+    def submit(self, task: Callable[[], None]):
+        """Executa uma tarefa de gravação na thread, na ordem de chegada."""
+        self._enqueue(("task", task, None))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Espera o que já foi enfileirado ser gravado. Retorna False no timeout."""
+        done = threading.Event()
+        with self._lock:
+            thread, closed = self._thread, self._closed
+            if thread is None:
+                return True
+            if not closed:
+                self._queue.put(("task", done.set, None))
+        if closed:
+            # A thread termina depois de gravar o que estava na fila antes do _STOP
+            thread.join(timeout)
+            return not thread.is_alive()
+        return done.wait(timeout)
+
+    def release(self, path: str):
+        """Fecha o arquivo, se aberto (só na thread do writer, ex.: numa tarefa de ``submit``)."""
+        f = self._files.pop(path, None)
+        if f is not None:
+            f.close()
+
+    def close(self, timeout: Optional[float] = 10.0):
+        """Grava o que falta, fecha os arquivos e encerra a thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    # ─────────────────────────────────────────────────
+    #  Thread de escrita
+    # ─────────────────────────────────────────────────
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            # Junta o que mais já estiver na fila num único lote
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = self._process(items)
+            if stop:
+                self._close_files()
+                return
+
+    def _process(self, items: List) -> bool:
+        pending: Dict[str, List[str]] = {}
+        stop = False
+        for item in items:
+            if item is _STOP:
+                stop = True
+                continue
+            kind, target, text = item
+            if kind == "append":
+                pending.setdefault(target, []).append(text)
+                if self.fsync == FSYNC_ALWAYS:
+                    self._write_pending(pending)
+            else:
+                # Tarefas veem as linhas enfileiradas antes delas já gravadas
+                self._write_pending(pending)
+                try:
+                    target()
+                except Exception as e:
+                    print(f"[ERRO] Gravação em segundo plano: {e}")
+        self._write_pending(pending)
+        return stop
+
+    def _write_pending(self, pending: Dict[str, List[str]]):
+        for path, chunks in pending.items():
+            try:
+                f = self._file(path)
+                f.write("".join(chunks))
+                f.flush()
+                if self.fsync != FSYNC_NEVER:
+                    os.fsync(f.fileno())
+            except OSError as e:
+                print(f"[ERRO] Falha ao gravar {path}: {e}")
+        pending.clear()
+
+    def _file(self, path: str) -> TextIO:
+        f = self._files.get(path)
+        if f is None or f.closed:
+            # Sem tradução de fim de linha: posições em bytes valem em qualquer sistema
+            f = self._files[path] = open(path, 'a', encoding='utf-8', newline='\n')
+        return f
+
+    def _close_files(self):
+        for f in self._files.values():
+            try:
+                f.close()
+            except OSError:
+                pass
+        self._files.clear()
+
+
+_default_writer: Optional[BackgroundWriter] = None
+_default_lock = threading.Lock()
+
+
+def default_writer() -> BackgroundWriter:
+    """Writer compartilhado pelo processo (todas as jigas da estação usam o mesmo)."""
+    global _default_writer
+    with _default_lock:
+        if _default_writer is None:
+            _default_writer = BackgroundWriter()
+            atexit.register(_default_writer.close)
+        return _default_writer